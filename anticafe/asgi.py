@@ -3,6 +3,22 @@ ASGI config for anticafe project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live occupancy stream (/api/availability/stream/) keeps connections
+open, so production should serve the project through this module, e.g.:
+
+    uvicorn anticafe.asgi:application --workers 2
+
+Each worker has its own local-memory cache. Cached availability is keyed
+by a version row in the database, so a booking made through one worker
+is seen by the others on their next request.
+
+Under WSGI the stream degrades to one event per reconnect (polling).
+The polling JSON APIs (/api/availability/, /api/check_zone_availability/)
+are async views too, so one ASGI server can serve them next to the stream.
+They are not faster under ASGI: ``python manage.py benchmark_asgi`` shows
+WSGI at roughly 2.5x the requests per second and no memory saving per
+connection under ASGI. Only the long-lived stream benefits from ASGI.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
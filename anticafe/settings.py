@@ -19,10 +19,6 @@ from pathlib import Path
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-STATIC_URL = '/static/'
-STATICFILES_DIRS = [
-    os.path.join(BASE_DIR, 'main', 'static'),
-]
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -30,9 +26,10 @@ STATICFILES_DIRS = [
 SECRET_KEY = 'django-insecure-#27bo*z(*z1hr65diua%_kmlffb9qjffe42w(_92)5fll846t2'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DJANGO_DEBUG=0 включает режим продакшена: статика из STATIC_ROOT (manage.py build_static)
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -46,6 +43,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Статика отвечает раньше замеров, чтобы не попадать в гистограммы;
+    # сжатие ответа входит во время запроса
+    'main.assets.StaticAssetsMiddleware',
+    'main.instrumentation.RequestMetricsMiddleware',
+    'main.assets.CompressedPagesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,11 +86,66 @@ WSGI_APPLICATION = 'anticafe.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DJANGO_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        # Тестовая база в файле: многопоточным тестам нужны отдельные соединения
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# Профиль SQLite для продакшена (по умолчанию при DJANGO_DEBUG=0, явно -
+# DJANGO_SQLITE_PROFILE=production). WAL: чтение не ждет записи и не мешает
+# ей. BEGIN IMMEDIATE: транзакция берет блокировку записи в начале и ждет ее
+# до timeout секунд, а не получает "database is locked" посреди работы.
+# Не дождавшиеся повторяет retry_on_lock (main/sqlite.py), всего не дольше
+# RETRY_BUDGET секунд, поэтому timeout небольшой.
+# Соединение живет CONN_MAX_AGE секунд, и прагмы не выполняются на каждый
+# запрос. Нагрузка на запись: python manage.py stress_sqlite
+SQLITE_PROFILE = os.environ.get('DJANGO_SQLITE_PROFILE', 'development' if DEBUG else 'production')
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # В WAL режим NORMAL не портит базу при сбое, теряются лишь последние коммиты
+    'synchronous': 'NORMAL',
+    # Отрицательное значение - в КБ: 64 МБ страничного кэша на соединение
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRODUCTION = {
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 5,
+    },
+}
+if SQLITE_PROFILE == 'production':
+    DATABASES['default'].update(SQLITE_PRODUCTION)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Кэш у каждого процесса сервера свой. Снимок доступности и сводки личного
+# кабинета хранятся под версией данных из БД (main.models.AvailabilityVersion),
+# поэтому при нескольких процессах они не устаревают: каждый процесс лишь
+# собирает свою копию
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'anticafe',
     }
 }
 
 
+# Вход по имени пользователя или email (main/backends.py)
+AUTHENTICATION_BACKENDS = [
+    'main.backends.EmailOrUsernameBackend',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -124,6 +181,19 @@ USE_I18N = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Без DEBUG имена статики содержат хеш содержимого, а сжатые копии
+# готовятся при сборке (main/assets.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'main.assets.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -136,3 +206,32 @@ LOGOUT_REDIRECT_URL = '/'
 
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 1209600  # 2 недели
+
+# Замеры запросов: время этапов, количество SQL-запросов, журнал медленных
+# запросов в админке и гистограммы по представлениям (/api/profiling/,
+# manage.py view_percentiles). По умолчанию выключены, включаются
+# REQUEST_METRICS=1; доля замеряемых запросов - REQUEST_METRICS_SAMPLE_RATE
+REQUEST_METRICS = {
+    'ENABLED': os.environ.get('REQUEST_METRICS') == '1',
+    'SLOW_MS': 500,
+    'BUFFER_SIZE': 100,
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', '1.0')),
+    'FLUSH_SECONDS': 30,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'main': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
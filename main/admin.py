@@ -1,8 +1,27 @@
+import io
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Zone, Booking, UserProfile, ContactMessage
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from .models import Zone, Booking, UserProfile, ContactMessage, DailyZoneStats, ACTIVE_STATUSES
+from .exports import EXPORT_FORMATS, export_filename, export_lines
+from .forms import BookingImportForm
+from .imports import import_bookings, read_rows
+from .instrumentation import get_config as get_metrics_config, slow_requests
+from .occupancy import affected_ranges, refresh_ranges
+from .snapshot import invalidate_availability
+from .sqlite import retry_on_lock
+from .stats import parse_period, stats_report
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils import timezone
+from django.utils.html import format_html
 
 # Inline для профиля пользователя
 class UserProfileInline(admin.StackedInline):
@@ -24,10 +43,30 @@ class CustomUserAdmin(UserAdmin):
         ('Важные даты', {'fields': ('last_login', 'date_joined')}),
     )
     
+    # Точное число пользователей в шапке списка требует отдельного COUNT по всей таблице
+    show_full_result_count = False
+    
+    def get_inline_instances(self, request, obj=None):
+        # При добавлении пользователя профиль создает сигнал, второй из inline не нужен
+        if obj is None:
+            return []
+        return super().get_inline_instances(request, obj)
+    
+    def get_queryset(self, request):
+        # Коррелированный подзапрос считается только для строк текущей
+        # страницы и не мешает COUNT(*) для пагинации
+        bookings = Booking.objects.filter(user=OuterRef('pk')).order_by().values('user').annotate(
+            total=Count('*'),
+        ).values('total')
+        return super().get_queryset(request).annotate(
+            booking_total=Coalesce(Subquery(bookings), 0),
+        )
+    
     def booking_count(self, obj):
         """Количество бронирований пользователя"""
-        return Booking.objects.filter(user=obj).count()
+        return obj.booking_total
     booking_count.short_description = 'Бронирований'
+    booking_count.admin_order_field = 'booking_total'
 
 # Регистрация в админке
 admin.site.unregister(User)
@@ -46,14 +85,30 @@ class ZoneAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description')
     readonly_fields = ('current_available_seats', 'availability_status', 'booking_count')
     
+    def get_queryset(self, request):
+        # Количество броней и текущая загрузка считаются одним GROUP BY
+        now = timezone.now()
+        occupied_now = Q(
+            bookings__status__in=ACTIVE_STATUSES,
+            bookings__start_time__lte=now,
+            bookings__end_time__gte=now,
+        )
+        return super().get_queryset(request).annotate(
+            booking_total=Count('bookings'),
+            occupied_seats=Coalesce(Sum('bookings__number_of_people', filter=occupied_now), 0),
+        ).annotate(
+            available_seats=Greatest(F('capacity') - F('occupied_seats'), Value(0)),
+        )
+    
     def current_available_seats(self, obj):
         """Показывает свободные места на текущий момент"""
-        return f"{obj.get_available_seats()}/{obj.capacity}"
+        return f"{obj.available_seats}/{obj.capacity}"
     current_available_seats.short_description = 'Свободно/Всего'
+    current_available_seats.admin_order_field = 'available_seats'
     
     def availability_status(self, obj):
         """Показывает статус доступности"""
-        status = obj.get_availability_status()
+        status = obj.get_availability_status(obj.available_seats)
         if status == 'fully_booked':
             return '❌ Занято'
         elif status == 'partially_available':
@@ -61,11 +116,13 @@ class ZoneAdmin(admin.ModelAdmin):
         else:
             return '✅ Свободно'
     availability_status.short_description = 'Статус'
+    availability_status.admin_order_field = 'available_seats'
     
     def booking_count(self, obj):
         """Количество бронирований для этой зоны"""
-        return obj.bookings.count()
+        return obj.booking_total
     booking_count.short_description = 'Бронирований'
+    booking_count.admin_order_field = 'booking_total'
 
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
@@ -78,6 +135,7 @@ class ContactMessageAdmin(admin.ModelAdmin):
     def created_at_display(self, obj):
         return obj.created_at.strftime('%d.%m.%Y %H:%M')
     created_at_display.short_description = 'Дата отправки'
+    created_at_display.admin_order_field = 'created_at'
     
     def preview_message(self, obj):
         return obj.message[:50] + '...' if len(obj.message) > 50 else obj.message
@@ -95,48 +153,108 @@ class ContactMessageAdmin(admin.ModelAdmin):
         self.message_user(request, f'{updated} сообщений помечены как необработанные')
     mark_as_unprocessed.short_description = 'Пометить как необработанные'
 
+class BookingUserFilter(admin.SimpleListFilter):
+    """
+    Фильтр по пользователю без загрузки всех пользователей в боковую панель.
+
+    Конкретного пользователя выбирают ссылкой из колонки «Пользователь»
+    или поиском, в панели показываются только общие варианты.
+    """
+    title = 'Пользователь'
+    parameter_name = 'user'
+
+    def lookups(self, request, model_admin):
+        choices = [('guest', 'Гости'), ('registered', 'Зарегистрированные')]
+        value = self.value()
+        if value and value.isdigit():
+            user = User.objects.filter(pk=value).only('username').first()
+            if user:
+                choices.append((value, user.username))
+        return choices
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == 'guest':
+            return queryset.filter(user__isnull=True)
+        if value == 'registered':
+            return queryset.filter(user__isnull=False)
+        if value and value.isdigit():
+            return queryset.filter(user_id=value)
+        return queryset
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ('customer_name', 'customer_email', 'zone_display', 'user_display', 
-                    'start_time_display', 'end_time_display', 'status', 'total_price', 
-                    'is_active_now', 'created_at_display')
-    list_filter = ('status', 'zone', 'start_time', 'created_at', 'user')
+                    'start_time_display', 'end_time_display', 'status', 'duration',
+                    'total_price', 'is_active_now', 'created_at_display')
+    list_filter = ('status', 'zone', 'start_time', 'created_at', BookingUserFilter)
+    list_select_related = ('zone', 'user')
     search_fields = ('customer_name', 'customer_phone', 'customer_email', 'zone__title', 'user__username')
+    autocomplete_fields = ('zone', 'user')
     list_editable = ('status',)
     readonly_fields = ('created_at', 'total_price_display', 'duration_display', 'is_active_now_display')
     date_hierarchy = 'created_at'
-    actions = ['confirm_selected', 'cancel_selected', 'mark_as_pending', 'mark_as_completed']
+    actions = ['confirm_selected', 'cancel_selected', 'mark_as_pending', 'mark_as_completed',
+               'export_csv', 'export_jsonl']
+    
+    def get_queryset(self, request):
+        # Длительность и стоимость считаются в БД, чтобы по ним можно было сортировать
+        return super().get_queryset(request).with_price()
+    
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        # Итоги по отфильтрованному списку одним агрегирующим запросом
+        context = getattr(response, 'context_data', None)
+        if context and 'cl' in context:
+            context['totals'] = context['cl'].queryset.totals()
+        return response
     
     # Методы для красивого отображения
     def zone_display(self, obj):
         return obj.zone.title
     zone_display.short_description = 'Зона'
+    zone_display.admin_order_field = 'zone__title'
     
     def user_display(self, obj):
         if obj.user:
-            return f"{obj.user.username} ({obj.user.get_full_name()})"
+            # Ссылка отбирает бронирования этого пользователя
+            return format_html(
+                '<a href="?{}={}">{} ({})</a>',
+                BookingUserFilter.parameter_name, obj.user_id, obj.user.username, obj.user.get_full_name(),
+            )
         return "Гость"
     user_display.short_description = 'Пользователь'
+    user_display.admin_order_field = 'user__username'
     
     def start_time_display(self, obj):
         return obj.start_time.strftime('%d.%m.%Y %H:%M')
     start_time_display.short_description = 'Начало'
+    start_time_display.admin_order_field = 'start_time'
     
     def end_time_display(self, obj):
         return obj.end_time.strftime('%d.%m.%Y %H:%M')
     end_time_display.short_description = 'Окончание'
+    end_time_display.admin_order_field = 'end_time'
     
     def created_at_display(self, obj):
         return obj.created_at.strftime('%d.%m.%Y %H:%M')
     created_at_display.short_description = 'Создано'
+    created_at_display.admin_order_field = 'created_at'
     
     def is_active_now(self, obj):
         return '✅' if obj.is_active_now() else '❌'
     is_active_now.short_description = 'Активно сейчас'
     
+    def duration(self, obj):
+        return f"{obj.duration_hours} ч."
+    duration.short_description = 'Длительность'
+    duration.admin_order_field = 'duration_hours'
+    
     def total_price(self, obj):
-        return f"{obj.get_total_price()} руб."
+        return f"{obj.total_price} руб."
     total_price.short_description = 'Стоимость'
+    total_price.admin_order_field = 'total_price'
     
     # Поля для просмотра
     def total_price_display(self, obj):
@@ -163,26 +281,101 @@ class BookingAdmin(admin.ModelAdmin):
     is_active_now_display.short_description = 'Текущий статус'
     
     # Групповые действия
+    @retry_on_lock()
+    def _update_status(self, queryset, status):
+        # Статусы и почасовая загрузка меняются одной транзакцией, которую
+        # можно повторить, если база занята
+        with transaction.atomic():
+            ranges = affected_ranges(queryset)
+            updated = queryset.update(status=status, updated_at=timezone.now())
+            # queryset.update() не отправляет сигналы, почасовую загрузку
+            # и версию доступности (по ней сбрасываются снимок и сводки)
+            # обновляем вручную
+            refresh_ranges(ranges)
+            invalidate_availability()
+        return updated
+    
     def confirm_selected(self, request, queryset):
-        updated = queryset.update(status='confirmed')
+        updated = self._update_status(queryset, 'confirmed')
         self.message_user(request, f'{updated} бронирований подтверждено')
     confirm_selected.short_description = 'Подтвердить выбранные'
     
     def cancel_selected(self, request, queryset):
-        updated = queryset.update(status='cancelled')
+        updated = self._update_status(queryset, 'cancelled')
         self.message_user(request, f'{updated} бронирований отменено')
     cancel_selected.short_description = 'Отменить выбранные'
     
     def mark_as_pending(self, request, queryset):
-        updated = queryset.update(status='pending')
+        updated = self._update_status(queryset, 'pending')
         self.message_user(request, f'{updated} бронирований помечены как "ожидание"')
     mark_as_pending.short_description = 'Вернуть в ожидание'
     
     def mark_as_completed(self, request, queryset):
-        updated = queryset.update(status='completed')
+        updated = self._update_status(queryset, 'completed')
         self.message_user(request, f'{updated} бронирований отмечены как завершенные')
     mark_as_completed.short_description = 'Отметить как завершенные'
     
+    # Выгрузка для бухгалтерии
+    def _export(self, queryset, export_format):
+        content_type = EXPORT_FORMATS[export_format][0]
+        response = StreamingHttpResponse(export_lines(queryset, export_format), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(export_format)}"'
+        return response
+    
+    def export_csv(self, request, queryset):
+        return self._export(queryset, 'csv')
+    export_csv.short_description = 'Выгрузить в CSV'
+    
+    def export_jsonl(self, request, queryset):
+        return self._export(queryset, 'jsonl')
+    export_jsonl.short_description = 'Выгрузить в JSON Lines'
+    
+    # Массовая загрузка из файла
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='main_booking_import'),
+            path('slow-requests/', self.admin_site.admin_view(self.slow_requests_view),
+                 name='main_booking_slow_requests'),
+        ]
+        return urls + super().get_urls()
+    
+    def import_view(self, request):
+        """Импорт бронирований из CSV или JSON Lines с отчетом об отклоненных строках"""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        result = None
+        form = BookingImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            result = import_bookings(
+                read_rows(stream, form.cleaned_data['format']), dry_run=form.cleaned_data['dry_run'],
+            )
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Импорт бронирований',
+            'opts': self.model._meta,
+            'form': form,
+            'result': result,
+            'rejected': result.rejected[:100] if result else [],
+        }
+        return TemplateResponse(request, 'admin/main/booking/import.html', context)
+    
+    def slow_requests_view(self, request):
+        """Последние медленные запросы текущего процесса с разбивкой по этапам"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        if request.method == 'POST':
+            slow_requests.clear()
+            return redirect('admin:main_booking_slow_requests')
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Медленные запросы',
+            'opts': self.model._meta,
+            'config': get_metrics_config(),
+            'entries': slow_requests.entries(),
+        }
+        return TemplateResponse(request, 'admin/main/booking/slow_requests.html', context)
+    
     # Дополнительная информация в админке
     fieldsets = (
         ('Информация о клиенте', {
@@ -207,6 +400,53 @@ class BookingAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(DailyZoneStats)
+class DailyZoneStatsAdmin(admin.ModelAdmin):
+    """Дневные итоги только для просмотра: их собирает команда rollup_daily_stats"""
+    list_display = ('date', 'zone', 'bookings', 'cancelled', 'cancellation_rate_display',
+                    'people_hours_display', 'revenue', 'stale')
+    list_filter = ('zone', 'stale')
+    list_select_related = ('zone',)
+    date_hierarchy = 'date'
+    change_list_template = 'admin/main/dailyzonestats/change_list.html'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_urls(self):
+        urls = [
+            path('dashboard/', self.admin_site.admin_view(self.dashboard_view), name='main_dailyzonestats_dashboard'),
+        ]
+        return urls + super().get_urls()
+    
+    def dashboard_view(self, request):
+        """Выручка и загрузка за период по зонам и по дням"""
+        try:
+            start_date, end_date = parse_period(request.GET)
+        except ValueError:
+            start_date, end_date = parse_period({})
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Статистика посещений и доходов',
+            'opts': self.model._meta,
+            'start_date': start_date,
+            'end_date': end_date,
+            'report': stats_report(start_date, end_date),
+        }
+        return TemplateResponse(request, 'admin/main/dailyzonestats/dashboard.html', context)
+    
+    def cancellation_rate_display(self, obj):
+        return f"{obj.cancellation_rate:.0%}"
+    cancellation_rate_display.short_description = 'Доля отмен'
+    
+    def people_hours_display(self, obj):
+        return f"{obj.people_hours:.1f}"
+    people_hours_display.short_description = 'Человеко-часов'
+    people_hours_display.admin_order_field = 'people_hours'
+
 # Кастомный заголовок админки
 admin.site.site_header = 'Администрирование антикафе "Чилл"'
 admin.site.site_title = 'Антикафе "Чилл"'
@@ -0,0 +1,211 @@
+"""
+Статические файлы для продакшена: имена с хешем содержимого, заранее
+сжатые копии (.gz и, если установлен brotli, .br) и раздача с
+долгим кэшированием.
+
+Собираются командой build_static. В режиме DEBUG статику по-прежнему
+раздает runserver. Страницы и JSON сжимаются при ответе.
+"""
+import gzip
+import mimetypes
+import os
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.middleware.gzip import GZipMiddleware
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Сторонние библиотеки, которые раньше подключались с CDN. Файлы
+# скачиваются командой build_static в main/static/vendor/
+VENDOR_FILES = {
+    'vendor/bootstrap/css/bootstrap.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/css/bootstrap.min.css.map':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css.map',
+    'vendor/bootstrap/js/bootstrap.bundle.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'vendor/bootstrap/js/bootstrap.bundle.min.js.map':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js.map',
+    'vendor/bootstrap-icons/bootstrap-icons.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.0/font/bootstrap-icons.css',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff2':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.0/font/fonts/bootstrap-icons.woff2',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.0/font/fonts/bootstrap-icons.woff',
+}
+VENDOR_DIR = Path(__file__).resolve().parent / 'static'
+
+# Текстовые форматы, которые имеет смысл сжимать (woff2, jpg и png уже сжаты)
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ico', '.ttf', '.eot', '.woff')
+# Файлы меньше порога сжатие почти не уменьшает
+MIN_COMPRESS_SIZE = 512
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+SHORT_CACHE = 'public, max-age=300'
+
+
+def missing_vendor_files():
+    return [name for name in VENDOR_FILES if not (VENDOR_DIR / name).exists()]
+
+
+def vendor_url(name):
+    """
+    URL файла сторонней библиотеки: своя копия, а пока она не скачана
+    (или не попала в манифест сборки) - та же версия на CDN, чтобы
+    страницы не оставались без стилей.
+    """
+    if isinstance(staticfiles_storage, ManifestStaticFilesStorage):
+        try:
+            return staticfiles_storage.url(name)
+        except ValueError:
+            return VENDOR_FILES[name]
+    if (VENDOR_DIR / name).exists():
+        return staticfiles_storage.url(name)
+    return VENDOR_FILES[name]
+
+
+def _compress(path):
+    """
+    Пишет рядом с файлом .gz и .br, если они меньше оригинала.
+    Возвращает список созданных путей.
+    """
+    with open(path, 'rb') as source:
+        data = source.read()
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data)))
+
+    created = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data) * 0.95:
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+            created.append(path + suffix)
+    return created
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage, который после расстановки хешей
+    сжимает текстовые файлы заранее: сервер отдает готовые .gz/.br,
+    не тратя время на сжатие при каждом запросе.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                processed_names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+
+        for name in sorted(processed_names):
+            path = self.path(name)
+            if name.endswith(COMPRESSIBLE) and os.path.getsize(path) >= MIN_COMPRESS_SIZE:
+                _compress(path)
+
+
+class StaticAssetsMiddleware:
+    """
+    Раздает собранную статику из STATIC_ROOT, когда DEBUG выключен.
+
+    Выбирает сжатую копию по Accept-Encoding. Файлы с хешем в имени
+    кэшируются браузером на год без перепроверки (immutable), остальные -
+    на несколько минут с проверкой по Last-Modified.
+
+    Поддерживает и ASGI: иначе каждый запрос к API переключался бы в поток
+    ради синхронного middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT or not os.path.isdir(settings.STATIC_ROOT):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.root = str(settings.STATIC_ROOT)
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        # Имена с хешем из манифеста; без манифеста долгого кэширования нет
+        self.immutable = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        found = self._find(request)
+        if found is None:
+            return self.get_response(request)
+        return self._serve(request, *found)
+
+    async def __acall__(self, request):
+        found = self._find(request)
+        if found is None:
+            return await self.get_response(request)
+        return await sync_to_async(self._serve, thread_sensitive=False)(request, *found)
+
+    def _find(self, request):
+        """Имя и путь файла статики или None, если запрос не к ней"""
+        if not request.path.startswith(self.prefix) or request.method not in ('GET', 'HEAD'):
+            return None
+        name = request.path[len(self.prefix):]
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        return name, path
+
+    def _serve(self, request, name, path):
+        stat = os.stat(path)
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(path)
+            encoding, served = self._variant(request, path)
+            response = FileResponse(open(served, 'rb'), content_type=content_type or 'application/octet-stream')
+            # FileResponse подставляет имя файла, а для .gz оно было бы неверным
+            del response['Content-Disposition']
+            if encoding:
+                response['Content-Encoding'] = encoding
+            if name.endswith(COMPRESSIBLE):
+                response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = IMMUTABLE_CACHE if name in self.immutable else SHORT_CACHE
+        return response
+
+    def _variant(self, request, path):
+        accepted = request.headers.get('Accept-Encoding', '')
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if encoding in accepted and os.path.isfile(path + suffix):
+                return encoding, path + suffix
+        return None, path
+
+
+class CompressedPagesMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware только для обычных ответов: страниц и JSON.
+
+    Потоковые ответы пропускаются: статика уже сжата при сборке, а
+    события availability_stream нельзя задерживать в буфере компрессора.
+    Защита от BREACH (случайные байты в заголовке gzip) остается от
+    GZipMiddleware.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming:
+            return response
+        return super().process_response(request, response)
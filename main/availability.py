@@ -0,0 +1,132 @@
+"""Расчет загрузки зон методом заметающей прямой"""
+from bisect import bisect_left
+
+
+
+def peak_occupancy(intervals, window_start=None, window_end=None):
+    """
+    Возвращает максимальное число одновременно занятых мест.
+
+    intervals - итерируемый набор кортежей (начало, конец, количество человек).
+    Интервалы обрезаются по окну [window_start, window_end). Бронирования,
+    которые стыкуются концом к началу, одновременно не учитываются.
+    Сложность O(n log n).
+    """
+    events = []
+    for start, end, people in intervals:
+        if window_start is not None and start < window_start:
+            start = window_start
+        if window_end is not None and end > window_end:
+            end = window_end
+        if start < end:
+            events.append((start, people))
+            events.append((end, -people))
+
+    # При равном времени освобождение (-people) идет раньше занятия
+    events.sort()
+
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        if current > peak:
+            peak = current
+    return peak
+
+
+def peak_occupancy_by_zone(rows, window_start=None, window_end=None):
+    """
+    Группирует строки (id зоны, начало, конец, количество человек)
+    по зонам и возвращает словарь {id зоны: пиковая загрузка}.
+    """
+    intervals_by_zone = {}
+    for zone_id, start, end, people in rows:
+        intervals_by_zone.setdefault(zone_id, []).append((start, end, people))
+
+    return {
+        zone_id: peak_occupancy(intervals, window_start, window_end)
+        for zone_id, intervals in intervals_by_zone.items()
+    }
+
+
+def min_free_seats(capacity, intervals, window_start=None, window_end=None):
+    """Минимальное количество свободных мест в окне"""
+    return max(0, capacity - peak_occupancy(intervals, window_start, window_end))
+
+
+class OccupancyTree:
+    """
+    Дерево отрезков для загрузки одной зоны: прибавление мест на интервале
+    и максимум загрузки на интервале за O(log n).
+
+    points - все моменты, которыми могут начинаться и заканчиваться
+    интервалы. Лист i соответствует отрезку [points[i], points[i + 1]).
+    """
+
+    def __init__(self, points):
+        self.points = sorted(set(points))
+        self.size = max(1, len(self.points) - 1)
+        self.height = self.size.bit_length()
+        self.tree = [0] * (2 * self.size)
+        self.pending = [0] * self.size
+
+    def _leaves(self, start, end):
+        return bisect_left(self.points, start), bisect_left(self.points, end)
+
+    def _apply(self, node, value):
+        self.tree[node] += value
+        if node < self.size:
+            self.pending[node] += value
+
+    def _rebuild(self, node):
+        while node > 1:
+            node >>= 1
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1]) + self.pending[node]
+
+    def _push(self, node):
+        for shift in range(self.height, 0, -1):
+            parent = node >> shift
+            if parent and self.pending[parent]:
+                self._apply(2 * parent, self.pending[parent])
+                self._apply(2 * parent + 1, self.pending[parent])
+                self.pending[parent] = 0
+
+    def add(self, start, end, people):
+        """Занимает people мест на интервале [start, end)"""
+        left, right = self._leaves(start, end)
+        if left >= right:
+            return
+        left += self.size
+        right += self.size
+        first, last = left, right - 1
+        while left < right:
+            if left & 1:
+                self._apply(left, people)
+                left += 1
+            if right & 1:
+                right -= 1
+                self._apply(right, people)
+            left >>= 1
+            right >>= 1
+        self._rebuild(first)
+        self._rebuild(last)
+
+    def peak(self, start, end):
+        """Максимальная загрузка на интервале [start, end)"""
+        left, right = self._leaves(start, end)
+        if left >= right:
+            return 0
+        left += self.size
+        right += self.size
+        self._push(left)
+        self._push(right - 1)
+        result = 0
+        while left < right:
+            if left & 1:
+                result = max(result, self.tree[left])
+                left += 1
+            if right & 1:
+                right -= 1
+                result = max(result, self.tree[right])
+            left >>= 1
+            right >>= 1
+        return result
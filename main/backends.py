@@ -0,0 +1,42 @@
+"""Вход по имени пользователя или email"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    """
+    Принимает в поле username имя пользователя или email.
+
+    Пользователь ищется одним запросом: по уникальному индексу username
+    и по индексу auth_user_email_lower_idx на LOWER(email). Совпадение
+    имени важнее совпадения email. Email, который указан у нескольких
+    пользователей, для входа не подходит - нельзя понять, кто входит.
+    Пароль проверяется один раз.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        condition = Q(**{UserModel.USERNAME_FIELD: username})
+        if '@' in username:
+            condition |= Q(email_lower=username.lower())
+        candidates = list(UserModel._default_manager.alias(email_lower=Lower('email')).filter(condition)[:3])
+
+        user = next((candidate for candidate in candidates if candidate.get_username() == username), None)
+        if user is None and len(candidates) == 1:
+            user = candidates[0]
+
+        if user is None:
+            # Хешируем пароль и для несуществующего пользователя, чтобы
+            # время ответа не выдавало, есть ли такой логин
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,10 @@
+"""
+Воспроизводимые замеры производительности: генератор синтетических
+данных (dataset), замер и сравнение результатов (runner) и набор
+горячих путей (suite). Запускаются командой run_benchmarks.
+"""
+from .dataset import DatasetSpec, generate_dataset
+from .runner import BenchmarkError, measure, percentile
+from .suite import BENCHMARKS, build_context
+
+__all__ = ['DatasetSpec', 'generate_dataset', 'BenchmarkError', 'measure', 'percentile', 'BENCHMARKS', 'build_context']
@@ -0,0 +1,239 @@
+"""
+Генератор синтетических данных для бенчмарков.
+
+Бронирования распределены по часам и дням недели как в реальном
+антикафе: утром пусто, пик вечером и в выходные. Постоянные гости
+бронируют чаще остальных. Вместимость зон соблюдается: бронь, которой
+не хватает мест, генерируется заново на другое время.
+"""
+import math
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from ..models import Zone, Booking, UserProfile
+
+SLOT = timedelta(minutes=30)
+
+# Вес часа начала брони (местное время); антикафе работает с 9 до 23
+HOUR_WEIGHTS = {
+    9: 2, 10: 3, 11: 4, 12: 6, 13: 6, 14: 5, 15: 5, 16: 6,
+    17: 8, 18: 10, 19: 10, 20: 8, 21: 5, 22: 2,
+}
+CLOSING_HOUR = 23
+# Пятница и выходные загружены сильнее (понедельник - 0)
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.1, 1.4, 1.7, 1.5]
+# Длительность в получасах: чаще всего 1-2 часа
+DURATION_WEIGHTS = {2: 30, 3: 12, 4: 28, 5: 8, 6: 12, 8: 10}
+PARTY_WEIGHTS = {1: 30, 2: 35, 3: 15, 4: 12, 5: 5, 6: 3}
+PAST_STATUSES = {'completed': 88, 'cancelled': 12}
+FUTURE_STATUSES = {'confirmed': 80, 'pending': 12, 'cancelled': 8}
+# Доля броней зарегистрированных пользователей
+REGISTERED_SHARE = 0.7
+# За сколько дней до начала обычно бронируют
+MAX_LEAD_DAYS = 14
+
+ZONE_TITLE = 'Бенчмарк {seed}-{number}'
+USERNAME = 'bench_{seed}_{number}'
+
+
+@dataclass
+class DatasetSpec:
+    zones: int = 10
+    users: int = 1000
+    bookings: int = 100000
+    days_back: int = 90
+    days_ahead: int = 30
+    seed: int = 42
+    batch_size: int = 5000
+
+
+@dataclass
+class Dataset:
+    spec: DatasetSpec
+    zones: list = field(default_factory=list)
+    user_ids: list = field(default_factory=list)
+    bookings: int = 0
+    skipped: int = 0
+
+
+class _Choice:
+    """Быстрый взвешенный выбор с заранее накопленными весами"""
+
+    def __init__(self, weights):
+        self.values = list(weights)
+        self.cum_weights = list(accumulate(weights.values()))
+
+    def __call__(self, rng):
+        return rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+
+@contextmanager
+def explicit_timestamps(model, *names):
+    """
+    Временно отключает auto_now/auto_now_add, чтобы bulk_create записал
+    заданные created_at и updated_at, а не текущее время.
+    """
+    model_fields = [model._meta.get_field(name) for name in names]
+    saved = [(model_field.auto_now, model_field.auto_now_add) for model_field in model_fields]
+    for model_field in model_fields:
+        model_field.auto_now = model_field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for model_field, (auto_now, auto_now_add) in zip(model_fields, saved):
+            model_field.auto_now, model_field.auto_now_add = auto_now, auto_now_add
+
+
+def _capacities(spec, rng):
+    """
+    Вместимость зон под заданный объем: средняя загрузка в вечерний пик
+    не больше двух третей мест, поэтому большинство броней помещается.
+    """
+    days = spec.days_back + spec.days_ahead
+    per_zone_day = spec.bookings / max(1, spec.zones * days)
+    mean_hours = sum(slots * weight for slots, weight in DURATION_WEIGHTS.items()) / sum(DURATION_WEIGHTS.values()) / 2
+    mean_party = sum(size * weight for size, weight in PARTY_WEIGHTS.items()) / sum(PARTY_WEIGHTS.values())
+    peak_share = max(HOUR_WEIGHTS.values()) / sum(HOUR_WEIGHTS.values()) * max(WEEKDAY_WEIGHTS)
+    peak_seats = per_zone_day * peak_share * mean_hours * mean_party
+    base = max(max(PARTY_WEIGHTS), math.ceil(peak_seats * 1.5))
+    return [max(max(PARTY_WEIGHTS), round(base * rng.uniform(0.6, 1.4))) for _ in range(spec.zones)]
+
+
+def create_zones(spec, rng):
+    zones = [
+        Zone(
+            title=ZONE_TITLE.format(seed=spec.seed, number=number),
+            description='Зона для бенчмарка',
+            price_per_hour=rng.choice([150, 200, 250, 300, 400, 500]),
+            capacity=capacity,
+        )
+        for number, capacity in enumerate(_capacities(spec, rng))
+    ]
+    return Zone.objects.bulk_create(zones)
+
+
+def create_users(spec):
+    """Пользователи с одним заранее посчитанным хешем пароля и профилями"""
+    password = make_password('benchmark')
+    now = timezone.now()
+    users = User.objects.bulk_create([
+        User(
+            username=USERNAME.format(seed=spec.seed, number=number),
+            email=f'bench{number}@example.com',
+            first_name='Гость',
+            last_name=str(number),
+            password=password,
+            date_joined=now,
+        )
+        for number in range(spec.users)
+    ], batch_size=spec.batch_size)
+    # bulk_create не отправляет post_save, профили создаются здесь же
+    UserProfile.objects.bulk_create(
+        [UserProfile(user=user) for user in users], batch_size=spec.batch_size,
+    )
+    return [user.id for user in users]
+
+
+def _booking_rows(spec, rng, zones, user_ids, now, dataset):
+    """Бронирования по одному с проверкой вместимости по получасам"""
+    local_now = timezone.localtime(now)
+    origin = timezone.make_aware(datetime.combine(
+        local_now.date() - timedelta(days=spec.days_back), time(0, 0)
+    ))
+    days = spec.days_back + spec.days_ahead
+    slots_per_day = 48
+
+    day_weights = {}
+    for day in range(days):
+        day_weights[day] = WEEKDAY_WEIGHTS[(origin + timedelta(days=day)).weekday()]
+    pick_day = _Choice(day_weights)
+    pick_hour = _Choice(HOUR_WEIGHTS)
+    pick_duration = _Choice(DURATION_WEIGHTS)
+    pick_party = _Choice(PARTY_WEIGHTS)
+    pick_past_status = _Choice(PAST_STATUSES)
+    pick_future_status = _Choice(FUTURE_STATUSES)
+    # Постоянные гости: вероятность пропорциональна 1 / ранг
+    pick_user = _Choice({user_id: 1 / (rank + 1) for rank, user_id in enumerate(user_ids)}) if user_ids else None
+    pick_zone = _Choice({index: zone.capacity for index, zone in enumerate(zones)})
+
+    # Занято мест по получасам для каждой зоны
+    occupancy = [[0] * (days * slots_per_day) for _ in zones]
+
+    for _ in range(spec.bookings):
+        for _attempt in range(5):
+            index = pick_zone(rng)
+            zone = zones[index]
+            day = pick_day(rng)
+            hour = pick_hour(rng)
+            first = day * slots_per_day + hour * 2 + rng.randrange(2)
+            duration = min(pick_duration(rng), day * slots_per_day + CLOSING_HOUR * 2 - first)
+            people = pick_party(rng)
+            start = origin + SLOT * first
+            end = start + SLOT * duration
+            status = pick_past_status(rng) if end <= now else pick_future_status(rng)
+
+            slots = occupancy[index]
+            if status != 'cancelled':
+                if max(slots[first:first + duration]) + people > zone.capacity:
+                    continue
+                for slot in range(first, first + duration):
+                    slots[slot] += people
+            break
+        else:
+            dataset.skipped += 1
+            continue
+
+        created_at = max(origin, start - timedelta(days=rng.random() * MAX_LEAD_DAYS))
+        created_at = min(created_at, now)
+        user_id = pick_user(rng) if pick_user and rng.random() < REGISTERED_SHARE else None
+        yield Booking(
+            zone_id=zone.id,
+            user_id=user_id,
+            customer_name='Гость' if user_id is None else f'Гость {user_id}',
+            customer_phone='+70000000000',
+            customer_email='guest@example.com',
+            number_of_people=people,
+            start_time=start,
+            end_time=end,
+            status=status,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+
+def generate_dataset(spec=None, progress=None):
+    """
+    Создает зоны, пользователей и бронирования через bulk_create пачками
+    по spec.batch_size. Память не растет с количеством бронирований.
+
+    Сигналы при этом не отправляются, поэтому почасовую загрузку и
+    дневные итоги нужно пересобрать (это делает команда run_benchmarks).
+    progress - необязательная функция, получающая число созданных броней.
+    """
+    spec = spec or DatasetSpec()
+    rng = random.Random(spec.seed)
+    dataset = Dataset(spec=spec)
+    dataset.zones = create_zones(spec, rng)
+    dataset.user_ids = create_users(spec)
+
+    now = timezone.now()
+    batch = []
+    with explicit_timestamps(Booking, 'created_at', 'updated_at'):
+        for booking in _booking_rows(spec, rng, dataset.zones, dataset.user_ids, now, dataset):
+            batch.append(booking)
+            if len(batch) >= spec.batch_size:
+                Booking.objects.bulk_create(batch)
+                dataset.bookings += len(batch)
+                batch = []
+                if progress:
+                    progress(dataset.bookings)
+        Booking.objects.bulk_create(batch)
+        dataset.bookings += len(batch)
+    return dataset
@@ -0,0 +1,131 @@
+"""Замер времени и количества SQL-запросов, сведения об окружении запуска"""
+import platform
+import subprocess
+import time
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class BenchmarkError(Exception):
+    """Замеряемая операция вернула неожиданный результат"""
+
+
+class QueryCounter:
+    """Обертка выполнения SQL: считает запросы независимо от DEBUG"""
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, percent):
+    """Перцентиль по рангу (nearest-rank) для отсортированного списка"""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(timings, queries):
+    """Сводка замеров: время в мс и число запросов на итерацию"""
+    timings = sorted(timings)
+    summary = {
+        'iterations': len(timings),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'min_ms': round(timings[0], 3),
+    }
+    for percent in PERCENTILES:
+        summary[f'p{percent}_ms'] = round(percentile(timings, percent), 3)
+    summary['max_ms'] = round(timings[-1], 3)
+    summary['queries_mean'] = round(sum(queries) / len(queries), 2)
+    summary['queries_max'] = max(queries)
+    return summary
+
+
+def measure(func, repeat=50, warmup=5):
+    """
+    Выполняет func warmup раз без замеров, затем repeat раз с замерами.
+
+    Прогрев заполняет кэши и соединение с БД, поэтому перцентили
+    описывают установившийся режим, а не первый запрос.
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.queries)
+    return summarize(timings, queries)
+
+
+@contextmanager
+def rolled_back():
+    """Транзакция, изменения которой отменяются при выходе"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def git_commit():
+    """Текущий коммит и признак незакоммиченных изменений, если доступен git"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return {'commit': commit, 'dirty': bool(dirty)}
+
+
+def environment():
+    """Сведения о запуске, без которых результаты нельзя сравнивать"""
+    return {
+        'started_at': timezone.now().isoformat(),
+        'git': git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'database': {
+            'vendor': connection.vendor,
+            'version': '.'.join(map(str, connection.get_database_version())),
+        },
+        'debug': settings.DEBUG,
+    }
+
+
+def compare(previous, current):
+    """
+    Сравнение двух запусков по p50 и p95: для каждого общего бенчмарка
+    значения до и после и изменение в процентах.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        before = previous.get('results', {}).get(name)
+        if not before:
+            continue
+        row = {'name': name}
+        for key in ('p50_ms', 'p95_ms', 'queries_mean'):
+            old, new = before.get(key), result.get(key)
+            change = round((new - old) / old * 100, 1) if old else None
+            row[key] = (old, new, change)
+        rows.append(row)
+    return rows
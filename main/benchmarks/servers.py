@@ -0,0 +1,279 @@
+"""
+Нагрузка опросом API доступности на обработчики WSGI и ASGI.
+
+Серверы (gunicorn, uvicorn) не нужны: клиенты вызывают WSGIHandler и
+ASGIHandler Django напрямую, как это делал бы сервер. Под WSGI каждое
+соединение занимает поток, как в потоковом сервере; под ASGI соединение -
+это задача asyncio в одном потоке. Клиенты повторяют запросы с
+If-None-Match, как страница бронирования при опросе.
+
+Память на соединение - прирост RSS процесса во время нагрузки,
+деленный на число клиентов, поэтому каждый режим запускают в отдельном
+процессе (это делает команда benchmark_asgi).
+"""
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.urls import reverse
+from django.utils import timezone
+
+from ..profiling import BUCKET_COUNT, bucket_index, histogram_percentile
+
+MODES = ('wsgi', 'asgi')
+HOST = 'testserver'
+
+
+def rss_kb():
+    """Текущий RSS процесса в КБ или None, если /proc недоступен (не Linux)"""
+    try:
+        with open('/proc/self/statm') as stream:
+            pages = int(stream.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+class MemorySampler(threading.Thread):
+    """Фоновый поток, запоминающий пиковые RSS и число потоков"""
+
+    def __init__(self, interval=0.02):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_rss = rss_kb()
+        self.peak_threads = threading.active_count()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = rss_kb()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss, rss)
+        self.peak_threads = max(self.peak_threads, threading.active_count())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self._sample()
+
+
+def polling_targets(zone_ids):
+    """
+    Адреса, которые опрашивает открытая страница бронирования каждой зоны:
+    общая доступность, загрузка зоны сейчас и на выбранный вечер.
+    """
+    evening = timezone.make_aware(datetime.combine(
+        timezone.localdate() + timedelta(days=1), datetime.min.time(),
+    )) + timedelta(hours=18)
+    interval = urlencode({
+        'start_time': evening.isoformat(),
+        'end_time': (evening + timedelta(hours=2)).isoformat(),
+        'number_of_people': 2,
+    })
+    targets = []
+    for zone_id in zone_ids:
+        url = reverse('check_zone_availability', args=[zone_id])
+        targets.append([reverse('availability_api'), url, f'{url}?{interval}'])
+    return targets
+
+
+class PollStats:
+    """Итоги клиентов режима; гистограмма задержек не растет с числом запросов"""
+
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.histogram = [0] * BUCKET_COUNT
+        self.max_ms = 0.0
+
+    def record(self, status, elapsed_ms):
+        self.requests += 1
+        if status == 304:
+            self.not_modified += 1
+        elif status != 200:
+            self.errors += 1
+        self.histogram[bucket_index(elapsed_ms)] += 1
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+
+class PollingClient:
+    """Клиент, по кругу опрашивающий адреса своей зоны и помнящий их ETag"""
+
+    def __init__(self, number, targets, stats):
+        # Клиенты распределены по зонам, чтобы нагрузка была смешанной
+        self.targets = targets[number % len(targets)]
+        self.stats = stats
+        self.etags = {}
+        self.position = 0
+
+    def next_request(self):
+        target = self.targets[self.position % len(self.targets)]
+        self.position += 1
+        path, _, query = target.partition('?')
+        headers = {'Accept-Encoding': 'gzip'}
+        if target in self.etags:
+            headers['If-None-Match'] = self.etags[target]
+        return target, path, query, headers
+
+    def done(self, target, status, headers, started):
+        self.stats.record(status, (time.perf_counter() - started) * 1000)
+        etag = headers.get('etag')
+        if etag:
+            self.etags[target] = etag
+
+
+def _wsgi_client(handler, client, deadline):
+    while time.perf_counter() < deadline:
+        target, path, query, headers = client.next_request()
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': HOST,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+            'HTTP_HOST': HOST,
+        }
+        for name, value in headers.items():
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = int(status.split()[0])
+            response['headers'] = {name.lower(): value for name, value in response_headers}
+
+        started = time.perf_counter()
+        result = handler(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            result.close()
+        client.done(target, response['status'], response['headers'], started)
+
+
+async def _asgi_client(handler, client, deadline):
+    while time.perf_counter() < deadline:
+        target, path, query, headers = client.next_request()
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', HOST.encode())] + [
+                (name.lower().encode(), value.encode()) for name, value in headers.items()
+            ],
+            'client': ('127.0.0.1', 50000),
+            'server': (HOST, 80),
+        }
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # Клиент не отключается: Django отменит ожидание после ответа
+            await asyncio.Future()
+
+        response = {}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = {
+                    name.decode().lower(): value.decode() for name, value in message['headers']
+                }
+
+        started = time.perf_counter()
+        await handler(scope, receive, send)
+        client.done(target, response['status'], response['headers'], started)
+
+
+def _run_wsgi(targets, clients, deadline, stats):
+    handler = WSGIHandler()
+    threads = [
+        threading.Thread(target=_wsgi_client, args=(handler, PollingClient(number, targets, stats), deadline))
+        for number in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _run_asgi(targets, clients, deadline, stats):
+    handler = ASGIHandler()
+
+    async def run():
+        await asyncio.gather(*(
+            _asgi_client(handler, PollingClient(number, targets, stats), deadline)
+            for number in range(clients)
+        ))
+
+    asyncio.run(run())
+
+
+def run_polling(mode, targets, clients, seconds, warmup=0.5):
+    """
+    Нагружает обработчик mode ('wsgi' или 'asgi') clients одновременными
+    клиентами в течение seconds секунд и возвращает итоги в словаре.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Неизвестный режим: {mode}')
+    runner = _run_wsgi if mode == 'wsgi' else _run_asgi
+
+    # Прогрев одним клиентом: импорты, кэш снимка и соединение с БД
+    # появляются до замера памяти
+    runner(targets, 1, time.perf_counter() + warmup, PollStats())
+
+    stats = PollStats()
+    baseline = rss_kb()
+    sampler = MemorySampler()
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        runner(targets, clients, started + seconds, stats)
+    finally:
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+
+    result = {
+        'mode': mode,
+        'clients': clients,
+        'seconds': round(elapsed, 2),
+        'requests': stats.requests,
+        'not_modified': stats.not_modified,
+        'errors': stats.errors,
+        'rps': round(stats.requests / elapsed, 1),
+        'threads': sampler.peak_threads,
+        'rss_baseline_kb': baseline,
+        'rss_peak_kb': sampler.peak_rss,
+        'kb_per_connection': None,
+    }
+    for percent in (50, 95, 99):
+        result[f'p{percent}_ms'] = histogram_percentile(stats.histogram, percent, stats.max_ms)
+    if baseline is not None:
+        result['kb_per_connection'] = round(max(0, sampler.peak_rss - baseline) / clients, 1)
+    return result
@@ -0,0 +1,206 @@
+"""
+Набор замеряемых горячих путей.
+
+Каждый бенчмарк - фабрика, которая по контексту запуска готовит
+функцию одной итерации. Функция обращается к моделям или к
+представлениям через тестовый клиент и проверяет код ответа, чтобы
+ошибка не выдавалась за быстрый ответ.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Zone
+from .runner import BenchmarkError, rolled_back
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Регистрирует фабрику бенчмарка под именем name"""
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+@dataclass
+class BenchmarkContext:
+    zones: list
+    member: User
+    staff: User
+    seed: int = 42
+    days_ahead: int = 30
+    clients: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+        self.clients['anonymous'] = Client()
+        for role in ('member', 'staff'):
+            client = Client()
+            client.force_login(getattr(self, role))
+            self.clients[role] = client
+
+    def random_zone(self):
+        return self.rng.choice(self.zones)
+
+    def random_window(self):
+        """Вечерний интервал от 1 до 3 часов в пределах горизонта бронирования"""
+        day = timezone.localdate() + timedelta(days=self.rng.randint(1, max(1, self.days_ahead - 1)))
+        start = timezone.make_aware(datetime.combine(day, time(0, 0)))
+        start += timedelta(hours=self.rng.randint(12, 20), minutes=self.rng.choice([0, 30]))
+        return start, start + timedelta(hours=self.rng.randint(1, 3))
+
+
+def build_context(zones=None, member=None, seed=42, days_ahead=30):
+    """
+    Контекст запуска. Без явных зон берутся все, без пользователя -
+    самый активный по числу бронирований. Администратор для страниц
+    админки создается отдельно.
+    """
+    zones = list(zones if zones is not None else Zone.objects.order_by('id'))
+    if not zones:
+        raise BenchmarkError('Нет зон для замеров')
+    if member is None:
+        member = User.objects.annotate(total=Count('bookings')).order_by('-total', 'id').first()
+        if member is None:
+            raise BenchmarkError('Нет пользователей для замеров')
+    staff, _ = User.objects.get_or_create(
+        username='benchmark_admin',
+        defaults={'is_staff': True, 'is_superuser': True, 'password': make_password(None)},
+    )
+    return BenchmarkContext(zones=zones, member=member, staff=staff, seed=seed, days_ahead=days_ahead)
+
+
+def _request(client, method, url, expected=(200,), **kwargs):
+    response = getattr(client, method)(url, **kwargs)
+    if response.status_code not in expected:
+        raise BenchmarkError(f'{method.upper()} {url}: код ответа {response.status_code}')
+    # Потоковые ответы нужно дочитать, иначе время генерации не попадет в замер
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def _get(ctx, role, name, *args, **kwargs):
+    url = reverse(name, args=args)
+    return lambda: _request(ctx.clients[role], 'get', url, **kwargs)
+
+
+@benchmark('zone.get_available_seats')
+def zone_available_seats(ctx):
+    return lambda: ctx.random_zone().get_available_seats()
+
+
+@benchmark('zone.get_available_seats_for_time')
+def zone_available_seats_for_time(ctx):
+    def run():
+        start, end = ctx.random_window()
+        ctx.random_zone().get_available_seats_for_time(start, end)
+    return run
+
+
+@benchmark('zone.available_seats_map')
+def zones_available_seats_map(ctx):
+    zone_ids = [zone.id for zone in ctx.zones]
+
+    def run():
+        start, end = ctx.random_window()
+        Zone.objects.filter(id__in=zone_ids).available_seats_map(start, end)
+    return run
+
+
+@benchmark('view.zones')
+def zones_view(ctx):
+    return _get(ctx, 'anonymous', 'zones')
+
+
+@benchmark('view.booking.get')
+def booking_page(ctx):
+    return _get(ctx, 'member', 'booking')
+
+
+@benchmark('view.booking.post')
+def booking_post(ctx):
+    url = reverse('booking')
+    client = ctx.clients['member']
+
+    def run():
+        start, end = ctx.random_window()
+        data = {
+            'zone': ctx.random_zone().id,
+            'name': 'Бенчмарк',
+            'phone': '+70000000000',
+            'email': 'bench@example.com',
+            'number_of_people': 1,
+            'start_time': timezone.localtime(start).strftime('%Y-%m-%dT%H:%M'),
+            'end_time': timezone.localtime(end).strftime('%Y-%m-%dT%H:%M'),
+        }
+        # Созданное бронирование откатывается, данные между итерациями не растут
+        with rolled_back():
+            _request(client, 'post', url, data=data, expected=(200, 302))
+    return run
+
+
+@benchmark('api.availability')
+def availability_api(ctx):
+    return _get(ctx, 'anonymous', 'availability_api')
+
+
+@benchmark('api.check_zone_availability')
+def check_zone_availability(ctx):
+    url = reverse('check_zone_availability')
+    client = ctx.clients['anonymous']
+
+    def run():
+        start, end = ctx.random_window()
+        _request(client, 'get', url, data={
+            'zone_id': ctx.random_zone().id,
+            'start_time': start.isoformat(),
+            'end_time': end.isoformat(),
+        })
+    return run
+
+
+@benchmark('view.profile')
+def profile(ctx):
+    return _get(ctx, 'member', 'profile')
+
+
+@benchmark('view.booking_history')
+def booking_history(ctx):
+    return _get(ctx, 'member', 'booking_history')
+
+
+@benchmark('view.login.post')
+def login_post(ctx):
+    url = reverse('login')
+    user, _ = User.objects.get_or_create(username='benchmark_login', defaults={'email': 'benchmark_login@example.com'})
+    user.set_password('benchmark')
+    user.save(update_fields=['password'])
+    data = {'username': user.email, 'password': 'benchmark'}
+
+    # Новый клиент на каждой итерации: вошедшего пользователя форма входа перенаправляет
+    return lambda: _request(Client(), 'post', url, data=data, expected=(302,))
+
+
+@benchmark('admin.booking_changelist')
+def admin_bookings(ctx):
+    return _get(ctx, 'staff', 'admin:main_booking_changelist')
+
+
+@benchmark('admin.zone_changelist')
+def admin_zones(ctx):
+    return _get(ctx, 'staff', 'admin:main_zone_changelist')
+
+
+@benchmark('admin.user_changelist')
+def admin_users(ctx):
+    return _get(ctx, 'staff', 'admin:auth_user_changelist')
@@ -0,0 +1,19 @@
+from django.core.checks import Warning, register
+
+from .assets import VENDOR_FILES, missing_vendor_files
+
+
+@register('staticfiles', deploy=True)
+def vendor_files_check(app_configs, **kwargs):
+    """
+    Без скачанных Bootstrap и иконок страницы берут их с CDN. Для
+    разработки этого достаточно, поэтому проверка только в check --deploy
+    """
+    missing = missing_vendor_files()
+    if not missing:
+        return []
+    return [Warning(
+        f'Не скачаны файлы сторонних библиотек ({len(missing)} из {len(VENDOR_FILES)})',
+        hint='Запустите python manage.py build_static --vendor-only',
+        id='main.W001',
+    )]
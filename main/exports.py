@@ -0,0 +1,104 @@
+"""Потоковая выгрузка бронирований в CSV и JSON Lines"""
+import csv
+import json
+
+from django.utils import timezone
+
+# (заголовок, поле values()) в порядке колонок выгрузки
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('zone', 'zone__title'),
+    ('user', 'user__username'),
+    ('customer_name', 'customer_name'),
+    ('customer_phone', 'customer_phone'),
+    ('customer_email', 'customer_email'),
+    ('number_of_people', 'number_of_people'),
+    ('start_time', 'start_time'),
+    ('end_time', 'end_time'),
+    ('status', 'status'),
+    ('duration_hours', 'duration_hours'),
+    ('total_price', 'total_price'),
+    ('created_at', 'created_at'),
+]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+}
+
+
+# Ячейки, которые Excel и LibreOffice считают формулами
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=2000):
+    """
+    Строки выгрузки словарями по одной, без загрузки всей выборки в память.
+
+    Длительность и стоимость считаются в БД. Первые строки доступны
+    сразу после первой пачки из chunk_size записей.
+    """
+    rows = queryset.with_price().order_by('pk').values(
+        *(field for _, field in EXPORT_COLUMNS)
+    ).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield {
+            header: _format_value(row[field])
+            for header, field in EXPORT_COLUMNS
+        }
+
+
+def _format_value(value):
+    if hasattr(value, 'tzinfo'):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
+def escape_csv_cell(value):
+    """
+    Экранирует апострофом строку, которую табличный редактор выполнил бы
+    как формулу: имя или телефон клиента вида "=HYPERLINK(...)"
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def unescape_csv_cell(value):
+    """Обратное escape_csv_cell преобразование для загрузки выгрузки обратно"""
+    if isinstance(value, str) and value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+        return value[1:]
+    return value
+
+
+def csv_lines(rows):
+    # BOM нужен Excel, чтобы открыть UTF-8 с кириллицей
+    yield '\ufeff'
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow([escape_csv_cell(row[header]) for header, _ in EXPORT_COLUMNS])
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def export_lines(queryset, export_format='csv', chunk_size=2000):
+    """Генератор строк выгрузки в формате csv или jsonl"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Неизвестный формат выгрузки: {export_format}')
+    rows = export_rows(queryset, chunk_size)
+    return csv_lines(rows) if export_format == 'csv' else jsonl_lines(rows)
+
+
+def export_filename(export_format):
+    return f'bookings_{timezone.localtime():%Y%m%d_%H%M}.{EXPORT_FORMATS[export_format][1]}'
@@ -0,0 +1,89 @@
+"""Выражения ORM, которые Django не предоставляет из коробки"""
+from django.db import NotSupportedError
+from django.db.models import FloatField, Func, IntegerField
+
+
+def _float_type(connection):
+    return 'REAL' if connection.vendor == 'sqlite' else 'double precision'
+
+
+class DurationMicroseconds(Func):
+    """
+    Длительность между двумя моментами в целых микросекундах:
+    DurationMicroseconds(конец, начало).
+
+    Считается встроенными функциями СУБД без пользовательских функций
+    Python, поэтому выражение можно повторять в одном запросе.
+    """
+    arity = 2
+    output_field = IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        end_sql, end_params = compiler.compile(self.source_expressions[0])
+        start_sql, start_params = compiler.compile(self.source_expressions[1])
+
+        if connection.vendor == 'sqlite':
+            # Django хранит моменты текстом 'ГГГГ-ММ-ДД ЧЧ:ММ:СС[.ffffff]' в UTC,
+            # микросекунды опускаются, когда равны нулю. strftime() округляет
+            # дробные секунды до миллисекунд, поэтому они отрезаются заранее
+            sql = (
+                f"((CAST(strftime('%%s', substr({end_sql}, 1, 19)) AS INTEGER)"
+                f" - CAST(strftime('%%s', substr({start_sql}, 1, 19)) AS INTEGER)) * 1000000"
+                f" + CAST(substr({end_sql}, 21, 6) AS INTEGER)"
+                f" - CAST(substr({start_sql}, 21, 6) AS INTEGER))"
+            )
+            return sql, (*end_params, *start_params, *end_params, *start_params)
+        if connection.vendor == 'postgresql':
+            # С PostgreSQL 14 EXTRACT возвращает точный numeric
+            sql = f'CAST(EXTRACT(EPOCH FROM ({end_sql} - {start_sql})) * 1000000 AS bigint)'
+            return sql, (*end_params, *start_params)
+        raise NotSupportedError(f'DurationMicroseconds не поддерживается для {connection.vendor}')
+
+
+class TruncateToInteger(Func):
+    """Отбрасывает дробную часть (к нулю), как int() в Python"""
+    output_field = IntegerField()
+    template = 'CAST(TRUNC(%(expressions)s) AS bigint)'
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # CAST к INTEGER в SQLite сам отбрасывает дробную часть
+        return self.as_sql(compiler, connection, template='CAST(%(expressions)s AS INTEGER)', **extra_context)
+
+
+class HoursInTenths(Func):
+    """
+    Микросекунды в часах, округленные до десятых так же, как
+    round(timedelta.total_seconds() / 3600, 1) в Python.
+
+    Вне середин между десятыми часа хватает ROUND() от числа десятых.
+    Округление double в Python может сдвинуть результат только ровно
+    посередине: там часы вычисляются в double precision так же, как в
+    Python, и сравниваются с серединой без промежуточных округлений -
+    умножения на степени двойки точны, а разность близких чисел точна по
+    лемме Стербенца. Оставшаяся точная середина округляется к четному.
+    """
+    arity = 1
+    output_field = FloatField()
+
+    # Микросекунд в десятой части часа и в ее половине
+    TENTH = 360000000
+    HALF_TENTH = 180000000
+
+    def as_sql(self, compiler, connection, **extra_context):
+        value_sql, value_params = compiler.compile(self.source_expressions[0])
+        float_type = _float_type(connection)
+
+        value = '{value}'
+        absolute = f'ABS({value})'
+        tenths = f'({absolute} / {self.TENTH})'
+        hours = f'(CAST({absolute} AS {float_type}) / 1000000.0 / 3600.0)'
+        midpoint = f'(2 * {tenths} + 1)'
+        template = (
+            f'(CASE WHEN ABS({value} %% {self.TENTH}) = {self.HALF_TENTH}'
+            f' THEN CASE WHEN {value} < 0 THEN -1 ELSE 1 END * CAST({tenths} + CASE'
+            f' WHEN 4.0 * {hours} > {midpoint} - 16.0 * {hours} THEN 1'
+            f' WHEN 4.0 * {hours} < {midpoint} - 16.0 * {hours} THEN 0'
+            f' ELSE {tenths} %% 2 END AS {float_type})'
+            f' ELSE ROUND(CAST({value} AS {float_type}) / {self.TENTH}) END / 10.0)'
+        )
+        return template.replace(value, value_sql), tuple(value_params) * template.count(value)
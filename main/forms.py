@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
+from django.db.models.functions import Lower
 from .models import UserProfile
 
 class CustomUserCreationForm(UserCreationForm):
@@ -33,6 +34,13 @@ class CustomUserCreationForm(UserCreationForm):
             if field_name not in ['phone']:  # phone уже стилизован
                 self.fields[field_name].widget.attrs.update({'class': 'form-control'})
 
+    def clean_email(self):
+        # Email служит логином (main.backends), поэтому должен быть уникальным
+        email = self.cleaned_data['email']
+        if User.objects.alias(email_lower=Lower('email')).filter(email_lower=email.lower()).exists():
+            raise forms.ValidationError('Пользователь с таким email уже зарегистрирован.')
+        return email
+
     def save(self, commit=True):
         user = super().save(commit=False)
         user.email = self.cleaned_data['email']
@@ -41,11 +49,11 @@ class CustomUserCreationForm(UserCreationForm):
         
         if commit:
             user.save()
-            # Создаем профиль пользователя
-            UserProfile.objects.create(
-                user=user,
-                phone=self.cleaned_data.get('phone', '')
-            )
+            # Профиль создан сигналом вместе с пользователем
+            phone = self.cleaned_data.get('phone', '')
+            if phone:
+                user.profile.phone = phone
+                user.profile.save()
         return user
 
 
@@ -87,4 +95,10 @@ class ContactForm(forms.ModelForm):
             'name': 'Ваше имя',
             'email': 'Ваш email',
             'message': 'Сообщение'
-        }
\ No newline at end of file
+        }
+
+class BookingImportForm(forms.Form):
+    """Загрузка файла с бронированиями в админке"""
+    file = forms.FileField(label='Файл')
+    format = forms.ChoiceField(label='Формат', choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')])
+    dry_run = forms.BooleanField(label='Только проверить', required=False)
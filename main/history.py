@@ -0,0 +1,54 @@
+"""История бронирований пользователя: постраничная выдача по курсору"""
+import base64
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Booking
+
+# Бронирований на одной странице истории
+HISTORY_PAGE_SIZE = 20
+
+
+def encode_cursor(booking):
+    """Курсор на позицию сразу после бронирования: (created_at, id) в base64"""
+    raw = f'{booking.created_at.isoformat()}|{booking.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор в пару (created_at, id). Бросает ValueError для некорректного курсора"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, booking_id = raw.rsplit('|', 1)
+        created_at = parse_datetime(created_at)
+        booking_id = int(booking_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Некорректный курсор')
+    if created_at is None or created_at.tzinfo is None:
+        raise ValueError('Некорректный курсор')
+    return created_at, booking_id
+
+
+def history_page(user, cursor=None, size=HISTORY_PAGE_SIZE):
+    """
+    Страница истории пользователя, начиная с позиции cursor.
+
+    Вместо OFFSET используется условие по (created_at, id), поэтому запрос
+    читает из индекса booking_user_history_idx только size + 1 строк на
+    любой глубине. Возвращает (список бронирований, курсор следующей
+    страницы или None).
+    """
+    bookings = Booking.objects.filter(user=user).select_related('zone').order_by('-created_at', '-id')
+    if cursor:
+        created_at, booking_id = decode_cursor(cursor)
+        # created_at <= X задает диапазон по индексу, второе условие отсекает уже показанные строки
+        bookings = bookings.filter(
+            Q(created_at__lt=created_at) | Q(id__lt=booking_id),
+            created_at__lte=created_at,
+        )
+
+    page = list(bookings[:size + 1])
+    if len(page) > size:
+        return page[:size], encode_cursor(page[size - 1])
+    return page, None
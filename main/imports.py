@@ -0,0 +1,231 @@
+"""Массовый импорт бронирований с проверкой вместимости всей пачки"""
+import csv
+import io
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .availability import OccupancyTree
+from .exports import unescape_csv_cell
+from .models import Zone, Booking
+from .occupancy import refresh_ranges
+from .snapshot import invalidate_availability
+
+STATUSES = {status for status, _ in Booking.STATUS_CHOICES}
+# Колонки, которые читает импорт: текстовые и числовые (в JSON Lines числа
+# приходят числами, в CSV - строками). Остальные колонки выгрузки не читаются
+TEXT_FIELDS = ('zone', 'user', 'customer_name', 'customer_phone', 'customer_email', 'start_time', 'end_time', 'status')
+NUMBER_FIELDS = ('zone_id', 'number_of_people')
+
+
+class ImportResult:
+    """Итог импорта: сколько создано и отчет об отклоненных строках"""
+
+    def __init__(self):
+        self.accepted = 0
+        self.created = 0
+        self.rejected = []
+        self.elapsed = 0.0
+
+    def reject(self, line, reason, row):
+        self.rejected.append({'line': line, 'reason': reason, 'row': row})
+
+    def report_lines(self):
+        """Отчет об отклоненных строках в CSV"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['line', 'reason', 'row'])
+        for rejection in self.rejected:
+            writer.writerow([rejection['line'], rejection['reason'], json.dumps(rejection['row'], ensure_ascii=False)])
+        return buffer.getvalue()
+
+
+def read_rows(stream, import_format):
+    """
+    Читает строки CSV (с заголовком) или JSON Lines из текстового потока.
+
+    Возвращает пары (номер строки, словарь). Колонки совпадают с выгрузкой
+    export_bookings, так что выгруженный файл можно загрузить обратно.
+    """
+    if import_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key: unescape_csv_cell(value) for key, value in row.items()}
+    elif import_format == 'jsonl':
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = {'_error': 'Некорректный JSON'}
+            yield number, row if isinstance(row, dict) else {'_error': 'Ожидался объект JSON'}
+    else:
+        raise ValueError(f'Неизвестный формат импорта: {import_format}')
+
+
+def _parse_time(value):
+    parsed = parse_datetime(str(value or ''))
+    if parsed and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class _RowParser:
+    """Разбор и проверка одной строки без обращения к БД"""
+
+    def __init__(self, zones, users):
+        self.zones_by_id = {zone.id: zone for zone in zones}
+        self.zones_by_title = {zone.title: zone for zone in zones}
+        self.users = users
+
+    def __call__(self, row):
+        if '_error' in row:
+            raise ValueError(row['_error'])
+        # В JSON Lines значением может оказаться число, список или объект;
+        # пустые значения (null) проверяются ниже как незаполненные
+        for field in TEXT_FIELDS:
+            if row.get(field) is not None and not isinstance(row[field], str):
+                raise ValueError(f'Некорректное значение поля {field}')
+        for field in NUMBER_FIELDS:
+            value = row.get(field)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, str))):
+                raise ValueError(f'Некорректное значение поля {field}')
+
+        zone = None
+        if str(row.get('zone_id') or '').isdigit():
+            zone = self.zones_by_id.get(int(row['zone_id']))
+        elif row.get('zone'):
+            zone = self.zones_by_title.get(row['zone'])
+        if zone is None:
+            raise ValueError('Зона не найдена')
+
+        for field in ('customer_name', 'customer_phone', 'customer_email'):
+            if not str(row.get(field) or '').strip():
+                raise ValueError(f'Не заполнено поле {field}')
+        try:
+            validate_email(row['customer_email'])
+        except ValidationError:
+            raise ValueError('Некорректный email')
+
+        try:
+            people = int(row.get('number_of_people') or 1)
+        except (TypeError, ValueError):
+            raise ValueError('Некорректное количество человек')
+        if not 1 <= people <= zone.capacity:
+            raise ValueError(f'Количество человек должно быть от 1 до {zone.capacity}')
+
+        start_time = _parse_time(row.get('start_time'))
+        end_time = _parse_time(row.get('end_time'))
+        if not start_time or not end_time:
+            raise ValueError('Некорректный формат времени')
+        if end_time <= start_time:
+            raise ValueError('Время окончания должно быть позже времени начала')
+
+        status = row.get('status') or 'confirmed'
+        if status not in STATUSES:
+            raise ValueError(f'Неизвестный статус {status}')
+
+        user = None
+        if row.get('user'):
+            user = self.users.get(row['user'])
+            if user is None:
+                raise ValueError(f'Пользователь {row["user"]} не найден')
+
+        return Booking(
+            zone=zone,
+            user_id=user,
+            customer_name=str(row['customer_name']).strip()[:100],
+            customer_phone=str(row['customer_phone']).strip()[:20],
+            customer_email=row['customer_email'],
+            number_of_people=people,
+            start_time=start_time,
+            end_time=end_time,
+            status=status,
+        )
+
+
+def import_bookings(rows, chunk_size=5000, dry_run=False):
+    """
+    Импортирует бронирования из пар (номер строки, словарь).
+
+    Все строки проверяются в памяти: для каждой зоны один раз загружаются
+    пересекающиеся с импортом бронирования и строится дерево загрузки,
+    в которое по очереди добавляются принятые строки. Принятые строки
+    записываются через bulk_create, по транзакции на пачку из chunk_size.
+    Импорт рассчитан на работу вне часов пик: онлайн-брони, созданные
+    после загрузки дерева, не учитываются при проверке.
+    """
+    started = time.perf_counter()
+    result = ImportResult()
+    rows = list(rows)
+
+    parser = _RowParser(
+        list(Zone.objects.all()),
+        {username: user_id for user_id, username in User.objects.filter(
+            username__in={row['user'] for _, row in rows if row.get('user') and isinstance(row['user'], str)}
+        ).values_list('id', 'username')},
+    )
+
+    candidates = []
+    for line, row in rows:
+        try:
+            candidates.append((line, row, parser(row)))
+        except ValueError as error:
+            result.reject(line, str(error), row)
+
+    # Дерево загрузки на зону: существующие брони и все кандидаты
+    active = [booking for _, _, booking in candidates if booking.status != 'cancelled']
+    trees = {}
+    if active:
+        horizon_start = min(booking.start_time for booking in active)
+        horizon_end = max(booking.end_time for booking in active)
+        existing = list(Booking.objects.filter(
+            zone_id__in={booking.zone_id for booking in active},
+            start_time__lt=horizon_end, end_time__gt=horizon_start,
+        ).exclude(status='cancelled').order_by().values_list('zone_id', 'start_time', 'end_time', 'number_of_people'))
+
+        points = {}
+        for zone_id, start, end, _ in existing:
+            points.setdefault(zone_id, []).extend((start, end))
+        for booking in active:
+            points.setdefault(booking.zone_id, []).extend((booking.start_time, booking.end_time))
+        trees = {zone_id: OccupancyTree(zone_points) for zone_id, zone_points in points.items()}
+        for zone_id, start, end, people in existing:
+            trees[zone_id].add(start, end, people)
+
+    accepted = []
+    for line, row, booking in candidates:
+        if booking.status != 'cancelled':
+            tree = trees[booking.zone_id]
+            if tree.peak(booking.start_time, booking.end_time) + booking.number_of_people > booking.zone.capacity:
+                result.reject(line, 'Недостаточно свободных мест', row)
+                continue
+            tree.add(booking.start_time, booking.end_time, booking.number_of_people)
+        accepted.append(booking)
+
+    result.accepted = len(accepted)
+    if not dry_run:
+        for offset in range(0, len(accepted), chunk_size):
+            with transaction.atomic():
+                Booking.objects.bulk_create(accepted[offset:offset + chunk_size])
+        result.created = len(accepted)
+
+        if accepted:
+            # bulk_create не отправляет сигналы
+            ranges = {}
+            for booking in accepted:
+                start, end = ranges.get(booking.zone_id, (booking.start_time, booking.end_time))
+                ranges[booking.zone_id] = (min(start, booking.start_time), max(end, booking.end_time))
+            refresh_ranges([(zone_id, start, end) for zone_id, (start, end) in ranges.items()])
+            invalidate_availability()
+
+    result.rejected.sort(key=lambda rejection: rejection['line'])
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,245 @@
+"""
+Замеры запросов: время этапов, количество SQL-запросов, журнал медленных
+запросов и гистограммы по представлениям (profiling.py).
+
+Включается настройкой REQUEST_METRICS. Когда замеры выключены, middleware
+не подключается, а stage() сводится к чтению ContextVar.
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_finished
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from .profiling import profiler
+
+logger = logging.getLogger('main.requests')
+
+DEFAULTS = {
+    'ENABLED': False,
+    # Запросы дольше порога попадают в журнал и в лог с уровнем WARNING
+    'SLOW_MS': 500,
+    # Сколько последних медленных запросов хранить в памяти процесса
+    'BUFFER_SIZE': 100,
+    # Доля замеряемых запросов: в продакшене можно оставить, например, 0.05
+    'SAMPLE_RATE': 1.0,
+    # Как часто процесс добавляет накопленные гистограммы в ViewProfile
+    'FLUSH_SECONDS': 30,
+}
+
+_current = ContextVar('request_metrics', default=None)
+_disabled = nullcontext()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+class RequestMetrics:
+    """Замеры одного запроса"""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.view = None
+        self.status = None
+        self.started_at = timezone.now()
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.stages = {}
+        self.queries = 0
+        self.query_ms = 0.0
+
+    def finish(self, status):
+        self.status = status
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self):
+        return {
+            'method': self.method,
+            'path': self.path,
+            'view': self.view,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(),
+            'total_ms': round(self.total_ms, 2),
+            'stages': {name: round(ms, 2) for name, ms in self.stages.items()},
+            'queries': self.queries,
+            'query_ms': round(self.query_ms, 2),
+        }
+
+
+class SlowRequestLog:
+    """Кольцевой буфер последних медленных запросов процесса"""
+
+    def __init__(self, size):
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, metrics):
+        with self._lock:
+            self._entries.append(metrics.as_dict())
+
+    def entries(self):
+        """Записи от новых к старым"""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def resize(self, size):
+        with self._lock:
+            if self._entries.maxlen != size:
+                self._entries = deque(self._entries, maxlen=size)
+
+
+slow_requests = SlowRequestLog(get_config()['BUFFER_SIZE'])
+
+
+def stage(name):
+    """
+    Контекстный менеджер для замера этапа обработки запроса.
+
+    Время повторяющихся этапов суммируется. Вне замеряемого запроса
+    возвращает общий пустой менеджер.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return _disabled
+    return _timed_stage(metrics, name)
+
+
+@contextmanager
+def _timed_stage(metrics, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.stages[name] = metrics.stages.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def _count_query(execute, sql, params, many, context):
+    """Обертка выполнения SQL: считает запросы текущего замеряемого запроса"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.query_ms += (time.perf_counter() - started) * 1000
+
+
+def _install_query_counter(connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def _flush_profiles(**kwargs):
+    """
+    Сбрасывает гистограммы в ViewProfile по сигналу request_finished.
+
+    Сигнал приходит, когда ответ уже отдан клиенту, поэтому запись в БД и
+    ожидание блокировки SQLite не задерживают ответ. Открытое здесь
+    соединение закроет close_old_connections в начале следующего запроса.
+    """
+    if not profiler.flush_due():
+        return
+    try:
+        profiler.flush()
+    except DatabaseError:
+        logger.warning('Не удалось сохранить гистограммы запросов', exc_info=True)
+
+
+class RequestMetricsMiddleware:
+    """
+    Замеряет время и количество SQL-запросов каждого запроса.
+
+    Метрики передаются через ContextVar, поэтому их видят и этапы внутри
+    sync_to_async. Медленные запросы попадают в slow_requests и в лог,
+    все отобранные - в гистограммы profiler. Гистограммы уходят в БД
+    после отдачи ответа (_flush_profiles). Не отобранные по SAMPLE_RATE
+    запросы проходят без замеров.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = get_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = config['SLOW_MS']
+        self.sample_rate = config['SAMPLE_RATE']
+        slow_requests.resize(config['BUFFER_SIZE'])
+        profiler.flush_seconds = config['FLUSH_SECONDS']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        # Счетчик запросов ставится на каждое соединение: на уже открытые
+        # в этом потоке сразу, на новые - при подключении
+        connection_created.connect(_install_query_counter, dispatch_uid='request_metrics')
+        request_finished.connect(_flush_profiles, dispatch_uid='request_metrics')
+        for connection in connections.all(initialized_only=True):
+            _install_query_counter(connection)
+
+    def _sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        metrics = RequestMetrics(request.method, request.path)
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, metrics, response)
+        return response
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        metrics = RequestMetrics(request.method, request.path)
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, metrics, response)
+        return response
+
+    def _record(self, request, metrics, response):
+        match = request.resolver_match
+        metrics.view = match.view_name if match else None
+        metrics.finish(response.status_code)
+        profiler.record(metrics)
+
+        if metrics.total_ms >= self.slow_ms:
+            slow_requests.add(metrics)
+            level = logging.WARNING
+        else:
+            level = logging.DEBUG
+        if logger.isEnabledFor(level):
+            data = metrics.as_dict()
+            logger.log(
+                level, '%s %s %s %.1f ms, SQL: %d (%.1f ms), этапы: %s',
+                data['method'], data['path'], data['status'], data['total_ms'],
+                data['queries'], data['query_ms'], data['stages'],
+                extra={'metrics': data},
+            )
@@ -0,0 +1,127 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmarks import DatasetSpec, generate_dataset
+from main.benchmarks.servers import MODES, polling_targets, run_polling
+from main.models import Zone
+from main.occupancy import rebuild_occupancy
+from main.snapshot import invalidate_availability
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает WSGI и ASGI на опросе API доступности: запросы в секунду и память '
+            'на соединение. Каждый режим и число клиентов замеряются в отдельном процессе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 200],
+                            help='Числа одновременных клиентов (по замеру на каждое)')
+        parser.add_argument('--seconds', type=float, default=5, help='Длительность замера')
+        parser.add_argument('--mode', choices=MODES, action='append', help='Только указанный режим')
+        parser.add_argument('--zones', type=int, default=8, help='Количество зон в данных')
+        parser.add_argument('--bookings', type=int, default=5000, help='Количество бронирований')
+        parser.add_argument('--existing', action='store_true',
+                            help='Не генерировать данные, опрашивать зоны текущей базы')
+        parser.add_argument('--keep', action='store_true', help='Не удалять сгенерированные данные')
+        parser.add_argument('--json', action='store_true', help='Вывести JSON вместо таблицы')
+        # Внутренний режим: замер в дочернем процессе
+        parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+        parser.add_argument('--zone-ids', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self._worker(options)
+            return
+        if min(options['clients']) < 1:
+            raise CommandError('--clients должен быть больше 0')
+
+        zones, user_ids = self._prepare(options)
+        if not zones:
+            raise CommandError('В базе нет зон')
+        try:
+            results = [
+                self._spawn(mode, clients, zones, options)
+                for clients in options['clients']
+                for mode in options['mode'] or MODES
+            ]
+        finally:
+            if not options['existing'] and not options['keep']:
+                self._cleanup(zones, user_ids)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            self._print_table(results)
+
+    def _prepare(self, options):
+        if options['existing']:
+            return list(Zone.objects.order_by('id').values_list('id', flat=True)[:options['zones']]), []
+        # Дочерние процессы работают со своими соединениями, поэтому данные
+        # сохраняются, а не откатываются, и удаляются после замеров
+        spec = DatasetSpec(zones=options['zones'], users=50, bookings=options['bookings'],
+                           days_back=7, days_ahead=14, seed=7)
+        logging.disable(logging.INFO)
+        try:
+            dataset = generate_dataset(spec)
+            rebuild_occupancy(chunk_size=spec.batch_size)
+        finally:
+            logging.disable(logging.NOTSET)
+        invalidate_availability()
+        self.stderr.write(f'Создано зон: {len(dataset.zones)}, бронирований: {dataset.bookings}')
+        return [zone.id for zone in dataset.zones], dataset.user_ids
+
+    def _cleanup(self, zone_ids, user_ids):
+        logging.disable(logging.INFO)
+        try:
+            # Бронирования удаляются каскадом вместе с зонами
+            Zone.objects.filter(id__in=zone_ids).delete()
+            User.objects.filter(id__in=user_ids).delete()
+        finally:
+            logging.disable(logging.NOTSET)
+        invalidate_availability()
+
+    def _spawn(self, mode, clients, zone_ids, options):
+        self.stderr.write(f'{mode}, клиентов {clients}...', ending='')
+        self.stderr.flush()
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmark_asgi',
+            '--worker', mode, '--clients', str(clients), '--seconds', str(options['seconds']),
+            '--zone-ids', ','.join(map(str, zone_ids)),
+        ]
+        # Замер в режиме продакшена: при DEBUG Django копит все SQL в памяти
+        env = {**os.environ, 'DJANGO_DEBUG': '0', 'DJANGO_ALLOWED_HOSTS': 'testserver'}
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            self.stderr.write('')
+            raise CommandError(f'Замер {mode} завершился с ошибкой:\n{completed.stderr}')
+        result = json.loads(completed.stdout)
+        self.stderr.write(f' {result["rps"]} запросов/с')
+        return result
+
+    def _worker(self, options):
+        zone_ids = [int(zone_id) for zone_id in options['zone_ids'].split(',')]
+        logging.disable(logging.WARNING)
+        result = run_polling(options['worker'], polling_targets(zone_ids), options['clients'][0], options['seconds'])
+        self.stdout.write(json.dumps(result))
+
+    def _print_table(self, results):
+        header = (f'{"Режим":<6} {"клиентов":>8} {"запр/с":>9} {"304, %":>7} {"ошибок":>7} '
+                  f'{"p50":>8} {"p95":>8} {"p99":>8} {"потоков":>8} {"КБ/соед.":>9}')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in results:
+            cached = 100 * row['not_modified'] / row['requests'] if row['requests'] else 0
+            memory = row['kb_per_connection']
+            self.stdout.write(
+                f'{row["mode"]:<6} {row["clients"]:>8} {row["rps"]:>9.1f} {cached:>7.1f} {row["errors"]:>7} '
+                + ' '.join(f'{row[key] or 0:>8.2f}' for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+                + f' {row["threads"]:>8} ' + (f'{memory:>9.1f}' if memory is not None else f'{"н/д":>9}')
+            )
+        self.stdout.write('Время в мс; КБ/соед. - прирост RSS под нагрузкой на одного клиента')
@@ -0,0 +1,86 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from main.models import Zone, Booking
+
+
+def legacy_available_seats_for_time(zone, start_time, end_time):
+    """Прежняя реализация: сумма мест всех пересекающихся бронирований"""
+    overlapping_bookings = zone.bookings.filter(
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    ).exclude(status='cancelled')
+    total_occupied_seats = sum(booking.number_of_people for booking in overlapping_bookings)
+    return max(0, zone.capacity - total_occupied_seats)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает прежний расчет свободных мест с расчетом по пиковой загрузке'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=10000, help='Бронирований в тестовой зоне')
+        parser.add_argument('--days', type=int, default=30, help='На сколько дней распределить бронирования')
+        parser.add_argument('--window-hours', type=int, default=24, help='Длина проверяемого интервала')
+        parser.add_argument('--windows', type=int, default=20, help='Количество проверяемых интервалов')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        # Все данные создаются в транзакции и откатываются в конце
+        with transaction.atomic():
+            zone = Zone.objects.create(
+                title='Бенчмарк', description='', price_per_hour=100, capacity=options['bookings']
+            )
+            origin = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+            bookings = []
+            for _ in range(options['bookings']):
+                start = origin + timedelta(minutes=30 * rng.randrange(options['days'] * 48))
+                bookings.append(Booking(
+                    zone=zone,
+                    customer_name='Бенчмарк',
+                    customer_phone='+70000000000',
+                    customer_email='bench@example.com',
+                    number_of_people=rng.randint(1, 4),
+                    start_time=start,
+                    end_time=start + timedelta(hours=rng.randint(1, 4)),
+                    status='confirmed',
+                ))
+            Booking.objects.bulk_create(bookings, batch_size=1000)
+
+            window = timedelta(hours=options['window_hours'])
+            windows = [
+                origin + timedelta(hours=rng.randrange(options['days'] * 24))
+                for _ in range(options['windows'])
+            ]
+
+            legacy_time = sweep_time = 0.0
+            differences = 0
+            for start in windows:
+                end = start + window
+
+                started = time.perf_counter()
+                legacy = legacy_available_seats_for_time(zone, start, end)
+                legacy_time += time.perf_counter() - started
+
+                started = time.perf_counter()
+                sweep = zone.get_available_seats_for_time(start, end)
+                sweep_time += time.perf_counter() - started
+
+                if legacy != sweep:
+                    differences += 1
+
+            transaction.set_rollback(True)
+
+        count = len(windows)
+        self.stdout.write(f'Бронирований: {options["bookings"]}, интервалов: {count}')
+        self.stdout.write(f'Прежний расчет: {legacy_time / count * 1000:.2f} мс на интервал')
+        self.stdout.write(f'Пиковая загрузка: {sweep_time / count * 1000:.2f} мс на интервал')
+        self.stdout.write(
+            self.style.SUCCESS(f'Интервалов, где прежний расчет занижал свободные места: {differences}')
+        )
@@ -0,0 +1,67 @@
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from main.benchmarks import measure
+from main.benchmarks.runner import rolled_back
+from main.forms import CustomAuthenticationForm
+
+PASSWORD = 'benchmark-password'
+
+
+def legacy_login(request, data):
+    """Прежний путь: форма проверяет пароль, затем authenticate() еще раз"""
+    form = CustomAuthenticationForm(request, data=data)
+    if form.is_valid():
+        return authenticate(username=form.cleaned_data['username'], password=form.cleaned_data['password'])
+    return None
+
+
+def form_login(request, data):
+    """Текущий путь login_view: пользователь берется из формы"""
+    form = CustomAuthenticationForm(request, data=data)
+    if form.is_valid():
+        return form.get_user()
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает число входов в секунду на одно ядро: прежняя двойная проверка пароля и текущий вход'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Пользователей в таблице')
+        parser.add_argument('--repeat', type=int, default=20, help='Замеряемых входов на вариант')
+
+    def handle(self, *args, **options):
+        request = RequestFactory().post('/login/')
+
+        # Все данные создаются в транзакции и откатываются в конце
+        with rolled_back():
+            User.objects.bulk_create([
+                User(username=f'login_bench_{number}', email=f'login_bench_{number}@example.com')
+                for number in range(options['users'])
+            ], batch_size=1000)
+            user = User.objects.create_user('login_bench', 'Login.Bench@Example.com', PASSWORD)
+
+            cases = [
+                ('прежний вход по имени', legacy_login, {'username': user.username, 'password': PASSWORD}),
+                ('вход по имени', form_login, {'username': user.username, 'password': PASSWORD}),
+                ('вход по email', form_login, {'username': 'login.bench@example.com', 'password': PASSWORD}),
+            ]
+            results = []
+            for title, login, data in cases:
+                if login(request, data) != user:
+                    self.stderr.write(self.style.ERROR(f'{title}: пользователь не найден'))
+                    return
+                result = measure(lambda: login(request, data), options['repeat'], warmup=1)
+                results.append((title, result))
+
+        legacy_ms = results[0][1]['mean_ms']
+        for title, result in results:
+            self.stdout.write(
+                f'{title:<24} {result["mean_ms"]:>8.1f} мс, p95 {result["p95_ms"]:>8.1f} мс, '
+                f'{1000 / result["mean_ms"]:>6.2f} входов/с, SQL: {result["queries_mean"]:.0f}'
+            )
+        speedup = legacy_ms / results[1][1]['mean_ms']
+        self.stdout.write(self.style.SUCCESS(f'Ускорение входа: x{speedup:.2f} (один процесс = одно ядро)'))
@@ -0,0 +1,75 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from main.benchmarks import percentile
+from main.models import Zone, Booking
+from main.slots import find_free_slots
+
+
+class Command(BaseCommand):
+    help = 'Измеряет время поиска свободных окон на горизонте в месяц по всем зонам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zones', type=int, default=5, help='Количество тестовых зон')
+        parser.add_argument('--per-day', type=int, default=30, help='Бронирований в день на зону')
+        parser.add_argument('--days', type=int, default=31, help='Горизонт поиска в днях')
+        parser.add_argument('--runs', type=int, default=50, help='Количество запусков поиска')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        origin = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+        # Все данные создаются в транзакции и откатываются в конце
+        with transaction.atomic():
+            zones = [
+                Zone.objects.create(
+                    title=f'Бенчмарк {number}', description='', price_per_hour=100, capacity=rng.randint(4, 12)
+                )
+                for number in range(options['zones'])
+            ]
+            bookings = []
+            for zone in zones:
+                for _ in range(options['per_day'] * options['days']):
+                    start = origin + timedelta(minutes=30 * rng.randrange(options['days'] * 48))
+                    bookings.append(Booking(
+                        zone=zone,
+                        customer_name='Бенчмарк',
+                        customer_phone='+70000000000',
+                        customer_email='bench@example.com',
+                        number_of_people=rng.randint(1, 3),
+                        start_time=start,
+                        end_time=start + timedelta(hours=rng.randint(1, 4)),
+                        status='confirmed',
+                    ))
+            Booking.objects.bulk_create(bookings, batch_size=1000)
+
+            zone_ids = [zone.id for zone in zones]
+            timings = []
+            found = 0
+            for _ in range(options['runs']):
+                started = time.perf_counter()
+                slots = find_free_slots(
+                    Zone.objects.filter(id__in=zone_ids),
+                    party_size=rng.randint(1, 4),
+                    duration=timedelta(hours=rng.randint(1, 3)),
+                    horizon_start=origin,
+                    horizon=timedelta(days=options['days']),
+                    limit=10,
+                )
+                timings.append((time.perf_counter() - started) * 1000)
+                found += len(slots)
+
+            transaction.set_rollback(True)
+
+        timings.sort()
+        p95 = percentile(timings, 95)
+        self.stdout.write(f'Зон: {options["zones"]}, бронирований: {len(bookings)}, горизонт: {options["days"]} дн.')
+        self.stdout.write(f'Медиана: {statistics.median(timings):.2f} мс, p95: {p95:.2f} мс')
+        self.stdout.write(self.style.SUCCESS(f'Найдено окон за все запуски: {found}'))
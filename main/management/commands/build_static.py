@@ -0,0 +1,76 @@
+import os
+import time
+import urllib.request
+from urllib.error import URLError
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from main.assets import VENDOR_DIR, VENDOR_FILES, missing_vendor_files
+
+PRODUCTION_STORAGE = 'main.assets.CompressedManifestStaticFilesStorage'
+
+
+class Command(BaseCommand):
+    help = ('Собирает статику для продакшена: скачивает Bootstrap и иконки, раскладывает файлы '
+            'в STATIC_ROOT с хешем в имени и сжимает их заранее')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor-only', action='store_true',
+                            help='Только скачать сторонние библиотеки (нужно и для разработки)')
+        parser.add_argument('--skip-vendor', action='store_true', help='Не скачивать сторонние библиотеки')
+        parser.add_argument('--refresh-vendor', action='store_true', help='Скачать библиотеки заново')
+        parser.add_argument('--clear', action='store_true', help='Очистить STATIC_ROOT перед сборкой')
+
+    def handle(self, *args, **options):
+        if not options['skip_vendor']:
+            self._fetch_vendor(options['refresh_vendor'])
+        if options['vendor_only']:
+            return
+
+        missing = missing_vendor_files()
+        if missing:
+            raise CommandError(f'Нет файлов библиотек: {", ".join(missing)}. Запустите без --skip-vendor')
+
+        started = time.perf_counter()
+        # Сборка всегда идет хранилищем продакшена, даже если локально DEBUG включен
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': PRODUCTION_STORAGE}}
+        with override_settings(STORAGES=storages):
+            call_command('collectstatic', interactive=False, clear=options['clear'], verbosity=0)
+        self._report(time.perf_counter() - started)
+
+    def _fetch_vendor(self, refresh):
+        for name, url in VENDOR_FILES.items():
+            path = VENDOR_DIR / name
+            if path.exists() and not refresh:
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    data = response.read()
+            except URLError as e:
+                raise CommandError(f'Не удалось скачать {url}: {e}')
+            # Через временный файл, чтобы оборванная загрузка не оставила битый файл
+            partial = path.with_name(path.name + '.part')
+            partial.write_bytes(data)
+            os.replace(partial, path)
+            self.stdout.write(f'Скачан {name} ({len(data) // 1024} КБ)')
+
+    def _report(self, elapsed):
+        files = size = gzip_size = brotli_size = 0
+        for directory, _, names in os.walk(settings.STATIC_ROOT):
+            for name in names:
+                file_size = os.path.getsize(os.path.join(directory, name))
+                if name.endswith('.gz'):
+                    gzip_size += file_size
+                elif name.endswith('.br'):
+                    brotli_size += file_size
+                else:
+                    files += 1
+                    size += file_size
+        self.stdout.write(self.style.SUCCESS(
+            f'Собрано файлов: {files} ({size // 1024} КБ), сжатых копий gzip: {gzip_size // 1024} КБ, '
+            f'brotli: {brotli_size // 1024} КБ, за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from main.models import Zone, Booking
+
+
+class Command(BaseCommand):
+    help = 'Выводит планы выполнения (EXPLAIN) для самых частых запросов к бронированиям'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Выполнить запросы и показать фактические планы (EXPLAIN ANALYZE, только PostgreSQL)'
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        start_time = now + timedelta(hours=1)
+        end_time = start_time + timedelta(hours=2)
+        zone = Zone.objects.first()
+        zone_id = zone.id if zone else 0
+        user_id = Booking.objects.filter(user__isnull=False).values_list('user_id', flat=True).first() or 0
+
+        queries = [
+            ('Свободные места на текущий момент (все зоны)',
+             Zone.objects.with_available_seats()),
+            ('Пересекающиеся бронирования для интервала (одна зона)',
+             Booking.objects.filter(
+                 zone_id=zone_id, start_time__lt=end_time, end_time__gt=start_time
+             ).exclude(status='cancelled').order_by().values_list(
+                 'zone_id', 'start_time', 'end_time', 'number_of_people'
+             )),
+            ('Пересекающиеся бронирования для интервала (все зоны)',
+             Booking.objects.filter(
+                 zone__in=Zone.objects.all(), start_time__lt=end_time, end_time__gt=start_time
+             ).exclude(status='cancelled').order_by().values_list(
+                 'zone_id', 'start_time', 'end_time', 'number_of_people'
+             )),
+            ('История бронирований пользователя',
+             Booking.objects.filter(user_id=user_id).order_by('-created_at')),
+            ('Последние бронирования в личном кабинете',
+             Booking.objects.filter(user_id=user_id).order_by('-created_at')[:5]),
+        ]
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        self.stdout.write(f'База данных: {connection.vendor}')
+        for title, queryset in queries:
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
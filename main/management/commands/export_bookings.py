@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from main.exports import EXPORT_FORMATS, export_lines
+from main.models import Booking
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка бронирований в CSV или JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help='Файл для выгрузки (по умолчанию stdout)')
+        parser.add_argument('--status', action='append', help='Только бронирования с этим статусом')
+        parser.add_argument('--zone', type=int, action='append', help='Только бронирования этой зоны')
+        parser.add_argument('--from', dest='date_from', help='Начало не раньше даты (ГГГГ-ММ-ДД)')
+        parser.add_argument('--to', dest='date_to', help='Начало не позже даты (ГГГГ-ММ-ДД)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Сколько строк читать из БД за раз')
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.all()
+        if options['status']:
+            bookings = bookings.filter(status__in=options['status'])
+        if options['zone']:
+            bookings = bookings.filter(zone_id__in=options['zone'])
+        for option, lookup in (('date_from', 'start_time__date__gte'), ('date_to', 'start_time__date__lte')):
+            if options[option]:
+                try:
+                    # ValueError - дата в верном формате, но несуществующая (2026-02-30)
+                    day = parse_date(options[option])
+                except ValueError:
+                    day = None
+                if not day:
+                    raise CommandError(f'Некорректная дата: {options[option]}')
+                bookings = bookings.filter(**{lookup: day})
+
+        lines = export_lines(bookings, options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                written = 0
+                for line in lines:
+                    output.write(line)
+                    written += line.endswith('\n')
+            # Заголовок CSV не считается
+            written -= options['format'] == 'csv'
+            self.stderr.write(f'Выгружено строк: {written} в {options["output"]}')
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
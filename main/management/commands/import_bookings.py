@@ -0,0 +1,41 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.imports import import_bookings, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Массовый импорт бронирований из CSV или JSON Lines с проверкой вместимости'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с бронированиями')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Формат файла (по умолчанию по расширению)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Бронирований на одну транзакцию')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить, ничего не записывая')
+        parser.add_argument('--report', help='Куда записать отчет об отклоненных строках (CSV)')
+
+    def handle(self, *args, **options):
+        import_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if import_format not in ('csv', 'jsonl'):
+            raise CommandError('Не удалось определить формат файла, укажите --format')
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            result = import_bookings(
+                read_rows(stream, import_format), chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+            )
+
+        if options['report'] and result.rejected:
+            with open(options['report'], 'w', encoding='utf-8', newline='') as report:
+                report.write(result.report_lines())
+
+        for rejection in result.rejected[:20]:
+            self.stderr.write(f'Строка {rejection["line"]}: {rejection["reason"]}')
+        if len(result.rejected) > 20:
+            self.stderr.write(f'... и еще {len(result.rejected) - 20} (см. --report)')
+
+        action = 'Проверено' if options['dry_run'] else 'Создано'
+        count = result.accepted if options['dry_run'] else result.created
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} бронирований: {count}, отклонено: {len(result.rejected)}, за {result.elapsed:.2f} с'
+        ))
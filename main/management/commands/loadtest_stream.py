@@ -0,0 +1,134 @@
+import asyncio
+import time
+import tracemalloc
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.utils import timezone
+
+from main.benchmarks.runner import rolled_back
+from main.models import Zone, Booking
+from main.snapshot import invalidate_availability
+from main.streaming import broadcaster
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест потока /api/availability/stream/: сколько подписчиков держит один процесс'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=500, help='Количество одновременных подписчиков')
+        parser.add_argument('--changes', type=int, default=3, help='Сколько раз изменить загрузку во время теста')
+        parser.add_argument('--interval', type=float, default=2.0, help='Пауза между изменениями, сек.')
+
+    def handle(self, *args, **options):
+        # Тестовые бронирования создаются в транзакции и откатываются в конце,
+        # даже если тест прервется. Как в тестовом клиенте Django, запросы не
+        # закрывают соединение: иначе транзакция оборвалась бы на первом же
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            with rolled_back():
+                async_to_sync(self.run)(options['subscribers'], options['changes'], options['interval'])
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+
+    async def run(self, subscribers, changes, interval):
+        # Приложение импортируется здесь, чтобы не настраивать Django повторно
+        from anticafe.asgi import application
+
+        zone = await Zone.objects.with_available_seats().filter(available_seats__gt=0).order_by('id').afirst()
+        if zone is None:
+            self.stderr.write('Нет зоны со свободными местами - создайте зону перед тестом')
+            return
+
+        stop = asyncio.Event()
+        received = [0] * subscribers
+        last_event_at = [0.0] * subscribers
+
+        def make_client(index):
+            request_sent = False
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await stop.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.body':
+                    count = message.get('body', b'').count(b'event: occupancy')
+                    if count:
+                        received[index] += count
+                        last_event_at[index] = time.perf_counter()
+
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': '/api/availability/stream/',
+                'raw_path': b'/api/availability/stream/',
+                'query_string': b'',
+                'root_path': '',
+                'headers': [(b'host', b'localhost')],
+                'client': ('127.0.0.1', 10000 + index),
+                'server': ('localhost', 80),
+            }
+            return application(scope, receive, send)
+
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+
+        tasks = [asyncio.create_task(make_client(index)) for index in range(subscribers)]
+        while min(received) == 0:
+            await asyncio.sleep(0.05)
+
+        connect_time = time.perf_counter() - started
+        memory_per_subscriber = (tracemalloc.get_traced_memory()[0] - memory_before) / subscribers
+
+        fan_out_times = []
+        for _ in range(changes):
+            now = timezone.now()
+            changed_at = time.perf_counter()
+            booking = await Booking.objects.acreate(
+                zone=zone, customer_name='Нагрузочный тест', customer_phone='+70000000000',
+                customer_email='loadtest@example.com', number_of_people=1,
+                start_time=now - timedelta(minutes=1), end_time=now + timedelta(hours=1),
+                status='confirmed',
+            )
+            # Сигнал сбрасывает версию только после коммита, а транзакция будет
+            # откачена - сбрасываем сами, как это сделал бы коммит
+            await sync_to_async(invalidate_availability)()
+            expected = [count + 1 for count in received]
+            while any(count < target for count, target in zip(received, expected)):
+                await asyncio.sleep(0.01)
+            fan_out_times.append(max(last_event_at) - changed_at)
+
+            await sync_to_async(booking.delete)()
+            await sync_to_async(invalidate_availability)()
+            expected = [target + 1 for target in expected]
+            while any(count < target for count, target in zip(received, expected)):
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(interval)
+
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        tracemalloc.stop()
+        # Снимок в кэше мог описывать откатываемые бронирования
+        await sync_to_async(invalidate_availability)()
+
+        self.stdout.write(f'Подписчиков: {subscribers} (в брокере: {broadcaster.subscribers} после отключения)')
+        self.stdout.write(f'Подключение всех подписчиков: {connect_time:.2f} с')
+        self.stdout.write(f'Память на подписчика: {memory_per_subscriber / 1024:.1f} КБ')
+        if fan_out_times:
+            average = sum(fan_out_times) / len(fan_out_times)
+            self.stdout.write(f'Доставка изменения всем подписчикам: в среднем {average * 1000:.0f} мс')
+        self.stdout.write(self.style.SUCCESS(f'Получено событий: {sum(received)}'))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.occupancy import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает почасовую загрузку зон из бронирований'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Размер пачки для bulk_create')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = rebuild_occupancy(chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Записано часов загрузки: {created} за {elapsed:.2f} с'))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.stats import refresh_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Собирает дневные итоги по зонам, пересчитывая только измененные с прошлого запуска дни'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Пересобрать итоги за все время')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Размер пачки при полной сборке')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        days = refresh_daily_stats(full=options['full'], chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        mode = 'полная сборка' if options['full'] else 'инкрементально'
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано дней по зонам: {days} ({mode}) за {elapsed:.2f} с'))
@@ -0,0 +1,180 @@
+import fnmatch
+import json
+import logging
+import time
+from contextlib import nullcontext
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from main.benchmarks import BENCHMARKS, BenchmarkError, DatasetSpec, build_context, generate_dataset, measure
+from main.benchmarks.runner import compare, environment
+from main.occupancy import rebuild_occupancy
+from main.snapshot import invalidate_availability
+from main.stats import refresh_daily_stats
+
+
+class Command(BaseCommand):
+    help = ('Генерирует синтетические данные и замеряет время и число SQL-запросов горячих путей. '
+            'Результаты в JSON можно сравнивать между коммитами')
+
+    def add_arguments(self, parser):
+        dataset = parser.add_argument_group('данные')
+        dataset.add_argument('--zones', type=int, default=10, help='Количество зон')
+        dataset.add_argument('--users', type=int, default=1000, help='Количество пользователей')
+        dataset.add_argument('--bookings', type=int, default=100000, help='Количество бронирований')
+        dataset.add_argument('--days-back', type=int, default=90, help='Сколько дней истории')
+        dataset.add_argument('--days-ahead', type=int, default=30, help='На сколько дней вперед бронируют')
+        dataset.add_argument('--batch-size', type=int, default=5000, help='Размер пачки bulk_create')
+        dataset.add_argument('--seed', type=int, default=42)
+        dataset.add_argument('--existing', action='store_true',
+                             help='Не генерировать данные, замерять на текущей базе')
+        dataset.add_argument('--keep', action='store_true',
+                             help='Сохранить сгенерированные данные (по умолчанию все откатывается)')
+
+        parser.add_argument('--repeat', type=int, default=50, help='Замеряемых итераций на бенчмарк')
+        parser.add_argument('--warmup', type=int, default=5, help='Итераций прогрева без замера')
+        parser.add_argument('--only', action='append', default=[],
+                            help='Шаблон имени бенчмарка, например view.* (можно указать несколько)')
+        parser.add_argument('--list', action='store_true', help='Показать доступные бенчмарки')
+        parser.add_argument('--output', help='Куда записать результаты в JSON')
+        parser.add_argument('--json', action='store_true', help='Вывести JSON вместо таблицы')
+        parser.add_argument('--compare', help='JSON предыдущего запуска для сравнения')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            self.stdout.write('\n'.join(BENCHMARKS))
+            return
+
+        names = [
+            name for name in BENCHMARKS
+            if not options['only'] or any(fnmatch.fnmatchcase(name, pattern) for pattern in options['only'])
+        ]
+        if not names:
+            raise CommandError('Ни один бенчмарк не подходит под --only (см. --list)')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть больше 0')
+
+        previous = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                previous = json.load(stream)
+
+        spec = DatasetSpec(
+            zones=options['zones'], users=options['users'], bookings=options['bookings'],
+            days_back=options['days_back'], days_ahead=options['days_ahead'],
+            seed=options['seed'], batch_size=options['batch_size'],
+        )
+        # Тестовый клиент обращается к хосту testserver; DEBUG выключен,
+        # чтобы Django не накапливал connection.queries
+        settings_override = override_settings(ALLOWED_HOSTS=['testserver'], DEBUG=False)
+        rollback = not options['keep']
+        user_ids = []
+
+        # Журнал созданных бронирований в консоль исказил бы замеры
+        logging.disable(logging.INFO)
+        with settings_override, (transaction.atomic() if rollback else nullcontext()):
+            try:
+                if options['existing']:
+                    dataset_info = {'existing': True}
+                    member = None
+                    zones = None
+                else:
+                    dataset_info, zones, user_ids = self._generate(spec)
+                    member = User.objects.get(id=user_ids[0]) if user_ids else None
+                context = build_context(zones, member, seed=spec.seed, days_ahead=spec.days_ahead)
+                dataset_info['member_bookings'] = context.member.bookings.count()
+
+                results = {}
+                for name in names:
+                    self.stderr.write(f'{name}...', ending='')
+                    self.stderr.flush()
+                    results[name] = measure(BENCHMARKS[name](context), options['repeat'], options['warmup'])
+                    self.stderr.write(f' p50 {results[name]["p50_ms"]:.2f} мс')
+            except BenchmarkError as e:
+                raise CommandError(str(e))
+            finally:
+                logging.disable(logging.NOTSET)
+                if rollback:
+                    transaction.set_rollback(True)
+
+        if rollback:
+            # Кэш пережил откат: снимок и сводки могли описывать удаленные
+            # данные, а версия откатилась вместе с ними
+            invalidate_availability()
+
+        report = {
+            'meta': {**environment(), 'repeat': options['repeat'], 'warmup': options['warmup']},
+            'dataset': dataset_info,
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            self._print_table(results)
+        if previous:
+            # При --json сравнение не должно попасть в вывод с данными
+            self._print_comparison(compare(previous, report), self.stderr if options['json'] else self.stdout)
+
+    def _generate(self, spec):
+        started = time.perf_counter()
+        dataset = generate_dataset(spec, progress=lambda count: self.stderr.write(
+            f'\rБронирований: {count}/{spec.bookings}', ending='',
+        ))
+        self.stderr.write('')
+        generated = time.perf_counter() - started
+
+        # bulk_create обходит сигналы: производные таблицы собираются заново
+        started = time.perf_counter()
+        rebuild_occupancy(chunk_size=spec.batch_size)
+        refresh_daily_stats(full=True, chunk_size=spec.batch_size)
+        invalidate_availability()
+        derived = time.perf_counter() - started
+
+        info = {
+            'existing': False,
+            'spec': vars(spec),
+            'zones': len(dataset.zones),
+            'users': len(dataset.user_ids),
+            'bookings': dataset.bookings,
+            'skipped': dataset.skipped,
+            'generate_seconds': round(generated, 2),
+            'derived_seconds': round(derived, 2),
+        }
+        self.stderr.write(
+            f'Создано: зон {info["zones"]}, пользователей {info["users"]}, бронирований {info["bookings"]} '
+            f'(пропущено из-за вместимости: {info["skipped"]}) за {generated:.1f} с, '
+            f'производные таблицы за {derived:.1f} с'
+        )
+        return info, dataset.zones, dataset.user_ids
+
+    def _print_table(self, results):
+        header = f'{"Бенчмарк":<36} {"ср.":>9} {"p50":>9} {"p90":>9} {"p95":>9} {"p99":>9} {"макс":>9} {"SQL":>6}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name[:36]:<36} '
+                + ' '.join(f'{row[key]:>9.2f}' for key in ('mean_ms', 'p50_ms', 'p90_ms', 'p95_ms', 'p99_ms', 'max_ms'))
+                + f' {row["queries_mean"]:>6.1f}'
+            )
+        self.stdout.write('Время в мс, SQL - среднее число запросов на итерацию')
+
+    def _print_comparison(self, rows, output):
+        if not rows:
+            output.write('Нет общих бенчмарков для сравнения')
+            return
+        output.write(f'{"Бенчмарк":<36} {"p50 было":>10} {"стало":>9} {"%":>7} {"p95 было":>10} {"стало":>9} {"%":>7} {"SQL":>11}')
+        for row in rows:
+            cells = []
+            for key in ('p50_ms', 'p95_ms'):
+                old, new, change = row[key]
+                cells.append(f'{old:>10.2f} {new:>9.2f} {change if change is not None else 0:>+7.1f}')
+            old_queries, new_queries, _ = row['queries_mean']
+            output.write(f'{row["name"][:36]:<36} ' + ' '.join(cells) + f' {old_queries:>5.1f}→{new_queries:<5.1f}')
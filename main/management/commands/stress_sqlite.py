@@ -0,0 +1,229 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, transaction
+from django.utils import timezone
+
+from main.models import Booking, Zone
+from main.profiling import BUCKET_COUNT, bucket_index, histogram_percentile, merge_histograms
+from main.reservations import CapacityExceeded, reserve_booking
+from main.sqlite import is_lock_error
+
+PROFILES = ('development', 'production')
+ZONE_TITLE = 'Нагрузка SQLite {number}'
+
+
+class RetryCounter(logging.Handler):
+    """Считает повторы retry_on_lock по его предупреждениям"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def edit_booking(booking_id):
+    """Правка брони как в админке: чтение и сохранение в одной транзакции, без повторов"""
+    with transaction.atomic():
+        booking = Booking.objects.get(pk=booking_id)
+        booking.status = 'cancelled' if booking.status == 'confirmed' else 'confirmed'
+        booking.save()
+
+
+class Command(BaseCommand):
+    help = ('Нагружает SQLite записью из нескольких процессов (брони и правки администратора) '
+            'и сравнивает профили development и production: записей в секунду и ошибок блокировки. '
+            'Работает на копии базы, сама база не меняется')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='Число процессов-писателей')
+        parser.add_argument('--seconds', type=float, default=10, help='Длительность нагрузки')
+        parser.add_argument('--edit-share', type=float, default=0.2,
+                            help='Доля правок существующих броней среди операций')
+        parser.add_argument('--zones', type=int, default=4, help='Зон для нагрузки')
+        parser.add_argument('--profile', choices=PROFILES, action='append', help='Только указанный профиль')
+        parser.add_argument('--json', action='store_true', help='Вывести JSON вместо таблицы')
+        # Внутренние режимы дочерних процессов
+        parser.add_argument('--worker', choices=('setup', 'write'), help=argparse.SUPPRESS)
+        parser.add_argument('--zone-ids', help=argparse.SUPPRESS)
+        parser.add_argument('--start-at', type=float, help=argparse.SUPPRESS)
+        parser.add_argument('--seed', type=int, default=0, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker'] == 'setup':
+            self._setup(options)
+            return
+        if options['worker'] == 'write':
+            self._write(options)
+            return
+        if options['processes'] < 1:
+            raise CommandError('--processes должен быть больше 0')
+
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in options['profile'] or PROFILES:
+                path = os.path.join(directory, f'{profile}.sqlite3')
+                self._copy_database(path, wal=profile == 'production')
+                results.append(self._run_profile(profile, path, options))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            self._print_table(results)
+
+    def _copy_database(self, path, wal):
+        """Копия текущей базы; журнал копии соответствует профилю"""
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        target = sqlite3.connect(path)
+        try:
+            source.backup(target)
+            target.execute(f'PRAGMA journal_mode={"WAL" if wal else "DELETE"}')
+        finally:
+            target.close()
+            source.close()
+
+    def _command(self, *arguments):
+        return [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'stress_sqlite', *arguments]
+
+    def _run_profile(self, profile, path, options):
+        env = {**os.environ, 'DJANGO_SQLITE_PATH': path, 'DJANGO_SQLITE_PROFILE': profile, 'DJANGO_DEBUG': '0'}
+        self.stderr.write(f'{profile}: подготовка копии базы...', ending='')
+        self.stderr.flush()
+        setup = subprocess.run(self._command('--worker', 'setup', '--zones', str(options['zones'])),
+                               env=env, capture_output=True, text=True)
+        if setup.returncode:
+            raise CommandError(f'Не удалось подготовить копию базы:\n{setup.stderr}')
+        zone_ids = json.loads(setup.stdout)
+
+        # Процессы запускаются заранее и начинают запись одновременно
+        start_at = time.time() + 2 + 0.5 * options['processes']
+        workers = [
+            subprocess.Popen(self._command(
+                '--worker', 'write', '--zone-ids', ','.join(map(str, zone_ids)),
+                '--start-at', str(start_at), '--seconds', str(options['seconds']),
+                '--edit-share', str(options['edit_share']), '--seed', str(number),
+            ), env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            for number in range(options['processes'])
+        ]
+        reports = []
+        for worker in workers:
+            stdout, stderr = worker.communicate()
+            if worker.returncode:
+                raise CommandError(f'Процесс нагрузки завершился с ошибкой:\n{stderr}')
+            reports.append(json.loads(stdout))
+        self.stderr.write(' готово')
+
+        totals = {'profile': profile, 'processes': options['processes'], 'seconds': options['seconds']}
+        for key in ('bookings', 'edits', 'rejected', 'lock_errors', 'retries', 'late_start'):
+            totals[key] = sum(report[key] for report in reports)
+        histogram = []
+        for report in reports:
+            histogram = merge_histograms(histogram, report['histogram'])
+        maximum = max(report['max_ms'] for report in reports)
+        for percent in (50, 95, 99):
+            totals[f'p{percent}_ms'] = histogram_percentile(histogram, percent, maximum)
+        totals['writes_per_second'] = round((totals['bookings'] + totals['edits']) / options['seconds'], 1)
+
+        # Каждая подтвержденная процессом бронь должна оказаться в базе
+        database = sqlite3.connect(path)
+        try:
+            stored = database.execute(
+                f'SELECT COUNT(*) FROM {Booking._meta.db_table} WHERE zone_id IN ({",".join("?" * len(zone_ids))})',
+                zone_ids,
+            ).fetchone()[0]
+        finally:
+            database.close()
+        totals['stored'] = stored
+        return totals
+
+    def _setup(self, options):
+        call_command('migrate', verbosity=0)
+        zones = Zone.objects.bulk_create([
+            Zone(title=ZONE_TITLE.format(number=number), description='Зона для нагрузочного теста',
+                 price_per_hour=300, capacity=10000)
+            for number in range(options['zones'])
+        ])
+        self.stdout.write(json.dumps([zone.id for zone in zones]))
+
+    def _write(self, options):
+        logging.disable(logging.INFO)
+        retries = RetryCounter()
+        retry_logger = logging.getLogger('main.sqlite')
+        retry_logger.addHandler(retries)
+        retry_logger.propagate = False
+
+        rng = random.Random(options['seed'])
+        zone_ids = [int(zone_id) for zone_id in options['zone_ids'].split(',')]
+        origin = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        report = {'bookings': 0, 'edits': 0, 'rejected': 0, 'lock_errors': 0, 'max_ms': 0.0}
+        histogram = [0] * BUCKET_COUNT
+        own_bookings = []
+
+        # Соединение и импорты готовы до старта, как у работающего сервера
+        Zone.objects.filter(id__in=zone_ids).count()
+        close_old_connections()
+        report['late_start'] = int(time.time() > options['start_at'])
+        time.sleep(max(0, options['start_at'] - time.time()))
+        deadline = options['start_at'] + options['seconds']
+
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                if own_bookings and rng.random() < options['edit_share']:
+                    edit_booking(rng.choice(own_bookings))
+                    report['edits'] += 1
+                else:
+                    start = origin + timedelta(minutes=30 * rng.randrange(60 * 48))
+                    booking = reserve_booking(
+                        rng.choice(zone_ids), start, start + timedelta(hours=rng.choice([1, 2, 3])),
+                        rng.randint(1, 4), 'Нагрузка', '+70000000000', 'stress@example.com',
+                    )
+                    own_bookings.append(booking.id)
+                    report['bookings'] += 1
+            except CapacityExceeded:
+                report['rejected'] += 1
+            except OperationalError as e:
+                if not is_lock_error(e):
+                    raise
+                report['lock_errors'] += 1
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            histogram[bucket_index(elapsed_ms)] += 1
+            report['max_ms'] = max(report['max_ms'], elapsed_ms)
+            # Граница запроса: как request_finished, закрывает соединение,
+            # если CONN_MAX_AGE не разрешает его держать
+            close_old_connections()
+
+        report['retries'] = retries.count
+        report['histogram'] = histogram
+        self.stdout.write(json.dumps(report))
+
+    def _print_table(self, results):
+        header = (f'{"Профиль":<12} {"процессов":>9} {"записей/с":>10} {"броней":>7} {"правок":>7} '
+                  f'{"блокировок":>10} {"повторов":>9} {"p50":>8} {"p95":>8} {"p99":>8} {"в базе":>7}')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in results:
+            self.stdout.write(
+                f'{row["profile"]:<12} {row["processes"]:>9} {row["writes_per_second"]:>10.1f} '
+                f'{row["bookings"]:>7} {row["edits"]:>7} {row["lock_errors"]:>10} {row["retries"]:>9} '
+                + ' '.join(f'{row[key] or 0:>8.1f}' for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+                + f' {row["stored"]:>7}'
+            )
+        self.stdout.write('Время операции в мс; блокировок - операций, завершившихся "database is locked"; '
+                          'в базе - сохраненных броней (должно совпадать с числом броней)')
+        if any(row['late_start'] for row in results):
+            self.stderr.write(self.style.WARNING('Часть процессов запустилась позже общего старта'))
@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from main.models import Booking, ACTIVE_STATUSES
+from main.occupancy import rebuild_occupancy
+from main.snapshot import invalidate_availability
+
+
+class Command(BaseCommand):
+    help = (
+        'Периодическое обслуживание: завершает прошедшие бронирования, '
+        'сбрасывает снимок доступности и сообщает время каждого шага'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Повторять обслуживание, пока процесс не остановят')
+        parser.add_argument('--interval', type=float, default=60.0, help='Пауза между запусками в режиме --loop, сек.')
+        parser.add_argument('--max-runs', type=int, default=0, help='Остановиться после N запусков (0 - без ограничения)')
+        parser.add_argument('--rebuild-occupancy', action='store_true',
+                            help='Дополнительно пересобрать почасовую загрузку с нуля')
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.run_once(options['rebuild_occupancy'])
+            return
+
+        runs = 0
+        try:
+            while True:
+                # Долгоживущий процесс не должен держать устаревшие соединения
+                close_old_connections()
+                try:
+                    self.run_once(options['rebuild_occupancy'])
+                except DatabaseError as error:
+                    # Ошибка одного запуска не останавливает планировщик
+                    self.stderr.write(f'Ошибка обслуживания: {error}')
+                runs += 1
+                if options['max_runs'] and runs >= options['max_runs']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Остановлено')
+
+    def run_once(self, rebuild=False):
+        timings = []
+        started = time.perf_counter()
+
+        # Один UPDATE вместо сохранения каждой брони. Завершенные брони
+        # по-прежнему учитываются в загрузке, поэтому почасовую таблицу
+        # пересчитывать не нужно.
+        step_started = time.perf_counter()
+        now = timezone.now()
+        completed = Booking.objects.filter(
+            status__in=ACTIVE_STATUSES, end_time__lt=now,
+        ).update(status='completed', updated_at=now)
+        timings.append(('завершение броней', time.perf_counter() - step_started))
+
+        if rebuild:
+            step_started = time.perf_counter()
+            buckets = rebuild_occupancy()
+            timings.append((f'почасовая загрузка ({buckets} строк)', time.perf_counter() - step_started))
+
+        # queryset.update() не отправляет сигналы: версия в БД меняется явно.
+        # Снимок соберет каждый процесс сервера при следующем запросе - кэш
+        # у них свой, и собранный здесь снимок до них бы не дошел
+        if completed or rebuild:
+            step_started = time.perf_counter()
+            invalidate_availability()
+            timings.append(('сброс снимка доступности', time.perf_counter() - step_started))
+
+        total = time.perf_counter() - started
+        details = ', '.join(f'{name}: {elapsed * 1000:.1f} мс' for name, elapsed in timings)
+        self.stdout.write(f'[{timezone.localtime():%d.%m.%Y %H:%M:%S}] {details}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Завершено броней: {completed}, всего {total * 1000:.1f} мс'
+        ))
+        return completed
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from main.models import ViewProfile
+from main.profiling import PROFILING_SORTS, profiles_report
+
+
+class Command(BaseCommand):
+    help = 'Выводит перцентили времени ответа и SQL по представлениям из накопленных гистограмм'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=list(PROFILING_SORTS), default='total', help='Порядок строк')
+        parser.add_argument('--limit', type=int, default=0, help='Сколько представлений вывести (0 - все)')
+        parser.add_argument('--json', action='store_true', help='Вывести JSON вместо таблицы')
+        parser.add_argument('--reset', action='store_true', help='Очистить накопленные гистограммы после вывода')
+
+    def handle(self, *args, **options):
+        report = profiles_report(PROFILING_SORTS[options['sort']])
+        if options['limit']:
+            report = report[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        elif not report:
+            self.stdout.write('Замеров пока нет: включите REQUEST_METRICS и дождитесь сброса гистограмм')
+        else:
+            header = f'{"Представление":<40} {"запросов":>9} {"p50":>9} {"p90":>9} {"p95":>9} {"p99":>9} {"макс":>9} {"SQL ср.":>8} {"SQL мс":>8}'
+            self.stdout.write(header)
+            self.stdout.write('-' * len(header))
+            for row in report:
+                self.stdout.write(
+                    f'{row["view"][:40]:<40} {row["requests"]:>9} '
+                    + ' '.join(f'{row[key] or 0:>9.1f}' for key in ('p50_ms', 'p90_ms', 'p95_ms', 'p99_ms', 'max_ms'))
+                    + f' {row["avg_queries"]:>8.1f} {row["avg_sql_ms"]:>8.1f}'
+                )
+            self.stdout.write('Время в мс; точность перцентилей - ширина корзины гистограммы (25%)')
+
+        if options['reset']:
+            deleted, _ = ViewProfile.objects.all().delete()
+            # При --json сообщение не должно попасть в вывод с данными
+            output = self.stderr if options['json'] else self.stdout
+            output.write(self.style.SUCCESS(f'Гистограммы очищены ({deleted} представлений)'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Начало часа')),
+                ('peak_seats', models.PositiveIntegerField(default=0, verbose_name='Максимум занятых мест')),
+                ('seat_minutes', models.PositiveIntegerField(default=0, verbose_name='Занято место-минут')),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_buckets', to='main.zone', verbose_name='Зона')),
+            ],
+            options={
+                'verbose_name': 'Почасовая загрузка',
+                'verbose_name_plural': 'Почасовая загрузка',
+                'constraints': [models.UniqueConstraint(fields=('zone', 'hour'), name='occupancy_bucket_zone_hour_uniq')],
+            },
+        ),
+    ]
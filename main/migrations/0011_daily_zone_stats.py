@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_occupancybucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+        migrations.CreateModel(
+            name='DailyZoneStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='День')),
+                ('bookings', models.PositiveIntegerField(default=0, verbose_name='Бронирований')),
+                ('cancelled', models.PositiveIntegerField(default=0, verbose_name='Отменено')),
+                ('people_hours', models.FloatField(default=0, verbose_name='Человеко-часов')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Выручка (руб.)')),
+                ('stale', models.BooleanField(default=False, verbose_name='Требует пересчета')),
+                ('computed_at', models.DateTimeField(verbose_name='Пересчитано')),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='main.zone', verbose_name='Зона')),
+            ],
+            options={
+                'verbose_name': 'Статистика за день',
+                'verbose_name_plural': 'Статистика по дням',
+                'ordering': ['-date', 'zone'],
+                'indexes': [models.Index(fields=['date', 'zone'], name='daily_zone_stats_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('zone', 'date'), name='daily_zone_stats_zone_date_uniq')],
+            },
+        ),
+    ]
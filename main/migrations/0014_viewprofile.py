@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_create_missing_profiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(max_length=200, unique=True, verbose_name='Представление')),
+                ('requests', models.PositiveBigIntegerField(default=0, verbose_name='Запросов')),
+                ('errors', models.PositiveBigIntegerField(default=0, verbose_name='Ошибок 5xx')),
+                ('total_ms', models.FloatField(default=0, verbose_name='Суммарное время, мс')),
+                ('max_ms', models.FloatField(default=0, verbose_name='Максимум, мс')),
+                ('queries', models.PositiveBigIntegerField(default=0, verbose_name='SQL-запросов')),
+                ('max_queries', models.PositiveIntegerField(default=0, verbose_name='Максимум SQL-запросов')),
+                ('sql_ms', models.FloatField(default=0, verbose_name='Время SQL, мс')),
+                ('latency_histogram', models.JSONField(default=list, verbose_name='Гистограмма времени ответа')),
+                ('sql_histogram', models.JSONField(default=list, verbose_name='Гистограмма времени SQL')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Профиль представления',
+                'verbose_name_plural': 'Профили представлений',
+                'ordering': ['view_name'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Индекс по LOWER(email) для входа по email (main.backends).
+
+    Модель пользователя принадлежит django.contrib.auth, поэтому
+    функциональный индекс создается SQL-запросом, а не через Meta.indexes.
+    """
+
+    dependencies = [
+        ('main', '0014_viewprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_email_lower_idx ON auth_user (LOWER(email));',
+            'DROP INDEX auth_user_email_lower_idx;',
+        ),
+    ]
@@ -1,7 +1,14 @@
 from django.db import models
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.contrib.auth.models import User
+from .availability import peak_occupancy, peak_occupancy_by_zone
+from .expressions import DurationMicroseconds, HoursInTenths, TruncateToInteger
+
+# Статусы, при которых бронирование занимает места
+ACTIVE_STATUSES = ('pending', 'confirmed')
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -18,55 +25,194 @@ class UserProfile(models.Model):
         verbose_name_plural = 'Профили пользователей'
 
 
+class ZoneQuerySet(models.QuerySet):
+    """Движок доступности: считает занятые места для всех зон одним запросом"""
+
+    def _occupied_seats(self, start_time=None, end_time=None, exclude_booking_id=None):
+        """
+        Выражение для количества занятых мест в зоне.
+
+        Без интервала считается загрузка на текущий момент, с интервалом -
+        сумма мест всех неотмененных бронирований, пересекающих интервал.
+        Для интервала это верхняя оценка: точную пиковую загрузку
+        возвращает peak_occupancy_map().
+        """
+        bookings = Booking.objects.filter(zone=OuterRef('pk'))
+        if start_time is None or end_time is None:
+            now = timezone.now()
+            bookings = bookings.filter(
+                status__in=ACTIVE_STATUSES,
+                start_time__lte=now,
+                end_time__gte=now,
+            )
+        else:
+            if timezone.is_naive(start_time):
+                start_time = timezone.make_aware(start_time)
+            if timezone.is_naive(end_time):
+                end_time = timezone.make_aware(end_time)
+            bookings = bookings.filter(
+                start_time__lt=end_time,
+                end_time__gt=start_time,
+            ).exclude(status='cancelled')
+            if exclude_booking_id:
+                bookings = bookings.exclude(id=exclude_booking_id)
+
+        occupied = bookings.order_by().values('zone').annotate(
+            total=Sum('number_of_people')
+        ).values('total')
+        return Coalesce(Subquery(occupied), Value(0))
+
+    def with_occupied_seats(self, start_time=None, end_time=None, exclude_booking_id=None):
+        """Добавляет аннотацию occupied_seats"""
+        return self.annotate(
+            occupied_seats=self._occupied_seats(start_time, end_time, exclude_booking_id)
+        )
+
+    def with_available_seats(self, start_time=None, end_time=None, exclude_booking_id=None):
+        """Добавляет аннотацию available_seats"""
+        occupied = self._occupied_seats(start_time, end_time, exclude_booking_id)
+        return self.annotate(
+            available_seats=Greatest(F('capacity') - occupied, Value(0))
+        )
+
+    def with_next_changes(self, moment=None):
+        """
+        Добавляет аннотации next_start и next_end - ближайшие начало и
+        окончание активных бронирований, после которых изменится загрузка.
+        """
+        moment = moment or timezone.now()
+        active = Booking.objects.filter(zone=OuterRef('pk'), status__in=ACTIVE_STATUSES).order_by()
+        return self.annotate(
+            next_start=Subquery(
+                active.filter(start_time__gt=moment).order_by('start_time').values('start_time')[:1]
+            ),
+            next_end=Subquery(
+                active.filter(end_time__gte=moment).order_by('end_time').values('end_time')[:1]
+            ),
+        )
+
+    def _overlapping_rows(self, start_time, end_time, exclude_booking_id=None):
+        """Интервал в виде aware-дат и строки бронирований зон, пересекающих его"""
+        if timezone.is_naive(start_time):
+            start_time = timezone.make_aware(start_time)
+        if timezone.is_naive(end_time):
+            end_time = timezone.make_aware(end_time)
+
+        bookings = Booking.objects.filter(
+            zone__in=self,
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+        ).exclude(status='cancelled')
+        if exclude_booking_id:
+            bookings = bookings.exclude(id=exclude_booking_id)
+
+        rows = bookings.order_by().values_list('zone_id', 'start_time', 'end_time', 'number_of_people')
+        return start_time, end_time, rows
+
+    def peak_occupancy_map(self, start_time, end_time, exclude_booking_id=None):
+        """
+        Возвращает словарь {id зоны: пиковая загрузка} для интервала.
+
+        Бронирования всех зон выбираются одним запросом, а максимум
+        одновременно занятых мест считается заметающей прямой.
+        """
+        start_time, end_time, rows = self._overlapping_rows(start_time, end_time, exclude_booking_id)
+        return peak_occupancy_by_zone(rows, start_time, end_time)
+
+    async def apeak_occupancy_map(self, start_time, end_time, exclude_booking_id=None):
+        """Асинхронная версия peak_occupancy_map()"""
+        start_time, end_time, rows = self._overlapping_rows(start_time, end_time, exclude_booking_id)
+        return peak_occupancy_by_zone([row async for row in rows], start_time, end_time)
+
+    def available_seats_for_intervals(self, checks):
+        """
+        Пакетная проверка: checks - список (id зоны, начало, конец).
+
+        Бронирования для всех проверок выбираются одним запросом. Возвращает
+        список свободных мест в том же порядке (None для неизвестной зоны).
+        """
+        checks = [
+            (zone_id,
+             timezone.make_aware(start) if timezone.is_naive(start) else start,
+             timezone.make_aware(end) if timezone.is_naive(end) else end)
+            for zone_id, start, end in checks
+        ]
+        if not checks:
+            return []
+
+        capacities = dict(self.filter(id__in={zone_id for zone_id, _, _ in checks}).values_list('id', 'capacity'))
+
+        condition = Q()
+        for zone_id, start, end in checks:
+            condition |= Q(zone_id=zone_id, start_time__lt=end, end_time__gt=start)
+        intervals_by_zone = {}
+        rows = Booking.objects.filter(condition).exclude(status='cancelled').order_by().values_list(
+            'zone_id', 'start_time', 'end_time', 'number_of_people'
+        )
+        for zone_id, start, end, people in rows:
+            intervals_by_zone.setdefault(zone_id, []).append((start, end, people))
+
+        results = []
+        for zone_id, start, end in checks:
+            if zone_id not in capacities:
+                results.append(None)
+                continue
+            peak = peak_occupancy(intervals_by_zone.get(zone_id, []), start, end)
+            results.append(max(0, capacities[zone_id] - peak))
+        return results
+
+    def available_seats_map(self, start_time=None, end_time=None, exclude_booking_id=None):
+        """
+        Возвращает словарь {id зоны: свободные места}.
+
+        Для интервала возвращается минимум свободных мест, то есть
+        вместимость за вычетом пиковой загрузки внутри интервала.
+        """
+        if start_time is None or end_time is None:
+            return dict(self.with_available_seats().values_list('id', 'available_seats'))
+
+        peaks = self.peak_occupancy_map(start_time, end_time, exclude_booking_id)
+        return {
+            zone_id: max(0, capacity - peaks.get(zone_id, 0))
+            for zone_id, capacity in self.values_list('id', 'capacity')
+        }
+
+
 class Zone(models.Model):
     title = models.CharField(max_length=200, verbose_name='Название зоны')
     description = models.TextField(verbose_name='Описание')
     price_per_hour = models.IntegerField(verbose_name='Цена за час (руб.)')
     capacity = models.IntegerField(verbose_name='Вместимость (чел.)')
 
+    objects = ZoneQuerySet.as_manager()
+
     def __str__(self):
         return self.title
     
     def get_available_seats(self):
-        now = timezone.now()
-        
-        active_bookings = self.bookings.filter(
-            status__in=['pending', 'confirmed'], 
-            start_time__lte=now, 
-            end_time__gte=now     
-        )
-        
-        total_occupied_seats = sum(booking.number_of_people for booking in active_bookings)
-        
-        available_seats = max(0, self.capacity - total_occupied_seats)
-        return available_seats
+        return Zone.objects.filter(pk=self.pk).available_seats_map().get(self.pk, 0)
     
     def get_available_seats_for_time(self, start_time, end_time, exclude_booking_id=None):
-        if timezone.is_naive(start_time):
-            start_time = timezone.make_aware(start_time)
-        if timezone.is_naive(end_time):
-            end_time = timezone.make_aware(end_time)
-        
-        overlapping_bookings = self.bookings.filter(
-            start_time__lt=end_time,
-            end_time__gt=start_time,
-        ).exclude(status='cancelled') 
-        
-        if exclude_booking_id:
-            overlapping_bookings = overlapping_bookings.exclude(id=exclude_booking_id)
-        
-        total_occupied_seats = sum(booking.number_of_people for booking in overlapping_bookings)
-        
-        return max(0, self.capacity - total_occupied_seats)
+        """Минимум свободных мест в интервале с учетом пиковой загрузки"""
+        peak = Zone.objects.filter(pk=self.pk).peak_occupancy_map(
+            start_time, end_time, exclude_booking_id
+        ).get(self.pk, 0)
+        return max(0, self.capacity - peak)
+    
+    async def aget_available_seats_for_time(self, start_time, end_time, exclude_booking_id=None):
+        """Асинхронная версия get_available_seats_for_time()"""
+        peaks = await Zone.objects.filter(pk=self.pk).apeak_occupancy_map(start_time, end_time, exclude_booking_id)
+        return max(0, self.capacity - peaks.get(self.pk, 0))
     
     def is_available_for_time(self, start_time, end_time, number_of_people=1, exclude_booking_id=None):
         """Проверяет, доступна ли зона на указанный интервал времени для указанного количества человек"""
         available_seats = self.get_available_seats_for_time(start_time, end_time, exclude_booking_id)
         return available_seats >= number_of_people
     
-    def get_availability_status(self):
+    def get_availability_status(self, available_seats=None):
         """Возвращает статус доступности на текущий момент"""
-        available_seats = self.get_available_seats()
+        if available_seats is None:
+            available_seats = self.get_available_seats()
         if available_seats == 0:
             return 'fully_booked'
         elif available_seats < self.capacity:
@@ -79,6 +225,36 @@ class Zone(models.Model):
         verbose_name_plural = 'Зоны'
 
 
+class BookingQuerySet(models.QuerySet):
+    """Длительность и стоимость бронирований, вычисляемые в БД"""
+
+    def with_duration(self):
+        """
+        Аннотирует duration_hours - длительность в часах, округленную до
+        десятых так же, как get_duration_hours().
+        """
+        return self.annotate(
+            duration_hours=HoursInTenths(DurationMicroseconds('end_time', 'start_time')),
+        )
+
+    def with_price(self):
+        """Аннотирует duration_hours и total_price - то же, что get_total_price()"""
+        if 'total_price' in self.query.annotations:
+            return self
+        queryset = self if 'duration_hours' in self.query.annotations else self.with_duration()
+        return queryset.annotate(
+            total_price=TruncateToInteger(F('duration_hours') * F('zone__price_per_hour')),
+        )
+
+    def totals(self):
+        """Количество бронирований, сумма часов и выручка одним запросом"""
+        return self.with_price().aggregate(
+            bookings=Count('id'),
+            hours=Coalesce(Sum('duration_hours'), Value(0.0)),
+            revenue=Coalesce(Sum('total_price'), Value(0)),
+        )
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Ожидание'),
@@ -105,6 +281,25 @@ class Booking(models.Model):
     # Статус
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='Статус')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания брони')
+    # Массовые queryset.update() должны выставлять его явно
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')
+
+    objects = BookingQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Загруженные значения нужны, чтобы после изменения пересчитать
+        # почасовую загрузку и для прежнего интервала
+        instance._occupancy_state = instance.occupancy_state()
+        return instance
+
+    def occupancy_state(self):
+        """Поля, от которых зависит почасовая загрузка зоны"""
+        return tuple(
+            self.__dict__.get(name)
+            for name in ('zone_id', 'start_time', 'end_time', 'number_of_people', 'status')
+        )
 
     def __str__(self):
         return f"{self.customer_name} - {self.zone.title} ({self.start_time.strftime('%d.%m.%Y %H:%M')})"
@@ -142,6 +337,132 @@ class Booking(models.Model):
         verbose_name = 'Бронирование'
         verbose_name_plural = 'Бронирования'
         ordering = ['-created_at']
+        indexes = [
+            # Проверка пересечений по зоне и интервалу
+            models.Index(
+                fields=['zone', 'start_time', 'end_time'],
+                condition=~Q(status='cancelled'),
+                name='booking_zone_overlap_idx',
+            ),
+            # Загрузка на текущий момент (только активные бронирования)
+            models.Index(
+                fields=['zone', 'start_time', 'end_time'],
+                condition=Q(status__in=ACTIVE_STATUSES),
+                name='booking_zone_active_idx',
+            ),
+            # Универсальный индекс для СУБД без частичных индексов
+            models.Index(
+                fields=['zone', 'status', 'start_time', 'end_time'],
+                name='booking_zone_status_time_idx',
+            ),
+            # История бронирований пользователя: порядок совпадает с курсором (created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'], name='booking_user_history_idx'),
+        ]
+
+
+class OccupancyBucket(models.Model):
+    """
+    Загрузка зоны за один час, собранная из бронирований.
+
+    Таблица поддерживается сервисом main/occupancy.py: при каждом изменении
+    бронирования пересчитываются только затронутые им часы.
+    """
+    zone = models.ForeignKey(Zone, on_delete=models.CASCADE, verbose_name='Зона', related_name='occupancy_buckets')
+    hour = models.DateTimeField(verbose_name='Начало часа')
+    peak_seats = models.PositiveIntegerField(default=0, verbose_name='Максимум занятых мест')
+    seat_minutes = models.PositiveIntegerField(default=0, verbose_name='Занято место-минут')
+
+    def __str__(self):
+        return f"{self.zone_id} - {self.hour:%d.%m.%Y %H:%M}: {self.peak_seats}"
+
+    class Meta:
+        verbose_name = 'Почасовая загрузка'
+        verbose_name_plural = 'Почасовая загрузка'
+        constraints = [
+            models.UniqueConstraint(fields=['zone', 'hour'], name='occupancy_bucket_zone_hour_uniq'),
+        ]
+
+
+class DailyZoneStats(models.Model):
+    """
+    Дневные итоги по зоне: бронирования, человеко-часы, выручка и отмены.
+
+    Бронирование относится к дню своего начала (по местному времени).
+    Таблица собирается командой rollup_daily_stats из main/stats.py.
+    """
+    zone = models.ForeignKey(Zone, on_delete=models.CASCADE, verbose_name='Зона', related_name='daily_stats')
+    date = models.DateField(verbose_name='День')
+    bookings = models.PositiveIntegerField(default=0, verbose_name='Бронирований')
+    cancelled = models.PositiveIntegerField(default=0, verbose_name='Отменено')
+    people_hours = models.FloatField(default=0, verbose_name='Человеко-часов')
+    revenue = models.BigIntegerField(default=0, verbose_name='Выручка (руб.)')
+    stale = models.BooleanField(default=False, verbose_name='Требует пересчета')
+    computed_at = models.DateTimeField(verbose_name='Пересчитано')
+
+    def __str__(self):
+        return f"{self.zone_id} - {self.date:%d.%m.%Y}"
+
+    @property
+    def cancellation_rate(self):
+        """Доля отмененных бронирований за день"""
+        total = self.bookings + self.cancelled
+        return self.cancelled / total if total else 0.0
+
+    class Meta:
+        verbose_name = 'Статистика за день'
+        verbose_name_plural = 'Статистика по дням'
+        ordering = ['-date', 'zone']
+        constraints = [
+            models.UniqueConstraint(fields=['zone', 'date'], name='daily_zone_stats_zone_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'zone'], name='daily_zone_stats_date_idx'),
+        ]
+
+
+class AvailabilityVersion(models.Model):
+    """
+    Версия данных о доступности - одна строка. Увеличивается в той же
+    транзакции, что и изменение бронирований или зон, поэтому ее видят все
+    процессы сервера: по ней сбрасываются их локальные кэши (main/snapshot.py).
+    """
+    version = models.BigIntegerField(default=0, verbose_name='Версия')
+
+    def __str__(self):
+        return str(self.version)
+
+    class Meta:
+        verbose_name = 'Версия доступности'
+        verbose_name_plural = 'Версия доступности'
+
+
+class ViewProfile(models.Model):
+    """
+    Накопленные замеры одного представления (по имени URL).
+
+    Процессы сервера копят замеры в памяти и периодически добавляют их
+    сюда (main/profiling.py). Гистограммы - количества запросов по
+    корзинам из profiling.BUCKET_BOUNDS.
+    """
+    view_name = models.CharField(max_length=200, unique=True, verbose_name='Представление')
+    requests = models.PositiveBigIntegerField(default=0, verbose_name='Запросов')
+    errors = models.PositiveBigIntegerField(default=0, verbose_name='Ошибок 5xx')
+    total_ms = models.FloatField(default=0, verbose_name='Суммарное время, мс')
+    max_ms = models.FloatField(default=0, verbose_name='Максимум, мс')
+    queries = models.PositiveBigIntegerField(default=0, verbose_name='SQL-запросов')
+    max_queries = models.PositiveIntegerField(default=0, verbose_name='Максимум SQL-запросов')
+    sql_ms = models.FloatField(default=0, verbose_name='Время SQL, мс')
+    latency_histogram = models.JSONField(default=list, verbose_name='Гистограмма времени ответа')
+    sql_histogram = models.JSONField(default=list, verbose_name='Гистограмма времени SQL')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    def __str__(self):
+        return self.view_name
+
+    class Meta:
+        verbose_name = 'Профиль представления'
+        verbose_name_plural = 'Профили представлений'
+        ordering = ['view_name']
 
 
 class ContactMessage(models.Model):
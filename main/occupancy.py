@@ -0,0 +1,166 @@
+"""Материализованная почасовая загрузка зон"""
+from datetime import timedelta, timezone as dt_timezone
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Zone, Booking, OccupancyBucket
+from .slots import occupancy_segments
+
+HOUR = timedelta(hours=1)
+
+
+def hour_floor(moment):
+    """Начало часа, в который попадает момент (в UTC)"""
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def hour_ceil(moment):
+    """Ближайшая граница часа не раньше момента"""
+    floor = hour_floor(moment)
+    return floor if floor == moment else floor + HOUR
+
+
+def hourly_buckets(intervals, start, end):
+    """
+    Раскладывает загрузку одной зоны по часам внутри [start, end).
+
+    intervals - кортежи (начало, конец, количество человек), start и end -
+    границы часов. Возвращает {начало часа: (максимум занятых мест,
+    занято место-секунд)} только для часов, в которых кто-то был.
+    """
+    buckets = {}
+    for segment_start, segment_end, occupied in occupancy_segments(intervals, start, end):
+        if not occupied:
+            continue
+        hour = hour_floor(segment_start)
+        while hour < segment_end:
+            part = min(segment_end, hour + HOUR) - max(segment_start, hour)
+            peak, seat_seconds = buckets.get(hour, (0, 0))
+            buckets[hour] = (max(peak, occupied), seat_seconds + occupied * part.total_seconds())
+            hour += HOUR
+    return buckets
+
+
+def _bucket_objects(zone_id, buckets):
+    return [
+        OccupancyBucket(zone_id=zone_id, hour=hour, peak_seats=peak, seat_minutes=round(seat_seconds / 60))
+        for hour, (peak, seat_seconds) in sorted(buckets.items())
+    ]
+
+
+def refresh_occupancy(zone_id, start_time, end_time):
+    """
+    Пересчитывает часы зоны, которые задевает интервал [start_time, end_time).
+
+    Читаются только бронирования, пересекающие эти часы, поэтому стоимость
+    пересчета зависит от длины интервала, а не от размера таблицы.
+    """
+    if zone_id is None or start_time is None or end_time is None:
+        return
+    start = hour_floor(start_time)
+    end = hour_ceil(end_time)
+    if start >= end:
+        return
+
+    intervals = Booking.objects.filter(
+        zone_id=zone_id, start_time__lt=end, end_time__gt=start,
+    ).exclude(status='cancelled').order_by().values_list('start_time', 'end_time', 'number_of_people')
+    buckets = hourly_buckets(intervals, start, end)
+
+    with transaction.atomic():
+        OccupancyBucket.objects.filter(zone_id=zone_id, hour__gte=start, hour__lt=end).delete()
+        OccupancyBucket.objects.bulk_create(_bucket_objects(zone_id, buckets))
+
+
+def affected_ranges(queryset):
+    """
+    Интервалы по зонам, которые задевают бронирования из queryset.
+
+    Нужны для массовых изменений через queryset.update(), которые не
+    отправляют сигналы: диапазоны собираются до изменения и передаются
+    в refresh_ranges() после него.
+    """
+    return list(
+        queryset.order_by().values('zone_id').annotate(
+            start=Min('start_time'), end=Max('end_time'),
+        ).values_list('zone_id', 'start', 'end')
+    )
+
+
+def refresh_ranges(ranges):
+    for zone_id, start_time, end_time in ranges:
+        refresh_occupancy(zone_id, start_time, end_time)
+
+
+def rebuild_occupancy(chunk_size=1000):
+    """
+    Пересобирает таблицу загрузки с нуля.
+
+    Бронирования читаются потоком по зонам, строки записываются пачками
+    по chunk_size через bulk_create. Возвращает количество строк.
+    """
+    created = 0
+    pending = []
+
+    with transaction.atomic():
+        OccupancyBucket.objects.all().delete()
+
+        rows = Booking.objects.exclude(status='cancelled').order_by('zone_id').values_list(
+            'zone_id', 'start_time', 'end_time', 'number_of_people'
+        ).iterator(chunk_size=chunk_size)
+
+        for zone_id, zone_rows in groupby(rows, key=itemgetter(0)):
+            intervals = [row[1:] for row in zone_rows]
+            start = hour_floor(min(start for start, _, _ in intervals))
+            end = hour_ceil(max(end for _, end, _ in intervals))
+
+            pending.extend(_bucket_objects(zone_id, hourly_buckets(intervals, start, end)))
+            while len(pending) >= chunk_size:
+                OccupancyBucket.objects.bulk_create(pending[:chunk_size])
+                created += chunk_size
+                pending = pending[chunk_size:]
+
+        OccupancyBucket.objects.bulk_create(pending)
+        created += len(pending)
+    return created
+
+
+def hourly_occupancy(start_time, end_time, zones=None):
+    """
+    Почасовая загрузка зон за период из материализованной таблицы.
+
+    Возвращает {id зоны: [(начало часа, максимум занятых мест,
+    минимум свободных мест), ...]} для каждого часа периода. Читается не
+    больше одной строки на зону и час, бронирования не сканируются.
+    """
+    start = hour_floor(start_time)
+    end = hour_ceil(end_time)
+    zones = Zone.objects.all() if zones is None else zones
+    capacities = {zone.id: zone.capacity for zone in zones}
+
+    peaks = {
+        (zone_id, hour): peak
+        for zone_id, hour, peak in OccupancyBucket.objects.filter(
+            zone_id__in=list(capacities), hour__gte=start, hour__lt=end,
+        ).values_list('zone_id', 'hour', 'peak_seats')
+    }
+
+    hours = []
+    hour = start
+    while hour < end:
+        hours.append(hour)
+        hour += HOUR
+
+    result = {}
+    for zone_id, capacity in capacities.items():
+        result[zone_id] = []
+        for hour in hours:
+            peak = peaks.get((zone_id, hour), 0)
+            result[zone_id].append((hour, peak, max(0, capacity - peak)))
+    return result
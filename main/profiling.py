@@ -0,0 +1,211 @@
+"""
+Гистограммы времени ответа и SQL по представлениям.
+
+Middleware из instrumentation.py передает сюда замеры каждого
+отобранного запроса. Процесс копит их в памяти и не чаще раза в
+FLUSH_SECONDS, уже после отдачи ответа, добавляет в таблицу ViewProfile,
+откуда их читают API и команда view_percentiles.
+"""
+import bisect
+import threading
+import time
+
+from django.db import DatabaseError, transaction
+
+from .models import ViewProfile
+
+# Верхние границы корзин в мс: геометрическая сетка с шагом 25% от 0.5 мс
+# до ~4 минут, последняя корзина - все, что дольше
+BUCKET_BOUNDS = [round(0.5 * 1.25 ** index, 3) for index in range(59)]
+BUCKET_COUNT = len(BUCKET_BOUNDS) + 1
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def bucket_index(value):
+    return bisect.bisect_left(BUCKET_BOUNDS, value)
+
+
+def merge_histograms(first, second):
+    if not first:
+        return list(second)
+    if not second:
+        return list(first)
+    return [a + b for a, b in zip(first, second)]
+
+
+def histogram_percentile(histogram, percent, maximum=None):
+    """
+    Оценка перцентиля по гистограмме.
+
+    Внутри корзины значения считаются распределенными равномерно, поэтому
+    ошибка не больше ширины корзины (25%). Для последней корзины верхней
+    границей служит maximum.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = total * percent / 100
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+            upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else (maximum or lower)
+            if maximum is not None:
+                upper = min(upper, maximum)
+            return round(lower + (upper - lower) * (rank - seen) / count, 2)
+        seen += count
+    return maximum
+
+
+class _ViewStats:
+    """Замеры одного представления, накопленные процессом с прошлого сброса"""
+
+    __slots__ = ('requests', 'errors', 'total_ms', 'max_ms', 'queries', 'max_queries', 'sql_ms',
+                 'latency_histogram', 'sql_histogram')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.sql_ms = 0.0
+        self.latency_histogram = [0] * BUCKET_COUNT
+        self.sql_histogram = [0] * BUCKET_COUNT
+
+    def add(self, metrics):
+        self.requests += 1
+        self.errors += metrics.status >= 500
+        self.total_ms += metrics.total_ms
+        self.max_ms = max(self.max_ms, metrics.total_ms)
+        self.queries += metrics.queries
+        self.max_queries = max(self.max_queries, metrics.queries)
+        self.sql_ms += metrics.query_ms
+        self.latency_histogram[bucket_index(metrics.total_ms)] += 1
+        self.sql_histogram[bucket_index(metrics.query_ms)] += 1
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.queries += other.queries
+        self.max_queries = max(self.max_queries, other.max_queries)
+        self.sql_ms += other.sql_ms
+        self.latency_histogram = merge_histograms(self.latency_histogram, other.latency_histogram)
+        self.sql_histogram = merge_histograms(self.sql_histogram, other.sql_histogram)
+
+    def apply_to(self, profile):
+        profile.requests += self.requests
+        profile.errors += self.errors
+        profile.total_ms += self.total_ms
+        profile.max_ms = max(profile.max_ms, self.max_ms)
+        profile.queries += self.queries
+        profile.max_queries = max(profile.max_queries, self.max_queries)
+        profile.sql_ms += self.sql_ms
+        profile.latency_histogram = merge_histograms(profile.latency_histogram, self.latency_histogram)
+        profile.sql_histogram = merge_histograms(profile.sql_histogram, self.sql_histogram)
+
+
+class ViewProfiler:
+    """Накопитель замеров процесса с периодическим сбросом в ViewProfile"""
+
+    def __init__(self, flush_seconds=30):
+        self.flush_seconds = flush_seconds
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, metrics):
+        name = metrics.view or '<unresolved>'
+        with self._lock:
+            stats = self._pending.get(name)
+            if stats is None:
+                stats = self._pending[name] = _ViewStats()
+            stats.add(metrics)
+
+    def flush_due(self):
+        return time.monotonic() - self._last_flush >= self.flush_seconds
+
+    def flush(self):
+        """Добавляет накопленные замеры в ViewProfile одной транзакцией"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+
+        try:
+            with transaction.atomic():
+                profiles = {
+                    profile.view_name: profile
+                    for profile in ViewProfile.objects.select_for_update().filter(view_name__in=list(pending))
+                }
+                created = []
+                for name, stats in pending.items():
+                    profile = profiles.get(name)
+                    if profile is None:
+                        profile = ViewProfile(view_name=name, latency_histogram=[], sql_histogram=[])
+                        created.append(profile)
+                    stats.apply_to(profile)
+                ViewProfile.objects.bulk_update(
+                    list(profiles.values()),
+                    ['requests', 'errors', 'total_ms', 'max_ms', 'queries', 'max_queries', 'sql_ms',
+                     'latency_histogram', 'sql_histogram'],
+                )
+                ViewProfile.objects.bulk_create(created)
+        except DatabaseError:
+            # Например, таблица занята другим процессом: замеры вернутся
+            # в накопитель и уйдут со следующим сбросом
+            with self._lock:
+                for name, stats in pending.items():
+                    current = self._pending.get(name)
+                    if current is None:
+                        self._pending[name] = stats
+                    else:
+                        current.merge(stats)
+            raise
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+
+
+profiler = ViewProfiler()
+
+
+def profile_summary(profile):
+    """Средние значения и перцентили по строке ViewProfile"""
+    requests = profile.requests or 1
+    summary = {
+        'view': profile.view_name,
+        'requests': profile.requests,
+        'errors': profile.errors,
+        'avg_ms': round(profile.total_ms / requests, 2),
+        'max_ms': round(profile.max_ms, 2),
+        'avg_queries': round(profile.queries / requests, 2),
+        'max_queries': profile.max_queries,
+        'avg_sql_ms': round(profile.sql_ms / requests, 2),
+        'sql_share': round(profile.sql_ms / profile.total_ms, 3) if profile.total_ms else 0.0,
+    }
+    for percent in PERCENTILES:
+        summary[f'p{percent}_ms'] = histogram_percentile(profile.latency_histogram, percent, profile.max_ms)
+    summary['sql_p95_ms'] = histogram_percentile(profile.sql_histogram, 95)
+    return summary
+
+
+# Сортировки отчета: по суммарному и максимальному времени, числу запросов и SQL
+PROFILING_SORTS = {
+    'total': '-total_ms',
+    'max': '-max_ms',
+    'requests': '-requests',
+    'queries': '-queries',
+    'name': 'view_name',
+}
+
+
+def profiles_report(order_by='-total_ms'):
+    """Сводка по всем представлениям, по умолчанию от самых затратных"""
+    return [profile_summary(profile) for profile in ViewProfile.objects.order_by(order_by)]
@@ -0,0 +1,76 @@
+"""Атомарное создание бронирований с резервированием мест"""
+from django.db import connection, transaction
+from django.db.models import F
+
+from .instrumentation import stage
+from .models import Zone, Booking
+from .sqlite import retry_on_lock
+
+
+class ReservationError(Exception):
+    """Бронирование не может быть создано"""
+
+
+class CapacityExceeded(ReservationError):
+    """В зоне недостаточно свободных мест на выбранное время"""
+
+
+def lock_zone(zone_id):
+    """
+    Блокирует зону до конца текущей транзакции.
+
+    Все проверки вместимости одной зоны выполняются строго по очереди,
+    поэтому две параллельные брони не могут занять одни и те же места.
+    """
+    if connection.features.has_select_for_update:
+        return Zone.objects.select_for_update().get(pk=zone_id)
+
+    # SQLite не поддерживает SELECT ... FOR UPDATE. Холостой UPDATE первым
+    # запросом транзакции сразу берет блокировку записи, и конкурирующие
+    # транзакции ждут ее освобождения (busy timeout). В профиле продакшена
+    # блокировку уже взял BEGIN IMMEDIATE, и UPDATE ничего не добавляет.
+    if not Zone.objects.filter(pk=zone_id).update(capacity=F('capacity')):
+        raise Zone.DoesNotExist('Zone matching query does not exist.')
+    return Zone.objects.get(pk=zone_id)
+
+
+@retry_on_lock()
+def reserve_booking(zone_id, start_time, end_time, number_of_people, customer_name,
+                    customer_phone, customer_email, user=None, status='confirmed'):
+    """
+    Проверяет вместимость и создает бронирование в одной транзакции.
+
+    Бронирование записывается одним INSERT сразу вместе с пользователем.
+    Если база занята другими записями, транзакция повторяется.
+    Бросает Zone.DoesNotExist, если зоны нет, и CapacityExceeded,
+    если свободных мест недостаточно.
+    """
+    with transaction.atomic():
+        with stage('availability'):
+            zone = lock_zone(zone_id)
+
+            if number_of_people > zone.capacity:
+                raise CapacityExceeded(
+                    f'Выбрано {number_of_people} человек, но максимальная вместимость '
+                    f'зоны "{zone.title}" - {zone.capacity} человек.'
+                )
+
+            if not zone.is_available_for_time(start_time, end_time, number_of_people):
+                raise CapacityExceeded(
+                    f'На выбранное время "{start_time.strftime("%d.%m.%Y %H:%M")}" в зоне '
+                    f'"{zone.title}" недостаточно свободных мест для {number_of_people} человек.'
+                )
+
+        with stage('insert'):
+            booking = Booking.objects.create(
+                zone=zone,
+                user=user,
+                customer_name=customer_name,
+                customer_phone=customer_phone,
+                customer_email=customer_email,
+                number_of_people=number_of_people,
+                start_time=start_time,
+                end_time=end_time,
+                status=status,
+            )
+        return booking
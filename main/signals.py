@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Zone, Booking, UserProfile
+from .occupancy import refresh_occupancy
+from .snapshot import invalidate_availability
+from .stats import mark_stale
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Zone)
+@receiver(post_delete, sender=Zone)
+def reset_availability_snapshot(sender, **kwargs):
+    """
+    Любое изменение бронирований или зон сбрасывает снимок доступности.
+    Версия меняется в той же транзакции, поэтому снимок, собранный другим
+    запросом до коммита, остается под прежней версией
+    """
+    invalidate_availability()
+
+
+@receiver(post_save, sender=Booking)
+def update_occupancy_on_save(sender, instance, raw=False, **kwargs):
+    """Пересчитывает почасовую загрузку для прежнего и нового интервала брони"""
+    if raw:
+        return
+    state = instance.occupancy_state()
+    previous = getattr(instance, '_occupancy_state', None)
+    if previous == state:
+        return
+
+    zone_id, start_time, end_time = state[:3]
+    if previous and previous[:3] != (zone_id, start_time, end_time):
+        refresh_occupancy(*previous[:3])
+    if previous and previous[:2] != (zone_id, start_time):
+        # Прежний день (или зона) больше не найдется по updated_at этой брони
+        mark_stale(*previous[:2])
+    refresh_occupancy(zone_id, start_time, end_time)
+    instance._occupancy_state = state
+
+
+@receiver(post_delete, sender=Booking)
+def update_occupancy_on_delete(sender, instance, **kwargs):
+    refresh_occupancy(instance.zone_id, instance.start_time, instance.end_time)
+    # Удаленное бронирование не найти по updated_at, поэтому день помечается
+    # устаревшим и пересчитывается при следующей сборке итогов
+    mark_stale(instance.zone_id, instance.start_time)
+
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    """Профиль создается вместе с пользователем, чтобы личный кабинет только читал его"""
+    if created and not raw:
+        UserProfile.objects.create(user=instance)
@@ -0,0 +1,155 @@
+"""Поиск ближайших свободных окон для бронирования"""
+import heapq
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Zone, Booking
+
+
+def occupancy_segments(intervals, horizon_start, horizon_end):
+    """
+    Разбивает горизонт на отрезки постоянной загрузки.
+
+    Возвращает список кортежей (начало, конец, занято мест), покрывающих
+    [horizon_start, horizon_end). Один проход по отсортированным событиям.
+    """
+    events = []
+    for start, end, people in intervals:
+        start = max(start, horizon_start)
+        end = min(end, horizon_end)
+        if start < end:
+            events.append((start, people))
+            events.append((end, -people))
+    events.sort()
+
+    segments = []
+    current = 0
+    position = horizon_start
+    for moment, delta in events:
+        if moment > position:
+            segments.append((position, moment, current))
+            position = moment
+        current += delta
+    if position < horizon_end:
+        segments.append((position, horizon_end, current))
+    return segments
+
+
+def _align(moment, step):
+    """Округляет время вверх до ближайшей отметки сетки"""
+    seconds = int(step.total_seconds())
+    timestamp = moment.timestamp()
+    remainder = timestamp % seconds
+    if remainder:
+        moment += timedelta(seconds=seconds - remainder)
+    return moment
+
+
+def find_zone_windows(capacity, intervals, horizon_start, horizon_end, party_size,
+                      duration, step, limit):
+    """
+    Возвращает до limit самых ранних окон (начало, конец, свободно мест)
+    длиной duration, в которых в любой момент свободно не меньше
+    party_size мест. Начала окон выровнены по сетке step.
+    """
+    segments = occupancy_segments(intervals, horizon_start, horizon_end)
+    max_occupied = capacity - party_size
+    windows = []
+
+    index = 0
+    while index < len(segments) and len(windows) < limit:
+        if segments[index][2] > max_occupied:
+            index += 1
+            continue
+
+        # Непрерывный участок, где хватает мест
+        run_start = segments[index][0]
+        run_end = index
+        while run_end + 1 < len(segments) and segments[run_end + 1][2] <= max_occupied:
+            run_end += 1
+        run_finish = segments[run_end][1]
+
+        start = _align(run_start, step)
+        first = index
+        while start + duration <= run_finish and len(windows) < limit:
+            end = start + duration
+            while segments[first][1] <= start:
+                first += 1
+            peak = 0
+            position = first
+            while position <= run_end and segments[position][0] < end:
+                peak = max(peak, segments[position][2])
+                position += 1
+            windows.append((start, end, capacity - peak))
+            start += step
+
+        index = run_end + 1
+    return windows
+
+
+# Горизонт первого прохода поиска; при нехватке окон он удваивается
+FIRST_PASS = timedelta(days=1)
+
+
+def _search(zones, party_size, duration, horizon_start, horizon_end, step, limit):
+    """Один проход: выборка бронирований за горизонт и поиск окон во всех зонах"""
+    intervals = {zone_id: [] for zone_id in zones}
+    rows = Booking.objects.filter(
+        zone__in=list(zones),
+        start_time__lt=horizon_end,
+        end_time__gt=horizon_start,
+    ).exclude(status='cancelled').order_by().values_list(
+        'zone_id', 'start_time', 'end_time', 'number_of_people'
+    )
+    for zone_id, start, end, people in rows:
+        intervals[zone_id].append((start, end, people))
+
+    per_zone = []
+    for zone_id, zone in zones.items():
+        windows = find_zone_windows(
+            zone.capacity, intervals[zone_id], horizon_start, horizon_end,
+            party_size, duration, step, limit,
+        )
+        per_zone.append([(start, zone_id, end, free) for start, end, free in windows])
+
+    slots = []
+    for start, zone_id, end, free in heapq.merge(*per_zone):
+        slots.append({
+            'zone': zones[zone_id],
+            'start_time': start,
+            'end_time': end,
+            'available_seats': free,
+        })
+        if len(slots) == limit:
+            break
+    return slots
+
+
+def find_free_slots(zones=None, party_size=1, duration=timedelta(hours=1), horizon_start=None,
+                    horizon=timedelta(days=7), step=timedelta(minutes=30), limit=5):
+    """
+    Ищет самые ранние окна во всех указанных зонах.
+
+    Поиск начинается с короткого горизонта, который удваивается, пока окон
+    не хватает. Все найденные окна целиком лежат внутри просмотренного
+    горизонта, а любое пропущенное окно начинается позже каждого из них,
+    поэтому результат совпадает с поиском сразу по всему горизонту.
+    Возвращает список словарей, отсортированный по времени начала.
+    """
+    horizon_start = horizon_start or timezone.now()
+    if timezone.is_naive(horizon_start):
+        horizon_start = timezone.make_aware(horizon_start)
+    horizon_end = horizon_start + horizon
+
+    zones = Zone.objects.all() if zones is None else zones
+    zones = {zone.id: zone for zone in zones if zone.capacity >= party_size}
+    if not zones:
+        return []
+
+    pass_end = min(horizon_end, horizon_start + max(FIRST_PASS, duration * 2))
+    while True:
+        slots = _search(zones, party_size, duration, horizon_start, pass_end, step, limit)
+        if len(slots) >= limit or pass_end >= horizon_end:
+            return slots
+        pass_end = min(horizon_end, horizon_start + (pass_end - horizon_start) * 2)
@@ -0,0 +1,142 @@
+"""
+Кэшированный снимок доступности зон для /api/availability/.
+
+Снимок хранится в кэше процесса под ключом с версией данных из БД, поэтому
+несколько процессов сервера (--workers) не отдают устаревших данных.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import AvailabilityVersion, Zone
+
+SNAPSHOT_KEY = 'availability:snapshot:{version}'
+# Снимок живет не дольше минуты, запас нужен на случай рассинхронизации часов
+SNAPSHOT_TIMEOUT = 120
+
+# Строка AvailabilityVersion. Кэш у каждого процесса сервера свой, а версия
+# лежит в БД: после изменения в одном процессе другие увидят новую версию
+# и не отдадут свой старый снимок (или 304 по старому ETag)
+VERSION_PK = 1
+
+
+def _version_defaults():
+    # Начальное значение зависит от времени, чтобы после пересоздания строки
+    # не совпасть с версией уже сохраненного в кэше снимка
+    return {'version': time.time_ns()}
+
+
+def get_version():
+    """Текущая версия данных о бронированиях (один запрос по первичному ключу)"""
+    version = AvailabilityVersion.objects.filter(pk=VERSION_PK).values_list('version', flat=True).first()
+    if version is None:
+        version = AvailabilityVersion.objects.get_or_create(pk=VERSION_PK, defaults=_version_defaults())[0].version
+    return version
+
+
+async def aget_version():
+    """Асинхронная версия get_version()"""
+    version = await AvailabilityVersion.objects.filter(pk=VERSION_PK).values_list('version', flat=True).afirst()
+    if version is None:
+        version = (await AvailabilityVersion.objects.aget_or_create(pk=VERSION_PK, defaults=_version_defaults()))[0].version
+    return version
+
+
+def invalidate_availability():
+    """
+    Сбрасывает снимок доступности во всех процессах, увеличивая версию.
+
+    Вызывается в транзакции изменения: другие соединения увидят новую
+    версию вместе с новыми данными, после коммита. Новая версия не меньше
+    текущего времени в наносекундах: версия из отмененной транзакции (под
+    ней в кэше мог остаться снимок) больше не повторится.
+    """
+    version = Greatest(F('version') + 1, Value(time.time_ns()))
+    if not AvailabilityVersion.objects.filter(pk=VERSION_PK).update(version=version):
+        AvailabilityVersion.objects.get_or_create(pk=VERSION_PK, defaults=_version_defaults())
+
+
+def _snapshot_queryset(now):
+    return Zone.objects.with_available_seats().with_next_changes(now).order_by('id')
+
+
+def build_snapshot():
+    """Собирает снимок доступности всех зон одним запросом"""
+    now = timezone.now()
+    return _make_snapshot(_snapshot_queryset(now), now)
+
+
+async def abuild_snapshot():
+    """Асинхронная версия build_snapshot(): зоны читаются асинхронной итерацией"""
+    now = timezone.now()
+    return _make_snapshot([zone async for zone in _snapshot_queryset(now)], now)
+
+
+def _make_snapshot(queryset, now):
+    expires_at = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+    zones = []
+    for zone in queryset:
+        zones.append({
+            'id': zone.id,
+            'title': zone.title,
+            'capacity': zone.capacity,
+            'available_seats': zone.available_seats,
+            'status': zone.get_availability_status(zone.available_seats),
+            'is_available': zone.available_seats > 0,
+        })
+        # Бронирование перестает занимать места сразу после end_time
+        if zone.next_start is not None:
+            expires_at = min(expires_at, zone.next_start)
+        if zone.next_end is not None:
+            expires_at = min(expires_at, zone.next_end + timedelta(microseconds=1))
+
+    # ETag зависит только от доступности, а не от времени сборки снимка
+    etag = hashlib.md5(json.dumps(zones, sort_keys=True).encode()).hexdigest()
+
+    updated_at = now.isoformat()
+    for zone in zones:
+        zone['updated_at'] = updated_at
+
+    return {
+        'etag': etag,
+        'expires_at': expires_at,
+        'payload': {
+            'zones': zones,
+            'current_time': updated_at,
+            'success': True,
+        },
+    }
+
+
+def get_availability_snapshot(version=None):
+    """
+    Возвращает снимок доступности из кэша или собирает новый. Версию,
+    уже прочитанную в этом запросе, можно передать, чтобы не читать ее снова.
+
+    Снимок пересобирается при изменении бронирований (новая версия),
+    на границе каждой минуты и в момент начала или окончания
+    ближайшего бронирования.
+    """
+    key = SNAPSHOT_KEY.format(version=get_version() if version is None else version)
+    snapshot = cache.get(key)
+    if snapshot is None or timezone.now() >= snapshot['expires_at']:
+        snapshot = build_snapshot()
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+async def aget_availability_snapshot(version=None):
+    """Асинхронная версия get_availability_snapshot() для async-представлений"""
+    key = SNAPSHOT_KEY.format(version=await aget_version() if version is None else version)
+    snapshot = await cache.aget(key)
+    if snapshot is None or timezone.now() >= snapshot['expires_at']:
+        snapshot = await abuild_snapshot()
+        await cache.aset(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
@@ -0,0 +1,61 @@
+"""
+Запись в SQLite при конкурентной нагрузке.
+
+Профиль продакшена задается в settings.py (DJANGO_SQLITE_PROFILE): WAL,
+BEGIN IMMEDIATE и постоянные соединения. Оставшиеся ошибки
+"database is locked" - транзакции, не дождавшиеся блокировки за busy
+timeout, - повторяет декоратор retry_on_lock.
+"""
+import logging
+import random
+import time
+from functools import wraps
+
+from django.db import OperationalError, connection
+
+logger = logging.getLogger('main.sqlite')
+
+RETRY_ATTEMPTS = 5
+# Пауза перед первым повтором в секундах, дальше удваивается
+RETRY_DELAY = 0.05
+# Сколько секунд всего можно потратить на попытки. Каждая может ждать
+# блокировку до timeout из настроек базы, и без предела запрос висел бы
+# attempts * timeout секунд
+RETRY_BUDGET = 10
+
+LOCK_MESSAGES = ('database is locked', 'database table is locked', 'database schema is locked')
+
+
+def is_lock_error(error):
+    """Ошибка означает, что база занята другой транзакцией"""
+    return isinstance(error, OperationalError) and str(error).startswith(LOCK_MESSAGES)
+
+
+def retry_on_lock(attempts=RETRY_ATTEMPTS, delay=RETRY_DELAY, budget=RETRY_BUDGET):
+    """
+    Повторяет транзакцию записи, если база занята.
+
+    Оборачиваемая функция должна сама открывать транзакцию: повтор
+    начинает ее заново. Внутри внешней транзакции повторять нечего -
+    она уже прервана, поэтому ошибка пробрасывается сразу. Паузы растут
+    вдвое и немного случайны, чтобы процессы не сталкивались снова.
+    Новая попытка не начинается, если с первой прошло больше budget секунд.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            for attempt in range(1, attempts + 1):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as e:
+                    if not is_lock_error(e) or attempt == attempts or connection.in_atomic_block:
+                        raise
+                    pause = delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                    if time.monotonic() - started + pause >= budget:
+                        raise
+                    logger.warning('База занята, повтор %s из %s через %.0f мс: %s',
+                                   attempt, attempts - 1, pause * 1000, func.__qualname__)
+                    time.sleep(pause)
+        return wrapper
+    return decorator
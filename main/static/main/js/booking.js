@@ -0,0 +1,286 @@
+// Адрес потока загрузки зон передается атрибутом data-stream-url тега script
+const streamUrl = document.currentScript.dataset.streamUrl;
+
+document.addEventListener('DOMContentLoaded', function() {
+    const startTimeInput = document.getElementById('start_time');
+    const endTimeInput = document.getElementById('end_time');
+    const timeAvailabilityInfo = document.getElementById('time-availability-info');
+    const availabilityMessage = document.getElementById('availability-message');
+    const submitBtn = document.getElementById('submit-btn');
+    const bookingForm = document.getElementById('bookingForm');
+    const zoneInputs = document.querySelectorAll('input[name="zone"]');
+    const zoneError = document.getElementById('zone-error');
+    const numberOfPeopleSelect = document.getElementById('number_of_people');
+
+    function updateCurrentTime() {
+        const now = new Date();
+        document.getElementById('current-time').textContent = now.toLocaleString('ru-RU');
+    }
+    updateCurrentTime();
+    setInterval(updateCurrentTime, 1000);
+
+    function updateAllZonesAvailability() {
+        fetch('/api/availability/')
+            .then(response => response.json())
+            .then(data => {
+                data.zones.forEach(updateZoneAvailability);
+                console.log('Доступность зон обновлена:', new Date().toLocaleTimeString());
+            })
+            .catch(error => {
+                console.error('Ошибка при обновлении доступности:', error);
+            });
+    }
+
+    function updateZoneAvailability(zone) {
+        const availableElement = document.getElementById(`available-zone-${zone.id}`);
+        const badgeElement = document.getElementById(`badge-zone-${zone.id}`);
+
+        if (availableElement) {
+            availableElement.textContent = zone.available_seats;
+        }
+
+        if (badgeElement) {
+            let badgeClass = 'badge ';
+            let badgeText = '';
+
+            if (zone.available_seats === 0) {
+                badgeClass += 'bg-danger';
+                badgeText = 'Занято';
+                const radioBtn = document.getElementById(`zone${zone.id}`);
+                if (radioBtn) {
+                    radioBtn.disabled = true;
+                    if (radioBtn.checked) {
+                        radioBtn.checked = false;
+                        zoneError.style.display = 'block';
+                    }
+                }
+            } else if (zone.available_seats < zone.capacity) {
+                badgeClass += 'bg-warning text-dark';
+                badgeText = `${zone.available_seats}/${zone.capacity}`;
+                const radioBtn = document.getElementById(`zone${zone.id}`);
+                if (radioBtn) radioBtn.disabled = false;
+            } else {
+                badgeClass += 'bg-success';
+                badgeText = 'Свободно';
+                const radioBtn = document.getElementById(`zone${zone.id}`);
+                if (radioBtn) radioBtn.disabled = false;
+            }
+
+            badgeElement.innerHTML = `<span class="${badgeClass}">${badgeText}</span>`;
+        }
+    }
+
+    const AVAILABILITY_CHECK_DELAY = 300;
+    let availabilityCheckTimer = null;
+    let availabilityCheckController = null;
+
+    function checkTimeAvailability() {
+        clearTimeout(availabilityCheckTimer);
+        const selectedZone = document.querySelector('input[name="zone"]:checked');
+        const startTime = startTimeInput.value;
+        const endTime = endTimeInput.value;
+        const numberOfPeople = numberOfPeopleSelect ? numberOfPeopleSelect.value : 1;
+
+        if (!selectedZone || !startTime || !endTime) {
+            timeAvailabilityInfo.style.display = 'none';
+            return;
+        }
+
+        const zoneId = selectedZone.value;
+
+        const start = new Date(startTime);
+        const end = new Date(endTime);
+        const now = new Date();
+
+        if (start < now) {
+            availabilityMessage.textContent = 'Время начала не может быть в прошлом';
+            timeAvailabilityInfo.className = 'alert alert-warning';
+            timeAvailabilityInfo.style.display = 'block';
+            submitBtn.disabled = true;
+            return;
+        }
+
+        if (end <= start) {
+            availabilityMessage.textContent = 'Время окончания должно быть позже времени начала';
+            timeAvailabilityInfo.className = 'alert alert-warning';
+            timeAvailabilityInfo.style.display = 'block';
+            submitBtn.disabled = true;
+            return;
+        }
+
+        const timeDiff = (end - start) / (1000 * 60 * 60);
+        if (timeDiff < 1) {
+            availabilityMessage.textContent = 'Минимальное время бронирования - 1 час';
+            timeAvailabilityInfo.className = 'alert alert-warning';
+            timeAvailabilityInfo.style.display = 'block';
+            submitBtn.disabled = true;
+            return;
+        }
+
+        // Быстрые изменения полей сливаются в один запрос, а ответ на
+        // устаревший запрос отбрасывается
+        availabilityCheckTimer = setTimeout(() => {
+            if (availabilityCheckController) availabilityCheckController.abort();
+            availabilityCheckController = new AbortController();
+            const params = new URLSearchParams({
+                start_time: startTime,
+                end_time: endTime,
+                number_of_people: numberOfPeople
+            });
+            requestTimeAvailability(`/api/check_zone_availability/${zoneId}/?${params}`, numberOfPeople, availabilityCheckController.signal);
+        }, AVAILABILITY_CHECK_DELAY);
+    }
+
+    function requestTimeAvailability(url, numberOfPeople, signal) {
+        fetch(url, { signal })
+            .then(response => response.json())
+            .then(data => {
+                if (data.available) {
+                    availabilityMessage.textContent = `На выбранное время доступно ${data.available_seats} мест. Можно забронировать для ${numberOfPeople} человек.`;
+                    timeAvailabilityInfo.className = 'alert alert-success';
+                    timeAvailabilityInfo.style.display = 'block';
+                    submitBtn.disabled = false;
+                } else {
+                    availabilityMessage.textContent = data.message || `Недостаточно мест для ${numberOfPeople} человек. ${data.available_seats ? `Доступно только ${data.available_seats} мест.` : 'Занято.'}`;
+                    timeAvailabilityInfo.className = 'alert alert-danger';
+                    timeAvailabilityInfo.style.display = 'block';
+                    submitBtn.disabled = true;
+                }
+            })
+            .catch(error => {
+                if (error.name === 'AbortError') return;
+                console.error('Ошибка проверки доступности:', error);
+                timeAvailabilityInfo.style.display = 'none';
+                submitBtn.disabled = false;
+            });
+    }
+
+    zoneInputs.forEach(radio => {
+        radio.addEventListener('change', function() {
+            zoneError.style.display = 'none';
+            const selectedZone = document.querySelector('input[name="zone"]:checked');
+            if (selectedZone) {
+                const zoneCapacity = parseInt(selectedZone.getAttribute('data-zone-capacity'));
+                if (numberOfPeopleSelect) {
+                    const currentValue = parseInt(numberOfPeopleSelect.value);
+                    if (currentValue > zoneCapacity) {
+                        numberOfPeopleSelect.value = zoneCapacity;
+                    }
+                }
+            }
+            checkTimeAvailability();
+        });
+    });
+
+    if (numberOfPeopleSelect) {
+        numberOfPeopleSelect.addEventListener('change', function() {
+            const selectedZone = document.querySelector('input[name="zone"]:checked');
+            if (selectedZone) {
+                const zoneCapacity = parseInt(selectedZone.getAttribute('data-zone-capacity'));
+                const selectedPeople = parseInt(this.value);
+
+                if (selectedPeople > zoneCapacity) {
+                    alert(`Максимальная вместимость выбранной зоны - ${zoneCapacity} человек. Пожалуйста, выберите другую зону или уменьшите количество человек.`);
+                    this.value = Math.min(selectedPeople, zoneCapacity);
+                }
+            }
+            checkTimeAvailability();
+        });
+    }
+
+    if (startTimeInput) {
+        startTimeInput.addEventListener('change', checkTimeAvailability);
+    }
+
+    if (endTimeInput) {
+        endTimeInput.addEventListener('change', checkTimeAvailability);
+    }
+
+    bookingForm.addEventListener('submit', function(e) {
+        let hasError = false;
+        const selectedZone = document.querySelector('input[name="zone"]:checked');
+        if (!selectedZone) {
+            zoneError.style.display = 'block';
+            hasError = true;
+        } else {
+            zoneError.style.display = 'none';
+
+            const zoneCapacity = parseInt(selectedZone.getAttribute('data-zone-capacity'));
+            const numberOfPeople = parseInt(numberOfPeopleSelect ? numberOfPeopleSelect.value : 1);
+
+            if (numberOfPeople > zoneCapacity) {
+                alert(`Ошибка: выбранная зона вмещает только ${zoneCapacity} человек, а вы указали ${numberOfPeople}. Пожалуйста, уменьшите количество человек или выберите другую зону.`);
+                hasError = true;
+            }
+        }
+
+        const requiredFields = ['name', 'phone', 'email', 'start_time', 'end_time'];
+        requiredFields.forEach(fieldId => {
+            const field = document.getElementById(fieldId);
+            if (field && !field.value.trim()) {
+                field.classList.add('is-invalid');
+                hasError = true;
+            } else if (field) {
+                field.classList.remove('is-invalid');
+            }
+        });
+
+        const emailField = document.getElementById('email');
+        if (emailField && emailField.value) {
+            const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+            if (!emailRegex.test(emailField.value)) {
+                emailField.classList.add('is-invalid');
+                emailField.nextElementSibling.textContent = 'Пожалуйста, введите корректный email адрес.';
+                hasError = true;
+            }
+        }
+
+        if (hasError) {
+            e.preventDefault();
+            const firstError = document.querySelector('.is-invalid');
+            if (firstError) {
+                firstError.scrollIntoView({ behavior: 'smooth', block: 'center' });
+            }
+        } else {
+            submitBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2" role="status" aria-hidden="true"></span>Обработка...';
+            submitBtn.disabled = true;
+        }
+    });
+
+    if (startTimeInput) {
+        startTimeInput.addEventListener('change', function() {
+            if (this.value) {
+                const minEndTime = new Date(this.value);
+                minEndTime.setHours(minEndTime.getHours() + 1);
+                endTimeInput.min = minEndTime.toISOString().slice(0, 16);
+
+                if (endTimeInput.value && new Date(endTimeInput.value) < minEndTime) {
+                    endTimeInput.value = minEndTime.toISOString().slice(0, 16);
+                }
+            }
+        });
+    }
+
+
+    // Опрос каждые 30 секунд - запасной вариант, если поток недоступен
+    let pollTimer = null;
+    function startPolling() {
+        if (pollTimer) return;
+        updateAllZonesAvailability();
+        pollTimer = setInterval(updateAllZonesAvailability, 30000);
+    }
+
+    if (window.EventSource) {
+        const source = new EventSource(streamUrl);
+        source.addEventListener('occupancy', function(event) {
+            JSON.parse(event.data).zones.forEach(updateZoneAvailability);
+        });
+        source.onerror = function() {
+            if (source.readyState === EventSource.CLOSED) {
+                startPolling();
+            }
+        };
+    } else {
+        startPolling();
+    }
+});
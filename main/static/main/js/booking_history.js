@@ -0,0 +1,57 @@
+// Инициализация всех модальных окон
+document.addEventListener('DOMContentLoaded', function() {
+    var modalElements = document.querySelectorAll('.modal');
+    modalElements.forEach(function(modalElement) {
+        new bootstrap.Modal(modalElement);
+    });
+});
+
+// Подгрузка следующих страниц при прокрутке к концу списка
+document.addEventListener('DOMContentLoaded', function() {
+    var more = document.getElementById('historyMore');
+    if (!more || !('IntersectionObserver' in window)) {
+        return;
+    }
+    var list = document.getElementById('bookingsList');
+    var loading = false;
+
+    function loadMore() {
+        if (loading || !more.dataset.cursor) {
+            return;
+        }
+        loading = true;
+        fetch(more.dataset.url + '?cursor=' + encodeURIComponent(more.dataset.cursor))
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+                if (!data.success) {
+                    return;
+                }
+                list.insertAdjacentHTML('beforeend', data.html);
+                if (data.next_cursor) {
+                    more.dataset.cursor = data.next_cursor;
+                    document.getElementById('historyMoreLink').href = '?cursor=' + data.next_cursor;
+                } else {
+                    observer.disconnect();
+                    more.remove();
+                }
+            })
+            .catch(function(error) {
+                console.error('Ошибка загрузки истории:', error);
+            })
+            .finally(function() {
+                loading = false;
+            });
+    }
+
+    var observer = new IntersectionObserver(function(entries) {
+        if (entries[0].isIntersecting) {
+            loadMore();
+        }
+    }, {rootMargin: '300px'});
+    observer.observe(more);
+
+    document.getElementById('historyMoreLink').addEventListener('click', function(event) {
+        event.preventDefault();
+        loadMore();
+    });
+});
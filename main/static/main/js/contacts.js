@@ -0,0 +1,25 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const socialButtons = document.querySelectorAll('.btn-outline-primary');
+    socialButtons.forEach(button => {
+        if (button.querySelector('.bi-telegram')) {
+            button.setAttribute('data-bs-toggle', 'tooltip');
+            button.setAttribute('data-bs-placement', 'top');
+            button.setAttribute('title', 'Написать в Telegram');
+        }
+        if (button.querySelector('.bi-whatsapp')) {
+            button.setAttribute('data-bs-toggle', 'tooltip');
+            button.setAttribute('data-bs-placement', 'top');
+            button.setAttribute('title', 'Написать в WhatsApp');
+        }
+        if (button.querySelector('.bi-instagram')) {
+            button.setAttribute('data-bs-toggle', 'tooltip');
+            button.setAttribute('data-bs-placement', 'top');
+            button.setAttribute('title', 'Перейти в Instagram');
+        }
+    });
+
+    var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
+    var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {
+        return new bootstrap.Tooltip(tooltipTriggerEl);
+    });
+});
@@ -0,0 +1,22 @@
+document.getElementById('editPhone').addEventListener('input', function(e) {
+    let value = e.target.value.replace(/\D/g, '');
+    if (value.length > 0) {
+        if (value[0] !== '7' && value[0] !== '8') {
+            value = '7' + value;
+        }
+        let formatted = '+7';
+        if (value.length > 1) formatted += ' (' + value.substring(1, 4);
+        if (value.length > 4) formatted += ') ' + value.substring(4, 7);
+        if (value.length > 7) formatted += '-' + value.substring(7, 9);
+        if (value.length > 9) formatted += '-' + value.substring(9, 11);
+        e.target.value = formatted.substring(0, 18);
+    }
+});
+
+setTimeout(function() {
+    var alerts = document.querySelectorAll('.alert');
+    alerts.forEach(function(alert) {
+        var bsAlert = new bootstrap.Alert(alert);
+        bsAlert.close();
+    });
+}, 5000);
@@ -0,0 +1,142 @@
+// Валидация формы
+(function() {
+    'use strict'
+
+    var forms = document.querySelectorAll('.needs-validation')
+
+    Array.prototype.slice.call(forms)
+        .forEach(function(form) {
+            form.addEventListener('submit', function(event) {
+                if (!form.checkValidity()) {
+                    event.preventDefault()
+                    event.stopPropagation()
+                }
+
+                form.classList.add('was-validated')
+            }, false)
+        })
+})()
+
+// Проверка сложности пароля
+function checkPasswordStrength() {
+    const password = document.getElementById('password1').value;
+    const strengthBar = document.getElementById('password-strength-bar');
+    const requirements = {
+        length: document.getElementById('req-length'),
+        letter: document.getElementById('req-letter'),
+        number: document.getElementById('req-number'),
+        special: document.getElementById('req-special')
+    };
+
+    let score = 0;
+    let totalRequirements = 0;
+    let metRequirements = 0;
+
+    // Проверка длины
+    if (password.length >= 8) {
+        requirements.length.classList.remove('requirement-not-met');
+        requirements.length.classList.add('requirement-met');
+        score += 25;
+        metRequirements++;
+    } else {
+        requirements.length.classList.remove('requirement-met');
+        requirements.length.classList.add('requirement-not-met');
+    }
+    totalRequirements++;
+
+    // Проверка букв
+    if (/[a-zA-Z]/.test(password)) {
+        requirements.letter.classList.remove('requirement-not-met');
+        requirements.letter.classList.add('requirement-met');
+        score += 25;
+        metRequirements++;
+    } else {
+        requirements.letter.classList.remove('requirement-met');
+        requirements.letter.classList.add('requirement-not-met');
+    }
+    totalRequirements++;
+
+    // Проверка цифр
+    if (/\d/.test(password)) {
+        requirements.number.classList.remove('requirement-not-met');
+        requirements.number.classList.add('requirement-met');
+        score += 25;
+        metRequirements++;
+    } else {
+        requirements.number.classList.remove('requirement-met');
+        requirements.number.classList.add('requirement-not-met');
+    }
+    totalRequirements++;
+
+    // Проверка специальных символов
+    if (/[!@#$%^&*()_+\-=\[\]{};':"\\|,.<>\/?]/.test(password)) {
+        requirements.special.classList.remove('requirement-not-met');
+        requirements.special.classList.add('requirement-met');
+        score += 25;
+        metRequirements++;
+    } else {
+        requirements.special.classList.remove('requirement-met');
+        requirements.special.classList.add('requirement-not-met');
+    }
+    totalRequirements++;
+
+    // Обновление прогресс-бара
+    strengthBar.style.width = score + '%';
+
+    // Цвет прогресс-бара в зависимости от силы пароля
+    if (score < 50) {
+        strengthBar.style.backgroundColor = '#F44336'; // Красный
+    } else if (score < 75) {
+        strengthBar.style.backgroundColor = '#FFC107'; // Желтый
+    } else {
+        strengthBar.style.backgroundColor = '#4CAF50'; // Зеленый
+    }
+}
+
+// Проверка совпадения паролей
+function checkPasswordMatch() {
+    const password1 = document.getElementById('password1').value;
+    const password2 = document.getElementById('password2').value;
+    const matchFeedback = document.getElementById('password-match-feedback');
+    const matchSuccess = document.getElementById('password-match-success');
+    const registerButton = document.getElementById('register-button');
+
+    if (password2.length > 0) {
+        if (password1 === password2) {
+            matchFeedback.classList.add('d-none');
+            matchSuccess.classList.remove('d-none');
+            registerButton.disabled = false;
+        } else {
+            matchFeedback.classList.remove('d-none');
+            matchSuccess.classList.add('d-none');
+            registerButton.disabled = true;
+        }
+    } else {
+        matchFeedback.classList.add('d-none');
+        matchSuccess.classList.add('d-none');
+    }
+}
+
+// Автофокус на первое поле
+document.addEventListener('DOMContentLoaded', function() {
+    document.getElementById('username').focus();
+
+    // Инициализация проверки пароля
+    checkPasswordStrength();
+});
+
+// Маска для телефона
+document.getElementById('phone').addEventListener('input', function(e) {
+    let value = e.target.value.replace(/\D/g, '');
+    if (value.length > 0) {
+        if (value[0] !== '7' && value[0] !== '8') {
+            value = '7' + value;
+        }
+        let formatted = '+7';
+        if (value.length > 1) formatted += ' (' + value.substring(1, 4);
+        if (value.length > 4) formatted += ') ' + value.substring(4, 7);
+        if (value.length > 7) formatted += '-' + value.substring(7, 9);
+        if (value.length > 9) formatted += '-' + value.substring(9, 11);
+        e.target.value = formatted.substring(0, 18);
+    }
+});
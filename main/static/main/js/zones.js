@@ -0,0 +1,83 @@
+// Адрес потока загрузки зон передается атрибутом data-stream-url тега script
+const streamUrl = document.currentScript.dataset.streamUrl;
+
+document.addEventListener('DOMContentLoaded', function() {
+    // Функция для обновления доступности всех зон
+    function updateAllZonesAvailability() {
+        fetch('/api/availability/')
+            .then(response => response.json())
+            .then(data => {
+                if (data.success && data.zones) {
+                    data.zones.forEach(zone => {
+                        updateZoneCard(zone);
+                    });
+                    console.log('Доступность зон обновлена:', new Date().toLocaleTimeString());
+                }
+            })
+            .catch(error => {
+                console.error('Ошибка при обновлении доступности:', error);
+            });
+    }
+
+    // Функция для обновления конкретной карточки зоны
+    function updateZoneCard(zone) {
+        const availableElement = document.getElementById(`available-zone-${zone.id}`);
+        const badgeElement = document.getElementById(`badge-zone-${zone.id}`);
+        const progressElement = document.getElementById(`progress-zone-${zone.id}`);
+
+        if (availableElement) {
+            availableElement.textContent = zone.available_seats;
+        }
+
+        if (badgeElement && progressElement) {
+            let badgeClass = 'badge ';
+            let badgeText = '';
+            let progressColor = '';
+
+            // Определяем состояние зоны
+            if (zone.available_seats === 0) {
+                badgeClass += 'bg-danger';
+                badgeText = 'Занято';
+                progressColor = '#F44336';
+            } else if (zone.available_seats < zone.capacity) {
+                badgeClass += 'bg-warning text-dark';
+                badgeText = `${zone.available_seats}/${zone.capacity}`;
+                progressColor = '#FFC107';
+            } else {
+                badgeClass += 'bg-success';
+                badgeText = 'Свободно';
+                progressColor = '#4CAF50';
+            }
+
+            badgeElement.innerHTML = `<span class="${badgeClass}">${badgeText}</span>`;
+
+            // Обновляем прогресс-бар
+            const percentage = Math.max(0, (zone.available_seats / zone.capacity) * 100);
+            progressElement.style.width = `${percentage}%`;
+            progressElement.style.backgroundColor = progressColor;
+        }
+    }
+
+    // Опрос каждые 30 секунд - запасной вариант, если поток недоступен
+    let pollTimer = null;
+    function startPolling() {
+        if (pollTimer) return;
+        updateAllZonesAvailability();
+        pollTimer = setInterval(updateAllZonesAvailability, 30000);
+    }
+
+    // Инициализация: сервер сам присылает изменения загрузки зон
+    if (window.EventSource) {
+        const source = new EventSource(streamUrl);
+        source.addEventListener('occupancy', function(event) {
+            JSON.parse(event.data).zones.forEach(updateZoneCard);
+        });
+        source.onerror = function() {
+            if (source.readyState === EventSource.CLOSED) {
+                startPolling();
+            }
+        };
+    } else {
+        startPolling();
+    }
+});
@@ -0,0 +1,156 @@
+"""Дневные итоги по зонам: инкрементальная сборка и отчеты"""
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Booking, DailyZoneStats
+
+# Изменения, зафиксированные долгими транзакциями чуть раньше прошлого
+# запуска, тоже попадают в пересчет
+SAFETY_MARGIN = timedelta(minutes=5)
+
+# Сколько дней пересчитывать одним запросом
+DAYS_PER_QUERY = 100
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, start + timedelta(days=1)
+
+
+def _aggregate(bookings):
+    """Итоги по (зона, день) для выборки бронирований одним GROUP BY"""
+    active = ~Q(status='cancelled')
+    return bookings.with_price().annotate(
+        day=TruncDate('start_time', tzinfo=timezone.get_current_timezone()),
+    ).order_by().values('zone_id', 'day').annotate(
+        total_bookings=Count('id', filter=active),
+        total_cancelled=Count('id', filter=Q(status='cancelled')),
+        total_people_hours=Sum(F('number_of_people') * F('duration_hours'), filter=active),
+        total_revenue=Sum('total_price', filter=active),
+    )
+
+
+def _stats_objects(rows, computed_at):
+    return [
+        DailyZoneStats(
+            zone_id=row['zone_id'],
+            date=row['day'],
+            bookings=row['total_bookings'],
+            cancelled=row['total_cancelled'],
+            people_hours=row['total_people_hours'] or 0,
+            revenue=row['total_revenue'] or 0,
+            computed_at=computed_at,
+        )
+        for row in rows
+    ]
+
+
+def touched_days(since):
+    """Пары (зона, день), в которых бронирования менялись после since или итоги устарели"""
+    changed = Booking.objects.filter(updated_at__gt=since).annotate(
+        day=TruncDate('start_time', tzinfo=timezone.get_current_timezone()),
+    ).order_by().values_list('zone_id', 'day').distinct()
+    stale = DailyZoneStats.objects.filter(stale=True).values_list('zone_id', 'date')
+    return set(changed) | set(stale)
+
+
+def rebuild_days(pairs, computed_at=None):
+    """Пересчитывает итоги для набора пар (зона, день)"""
+    computed_at = computed_at or timezone.now()
+    zones_by_day = {}
+    for zone_id, day in pairs:
+        zones_by_day.setdefault(day, set()).add(zone_id)
+    days = sorted(zones_by_day)
+
+    for offset in range(0, len(days), DAYS_PER_QUERY):
+        chunk = days[offset:offset + DAYS_PER_QUERY]
+        bookings_filter = Q()
+        stats_filter = Q()
+        for day in chunk:
+            start, end = _day_bounds(day)
+            bookings_filter |= Q(zone_id__in=zones_by_day[day], start_time__gte=start, start_time__lt=end)
+            stats_filter |= Q(zone_id__in=zones_by_day[day], date=day)
+
+        rows = _aggregate(Booking.objects.filter(bookings_filter))
+        with transaction.atomic():
+            DailyZoneStats.objects.filter(stats_filter).delete()
+            DailyZoneStats.objects.bulk_create(_stats_objects(rows, computed_at))
+
+
+def refresh_daily_stats(full=False, chunk_size=1000):
+    """
+    Обновляет дневные итоги.
+
+    По умолчанию пересчитываются только дни, в которых бронирования
+    менялись с прошлого запуска (по updated_at), и итоги, помеченные
+    устаревшими после удаления или переноса бронирований. При full=True таблица
+    собирается заново. Возвращает количество пересчитанных пар (зона, день).
+    """
+    computed_at = timezone.now()
+
+    if full or not DailyZoneStats.objects.exists():
+        with transaction.atomic():
+            DailyZoneStats.objects.all().delete()
+            rows = _aggregate(Booking.objects.all()).iterator(chunk_size=chunk_size)
+            created = DailyZoneStats.objects.bulk_create(_stats_objects(rows, computed_at), batch_size=chunk_size)
+        return len(created)
+
+    last_run = DailyZoneStats.objects.aggregate(last=Max('computed_at'))['last']
+    pairs = touched_days(last_run - SAFETY_MARGIN)
+    rebuild_days(pairs, computed_at)
+    return len(pairs)
+
+
+def mark_stale(zone_id, start_time):
+    """Помечает итоги дня устаревшими (после удаления или переноса бронирования)"""
+    day = timezone.localtime(start_time).date()
+    DailyZoneStats.objects.filter(zone_id=zone_id, date=day).update(stale=True)
+
+
+def stats_report(start_date, end_date, zones=None):
+    """
+    Отчет за период [start_date, end_date] только по таблице итогов.
+
+    Возвращает словарь с итогами по зонам, по дням и общими итогами.
+    """
+    stats = DailyZoneStats.objects.filter(date__gte=start_date, date__lte=end_date)
+    if zones is not None:
+        stats = stats.filter(zone__in=zones)
+
+    fields = dict(
+        bookings=Sum('bookings'),
+        cancelled=Sum('cancelled'),
+        people_hours=Sum('people_hours'),
+        revenue=Sum('revenue'),
+    )
+    by_zone = list(stats.order_by('zone__title').values('zone_id', 'zone__title').annotate(**fields))
+    by_day = list(stats.order_by('date').values('date').annotate(**fields))
+
+    totals = {name: sum(row[name] or 0 for row in by_zone) for name in fields}
+    for row in [*by_zone, *by_day, totals]:
+        total = (row['bookings'] or 0) + (row['cancelled'] or 0)
+        row['cancellation_rate'] = round(row['cancelled'] / total, 4) if total else 0.0
+    return {'zones': by_zone, 'days': by_day, 'totals': totals}
+
+
+def parse_period(params, default_days=30):
+    """
+    Период отчета из параметров start и end (даты включительно).
+
+    По умолчанию - последние default_days дней. Бросает ValueError для
+    некорректных дат.
+    """
+    end_date = timezone.localdate()
+    start_date = end_date - timedelta(days=default_days - 1)
+    if params.get('start'):
+        start_date = parse_date(params['start'])
+    if params.get('end'):
+        end_date = parse_date(params['end'])
+    if not start_date or not end_date or start_date > end_date:
+        raise ValueError('Некорректный период')
+    return start_date, end_date
@@ -0,0 +1,98 @@
+"""Server-Sent Events: рассылка изменений загрузки зон подписчикам"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from .snapshot import get_availability_snapshot, get_version
+
+# Поля зоны, изменение которых отправляется подписчикам
+TRACKED_FIELDS = ('title', 'capacity', 'available_seats', 'status', 'is_available')
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+class AvailabilityBroadcaster:
+    """
+    Один фоновый цикл на процесс следит за версией данных и границами
+    бронирований и будит подписчиков только при изменении снимка.
+    Стоимость опроса кэша и БД не зависит от количества подписчиков.
+    """
+
+    def __init__(self, poll_interval=1.0, heartbeat_interval=15.0):
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.subscribers = 0
+        self._loop = None
+        self._task = None
+        self._changed = None
+        self._zones = None
+        self._etag = None
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Новый цикл событий (например, в тестах) - начинаем с чистого состояния
+            self._loop = loop
+            self._task = None
+            self._changed = asyncio.Event()
+            self._zones = None
+            self._etag = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    async def refresh(self):
+        """Перечитывает снимок и будит подписчиков, если он изменился"""
+        snapshot = await sync_to_async(get_availability_snapshot)()
+        if snapshot['etag'] != self._etag:
+            self._etag = snapshot['etag']
+            self._zones = snapshot['payload']['zones']
+            changed, self._changed = self._changed, asyncio.Event()
+            changed.set()
+        return snapshot
+
+    async def _run(self):
+        version = expires_at = None
+        while self.subscribers:
+            current_version = await sync_to_async(get_version)()
+            if current_version != version or expires_at is None or timezone.now() >= expires_at:
+                snapshot = await self.refresh()
+                version, expires_at = current_version, snapshot['expires_at']
+            await asyncio.sleep(self.poll_interval)
+
+    async def events(self):
+        """Асинхронный генератор SSE-сообщений для одного подписчика"""
+        self.subscribers += 1
+        try:
+            self._ensure_running()
+            if self._zones is None:
+                await self.refresh()
+
+            yield 'retry: 5000\n\n'
+            sent = {}
+            while True:
+                changed = self._changed
+                delta = []
+                for zone in self._zones:
+                    state = tuple(zone[field] for field in TRACKED_FIELDS)
+                    if sent.get(zone['id']) != state:
+                        sent[zone['id']] = state
+                        delta.append(zone)
+                if delta:
+                    yield format_event('occupancy', {
+                        'zones': delta,
+                        'current_time': timezone.now().isoformat(),
+                    })
+
+                try:
+                    await asyncio.wait_for(changed.wait(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+        finally:
+            self.subscribers -= 1
+
+
+broadcaster = AvailabilityBroadcaster()
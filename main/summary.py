@@ -0,0 +1,79 @@
+"""Кэшированная сводка по бронированиям пользователя для личного кабинета"""
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import Booking, ACTIVE_STATUSES
+from .snapshot import get_version
+
+# Версия данных о доступности из БД меняется при любом изменении бронирований,
+# поэтому сводку не нужно сбрасывать отдельно - ни в этом процессе, ни в других
+SUMMARY_KEY = 'profile:summary:{user_id}:{version}'
+SUMMARY_TIMEOUT = 60 * 60
+
+
+def build_summary(user_id):
+    """
+    Сводка по бронированиям пользователя одним агрегирующим запросом.
+
+    Возвращает словарь: всего бронирований, часов и потрачено (без
+    отмененных) и ближайшее бронирование, которое еще не закончилось,
+    или None.
+    """
+    now = timezone.now()
+    paid = ~Q(status='cancelled')
+    upcoming = Booking.objects.filter(
+        user_id=OuterRef('user_id'), status__in=ACTIVE_STATUSES, end_time__gt=now,
+    ).order_by('start_time', 'id')
+
+    rows = list(
+        Booking.objects.filter(user_id=user_id).with_price().order_by().values('user_id').annotate(
+            total_bookings=Count('id'),
+            hours=Sum('duration_hours', filter=paid),
+            spent=Sum('total_price', filter=paid),
+            upcoming_id=Subquery(upcoming.values('id')[:1]),
+            upcoming_zone=Subquery(upcoming.values('zone__title')[:1]),
+            upcoming_start=Subquery(upcoming.values('start_time')[:1]),
+            upcoming_end=Subquery(upcoming.values('end_time')[:1]),
+        )
+    )
+    row = rows[0] if rows else {}
+
+    upcoming_booking = None
+    if row.get('upcoming_id'):
+        upcoming_booking = {
+            'id': row['upcoming_id'],
+            'zone': row['upcoming_zone'],
+            'start_time': row['upcoming_start'],
+            'end_time': row['upcoming_end'],
+            'is_active_now': row['upcoming_start'] <= now,
+        }
+    return {
+        'total_bookings': row.get('total_bookings', 0),
+        'hours': round(row.get('hours') or 0, 1),
+        'spent': row.get('spent') or 0,
+        'upcoming': upcoming_booking,
+    }
+
+
+def get_user_summary(user_id):
+    """
+    Сводка из кэша, при промахе собирается заново.
+
+    Запись живет до окончания ближайшего бронирования: после него
+    ближайшим становится другое. Началось ли оно, проверяется при каждом
+    чтении - запись, собранная до начала, живет и после него.
+    """
+    key = SUMMARY_KEY.format(user_id=user_id, version=get_version())
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_summary(user_id)
+        timeout = SUMMARY_TIMEOUT
+        if summary['upcoming']:
+            remaining = (summary['upcoming']['end_time'] - timezone.now()).total_seconds()
+            timeout = max(1, min(timeout, int(remaining) + 1))
+        cache.set(key, summary, timeout)
+    if summary['upcoming']:
+        summary['upcoming']['is_active_now'] = summary['upcoming']['start_time'] <= timezone.now()
+    return summary
+
@@ -0,0 +1,11 @@
+from django import template
+
+from ..assets import vendor_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_static(name):
+    """{% vendor_static 'vendor/...' %}: своя копия библиотеки или CDN, если она не скачана"""
+    return vendor_url(name)
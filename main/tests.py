@@ -1,6 +1,52 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import os
+import random
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.db.models import Count, F
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from .models import Zone
+from django.utils import timezone
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from .admin import BookingAdmin, CustomUserAdmin, ZoneAdmin
+from .assets import VENDOR_FILES
+from .models import (
+    Zone, Booking, OccupancyBucket, ContactMessage, DailyZoneStats, UserProfile, ViewProfile, AvailabilityVersion,
+)
+from .availability import peak_occupancy
+from .benchmarks import BENCHMARKS, DatasetSpec, generate_dataset, percentile
+from .benchmarks.servers import polling_targets, run_polling
+from .streaming import AvailabilityBroadcaster
+from .reservations import reserve_booking, CapacityExceeded
+from .slots import find_free_slots
+from .snapshot import get_version, invalidate_availability
+from .sqlite import is_lock_error, retry_on_lock
+from .stats import refresh_daily_stats, touched_days
+from .summary import build_summary, get_user_summary
+from .instrumentation import RequestMetricsMiddleware, slow_requests, stage
+from .profiling import BUCKET_BOUNDS, bucket_index, histogram_percentile, profiler
+from .exports import export_lines
+from .imports import import_bookings, read_rows
+from .occupancy import hour_floor, hourly_occupancy, rebuild_occupancy
 
 class ZoneModelTest(TestCase):
     def setUp(self):
@@ -24,4 +70,1549 @@ class ViewTests(TestCase):
 
     def test_zones_view(self):
         response = self.client.get(reverse('zones'))
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+
+
+class ZoneAvailabilityEngineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.hall = Zone.objects.create(title="Зал", description="", price_per_hour=300, capacity=10)
+        self.room = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=4)
+        self.empty = Zone.objects.create(title="Терраса", description="", price_per_hour=200, capacity=6)
+
+    def book(self, zone, people, start, end, status='confirmed'):
+        return Booking.objects.create(
+            zone=zone, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="guest@example.com", number_of_people=people,
+            start_time=start, end_time=end, status=status,
+        )
+
+    def test_available_seats_now_in_single_query(self):
+        self.book(self.hall, 3, self.now - timedelta(hours=1), self.now + timedelta(hours=1))
+        self.book(self.hall, 2, self.now - timedelta(hours=1), self.now + timedelta(hours=1), status='pending')
+        self.book(self.hall, 4, self.now - timedelta(hours=1), self.now + timedelta(hours=1), status='cancelled')
+        self.book(self.room, 6, self.now - timedelta(hours=1), self.now + timedelta(hours=1))
+        self.book(self.room, 1, self.now + timedelta(hours=2), self.now + timedelta(hours=3))
+
+        with self.assertNumQueries(1):
+            seats = Zone.objects.available_seats_map()
+
+        self.assertEqual(seats, {self.hall.id: 5, self.room.id: 0, self.empty.id: 6})
+        self.assertEqual(self.hall.get_available_seats(), 5)
+        self.assertEqual(self.room.get_availability_status(), 'fully_booked')
+
+    def test_available_seats_for_interval(self):
+        start = self.now + timedelta(hours=2)
+        end = start + timedelta(hours=2)
+        self.book(self.hall, 3, start - timedelta(hours=1), start + timedelta(hours=1))
+        self.book(self.hall, 2, end, end + timedelta(hours=1))
+        completed = self.book(self.hall, 1, start, end, status='completed')
+
+        seats = Zone.objects.available_seats_map(start, end)
+        self.assertEqual(seats[self.hall.id], 6)
+        self.assertEqual(seats[self.empty.id], 6)
+        self.assertEqual(
+            self.hall.get_available_seats_for_time(start, end, exclude_booking_id=completed.id), 7
+        )
+        self.assertTrue(self.hall.is_available_for_time(start, end, 7, exclude_booking_id=completed.id))
+
+    def test_back_to_back_bookings_do_not_add_up(self):
+        start = self.now + timedelta(hours=1)
+        self.book(self.room, 2, start, start + timedelta(hours=2))
+        self.book(self.room, 2, start + timedelta(hours=2), start + timedelta(hours=4))
+
+        window_end = start + timedelta(hours=4)
+        self.assertEqual(self.room.get_available_seats_for_time(start, window_end), 2)
+        self.assertTrue(self.room.is_available_for_time(start, window_end, 2))
+        self.assertFalse(self.room.is_available_for_time(start, window_end, 3))
+
+    def test_availability_api_reads_zones_in_one_query(self):
+        self.book(self.room, 2, self.now - timedelta(hours=1), self.now + timedelta(hours=1))
+
+        # Строка версии и зоны с занятыми местами
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('availability_api'))
+
+        zones = {zone['id']: zone for zone in response.json()['zones']}
+        self.assertEqual(zones[self.room.id]['available_seats'], 2)
+        self.assertEqual(zones[self.room.id]['status'], 'partially_available')
+        self.assertEqual(zones[self.hall.id]['status'], 'fully_available')
+
+
+class PeakOccupancyTest(TestCase):
+    def test_peak_occupancy(self):
+        intervals = [(0, 4, 2), (2, 6, 3), (6, 8, 5), (7, 9, 1)]
+        self.assertEqual(peak_occupancy(intervals), 6)
+        self.assertEqual(peak_occupancy(intervals, 0, 6), 5)
+        self.assertEqual(peak_occupancy(intervals, 4, 7), 5)
+        self.assertEqual(peak_occupancy(intervals, 9, 10), 0)
+        self.assertEqual(peak_occupancy([]), 0)
+
+
+class AvailabilitySnapshotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.zone = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=4)
+        self.url = reverse('availability_api')
+
+    def book(self, people):
+        return Booking.objects.create(
+            zone=self.zone, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="guest@example.com", number_of_people=people,
+            start_time=self.now - timedelta(hours=1), end_time=self.now + timedelta(hours=1),
+            status='confirmed',
+        )
+
+    def test_snapshot_is_cached(self):
+        self.client.get(self.url)
+        # Только строка версии
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['zones'][0]['available_seats'], 4)
+
+    def test_unchanged_poll_returns_304(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_booking_changes_rebuild_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+
+        booking = self.book(3)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['zones'][0]['available_seats'], 1)
+
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertEqual(self.client.get(self.url).json()['zones'][0]['available_seats'], 4)
+
+    def test_admin_bulk_actions_rebuild_snapshot(self):
+        self.book(2)
+        self.assertEqual(self.client.get(self.url).json()['zones'][0]['available_seats'], 2)
+
+        admin.site._registry[Booking]._update_status(Booking.objects.all(), 'cancelled')
+        self.assertEqual(self.client.get(self.url).json()['zones'][0]['available_seats'], 4)
+
+    def test_rolled_back_version_is_not_reused(self):
+        version = get_version()
+        with transaction.atomic():
+            invalidate_availability()
+            rolled_back = get_version()
+            transaction.set_rollback(True)
+        self.assertEqual(get_version(), version)
+        invalidate_availability()
+        self.assertNotIn(get_version(), (version, rolled_back))
+
+    def test_change_in_another_process_rebuilds_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+        # Другой процесс: его сигналы не трогают кэш этого процесса, общая
+        # только версия в БД
+        with mock.patch('main.signals.invalidate_availability'):
+            self.book(3)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        AvailabilityVersion.objects.update(version=F('version') + 1)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['zones'][0]['available_seats'], 1)
+
+
+class AvailabilityStreamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.room = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=4)
+        self.hall = Zone.objects.create(title="Зал", description="", price_per_hour=300, capacity=10)
+
+    def test_wsgi_fallback_sends_single_event(self):
+        response = self.client.get(reverse('availability_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.content.decode()
+        self.assertTrue(content.startswith('retry: 30000'))
+        self.assertIn('event: occupancy', content)
+
+    async def test_broadcaster_sends_only_changed_zones(self):
+        broadcaster = AvailabilityBroadcaster(poll_interval=0.01)
+        events = broadcaster.events()
+        self.assertEqual(await events.__anext__(), 'retry: 5000\n\n')
+
+        initial = json.loads((await events.__anext__()).split('data: ', 1)[1])
+        self.assertEqual({zone['id'] for zone in initial['zones']}, {self.room.id, self.hall.id})
+
+        await Booking.objects.acreate(
+            zone=self.room, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="guest@example.com", number_of_people=3,
+            start_time=self.now - timedelta(hours=1), end_time=self.now + timedelta(hours=1),
+            status='confirmed',
+        )
+        delta = json.loads((await asyncio.wait_for(events.__anext__(), 5)).split('data: ', 1)[1])
+        self.assertEqual([zone['id'] for zone in delta['zones']], [self.room.id])
+        self.assertEqual(delta['zones'][0]['available_seats'], 1)
+
+        await events.aclose()
+        self.assertEqual(broadcaster.subscribers, 0)
+
+
+class ReservationTest(TestCase):
+    def setUp(self):
+        self.start = timezone.now() + timedelta(hours=1)
+        self.end = self.start + timedelta(hours=2)
+        self.zone = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=4)
+
+    def reserve(self, people, **kwargs):
+        return reserve_booking(
+            self.zone.id, self.start, self.end, people,
+            customer_name="Гость", customer_phone="+70000000000",
+            customer_email="guest@example.com", **kwargs
+        )
+
+    def test_booking_is_created_with_user_in_single_insert(self):
+        user = User.objects.create_user('guest', password='secret-pass-123')
+        with CaptureQueriesContext(connection) as queries:
+            booking = self.reserve(3, user=user)
+
+        booking_writes = [q['sql'] for q in queries if 'main_booking' in q['sql'].split(' WHERE')[0]
+                          and not q['sql'].startswith('SELECT')]
+        self.assertEqual(len(booking_writes), 1)
+        self.assertTrue(booking_writes[0].startswith('INSERT'))
+        self.assertEqual(Booking.objects.get(pk=booking.pk).user, user)
+
+    def test_booking_view_uses_reservation_service(self):
+        user = User.objects.create_user('guest', password='secret-pass-123')
+        self.client.force_login(user)
+        data = {
+            'zone': self.zone.id, 'name': "Гость", 'phone': "+70000000000",
+            'email': "guest@example.com", 'number_of_people': 3,
+            'start_time': timezone.localtime(self.start).strftime('%Y-%m-%dT%H:%M'),
+            'end_time': timezone.localtime(self.end).strftime('%Y-%m-%dT%H:%M'),
+        }
+        with self.assertLogs('main.views', 'INFO') as logs:
+            response = self.client.post(reverse('booking'), data)
+        self.assertRedirects(response, reverse('booking'))
+        booking = Booking.objects.get()
+        self.assertEqual(booking.user, user)
+        self.assertIn(f'Бронирование создано: id={booking.id}', logs.output[0])
+
+        response = self.client.post(reverse('booking'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_capacity_is_enforced(self):
+        self.reserve(3)
+        with self.assertRaises(CapacityExceeded):
+            self.reserve(2)
+        with self.assertRaises(Zone.DoesNotExist):
+            reserve_booking(0, self.start, self.end, 1, "Гость", "+70000000000", "guest@example.com")
+
+
+class ConcurrentReservationTest(TransactionTestCase):
+    THREADS = 200
+
+    def test_no_overbooking_under_concurrent_requests(self):
+        zone = Zone.objects.create(title="Зал", description="", price_per_hour=300, capacity=10)
+        start = timezone.now() + timedelta(hours=1)
+        end = start + timedelta(hours=2)
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def attempt():
+            try:
+                barrier.wait()
+                reserve_booking(zone.id, start, end, 1, "Гость", "+70000000000", "guest@example.com")
+                results.append('created')
+            except CapacityExceeded:
+                results.append('rejected')
+            except Exception as e:
+                results.append(repr(e))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count('created'), 10, results)
+        self.assertEqual(results.count('rejected'), self.THREADS - 10)
+        self.assertEqual(zone.get_available_seats_for_time(start, end), 0)
+        self.assertEqual(Booking.objects.filter(zone=zone).count(), 10)
+
+
+class FreeSlotSearchTest(TestCase):
+    def setUp(self):
+        self.origin = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        self.room = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=4)
+        self.hall = Zone.objects.create(title="Зал", description="", price_per_hour=300, capacity=2)
+
+    def book(self, zone, people, start_hours, end_hours):
+        return Booking.objects.create(
+            zone=zone, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="guest@example.com", number_of_people=people,
+            start_time=self.origin + timedelta(hours=start_hours),
+            end_time=self.origin + timedelta(hours=end_hours), status='confirmed',
+        )
+
+    def test_earliest_windows_skip_busy_periods(self):
+        self.book(self.room, 3, 1, 3)
+        self.book(self.room, 1, 3, 5)
+
+        slots = find_free_slots(
+            [self.room], party_size=2, duration=timedelta(hours=1),
+            horizon_start=self.origin, horizon=timedelta(days=1), limit=3,
+        )
+        self.assertEqual(
+            [(slot['start_time'], slot['available_seats']) for slot in slots],
+            [(self.origin, 4),
+             (self.origin + timedelta(hours=3), 3),
+             (self.origin + timedelta(hours=3, minutes=30), 3)],
+        )
+
+    def test_windows_are_merged_across_zones_and_horizon_extends(self):
+        self.book(self.room, 4, 0, 30)
+        self.book(self.hall, 2, 0, 48)
+
+        slots = find_free_slots(
+            party_size=1, duration=timedelta(hours=2), horizon_start=self.origin,
+            horizon=timedelta(days=7), limit=2,
+        )
+        self.assertEqual(
+            [(slot['zone'].id, slot['start_time']) for slot in slots],
+            [(self.room.id, self.origin + timedelta(hours=30)),
+             (self.room.id, self.origin + timedelta(hours=30, minutes=30))],
+        )
+
+    def test_free_slots_api(self):
+        self.book(self.hall, 2, 0, 2)
+        response = self.client.get(reverse('free_slots_api'), {
+            'zone': self.hall.id, 'number_of_people': 1, 'duration': 60, 'limit': 1,
+            'start_time': timezone.localtime(self.origin).strftime('%Y-%m-%dT%H:%M'),
+        })
+        slots = response.json()['slots']
+        self.assertEqual(len(slots), 1)
+        self.assertEqual(slots[0]['start_time'], (self.origin + timedelta(hours=2)).isoformat())
+
+        response = self.client.get(reverse('free_slots_api'), {'duration': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_free_slots_api_rejects_invalid_dates_and_huge_values(self):
+        for params in ({'start_time': '2026-02-30T10:00'}, {'start_time': '2026-13-45T10:00'},
+                       {'days': 99999999999}, {'duration': 99999999999999}, {'step': 99999999999999}):
+            response = self.client.get(reverse('free_slots_api'), params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class ZoneAvailabilityCheckTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.origin = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        self.room = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=4)
+        self.hall = Zone.objects.create(title="Зал", description="", price_per_hour=300, capacity=2)
+        self.url = reverse('check_zone_availability', args=[self.room.id])
+
+    def book(self, zone, people, start_hours, end_hours):
+        return Booking.objects.create(
+            zone=zone, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="guest@example.com", number_of_people=people,
+            start_time=self.origin + timedelta(hours=start_hours),
+            end_time=self.origin + timedelta(hours=end_hours), status='confirmed',
+        )
+
+    def params(self, start_hours, end_hours, people=1):
+        return {
+            'start_time': (self.origin + timedelta(hours=start_hours)).isoformat(),
+            'end_time': (self.origin + timedelta(hours=end_hours)).isoformat(),
+            'number_of_people': people,
+        }
+
+    def test_interval_check(self):
+        self.book(self.room, 3, 1, 3)
+        data = self.client.get(self.url, self.params(0, 2, people=2)).json()
+        self.assertEqual(data['available_seats'], 1)
+        self.assertFalse(data['available'])
+
+        data = self.client.get(self.url, self.params(3, 4, people=2)).json()
+        self.assertEqual(data['available_seats'], 4)
+        self.assertTrue(data['available'])
+
+    def test_current_moment_uses_snapshot(self):
+        self.client.get(reverse('availability_api'))
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['available_seats'], 4)
+
+    def test_unchanged_check_returns_304_after_version_read(self):
+        params = self.params(0, 2)
+        etag = self.client.get(self.url, params)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.book(self.room, 1, 0, 1)
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['available_seats'], 3)
+
+        # Бронь через другой процесс меняет только версию в БД
+        etag = self.client.get(self.url, params)['ETag']
+        with mock.patch('main.signals.invalidate_availability'):
+            self.book(self.room, 1, 0, 1)
+        AvailabilityVersion.objects.update(version=F('version') + 1)
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['available_seats'], 2)
+
+    def test_head_reads_only_version(self):
+        with self.assertNumQueries(1):
+            response = self.client.head(self.url, self.params(0, 2))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'number_of_people': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start_time': 'abc', 'end_time': 'abc'}).status_code, 400)
+        for start_time in ('2026-13-45T10:00', '2026-02-30T10:00'):
+            response = self.client.get(self.url, {'start_time': start_time, 'end_time': '2026-03-01T12:00'})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    def test_batch_check_uses_single_booking_query(self):
+        self.book(self.room, 3, 1, 3)
+        self.book(self.hall, 2, 0, 1)
+        checks = [
+            f'{self.room.id},{self.params(0, 2)["start_time"]},{self.params(0, 2)["end_time"]},2',
+            f'{self.hall.id},{self.params(1, 2)["start_time"]},{self.params(1, 2)["end_time"]},2',
+            f'999,{self.params(0, 1)["start_time"]},{self.params(0, 1)["end_time"]}',
+        ]
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('check_zones_availability_batch'), {'check': checks})
+        results = response.json()['results']
+        self.assertEqual([result['available_seats'] for result in results], [1, 2, None])
+        self.assertEqual([result['available'] for result in results], [False, True, False])
+
+        response = self.client.get(reverse('check_zones_availability_batch'), {'check': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OccupancyBucketTest(TestCase):
+    def setUp(self):
+        self.origin = hour_floor(timezone.now()) + timedelta(days=1)
+        self.room = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=4)
+
+    def book(self, people, start_minutes, end_minutes, status='confirmed'):
+        return Booking.objects.create(
+            zone=self.room, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="guest@example.com", number_of_people=people,
+            start_time=self.origin + timedelta(minutes=start_minutes),
+            end_time=self.origin + timedelta(minutes=end_minutes), status=status,
+        )
+
+    def buckets(self):
+        return list(OccupancyBucket.objects.order_by('hour').values_list('hour', 'peak_seats', 'seat_minutes'))
+
+    def assertMatchesRebuild(self):
+        incremental = self.buckets()
+        rebuild_occupancy(chunk_size=2)
+        self.assertEqual(incremental, self.buckets())
+
+    def test_buckets_follow_booking_changes(self):
+        first = self.book(2, 30, 150)
+        self.book(1, 60, 120)
+        self.assertEqual(self.buckets(), [
+            (self.origin, 2, 60),
+            (self.origin + timedelta(hours=1), 3, 180),
+            (self.origin + timedelta(hours=2), 2, 60),
+        ])
+        self.assertMatchesRebuild()
+
+        booking = Booking.objects.get(pk=first.pk)
+        booking.start_time += timedelta(hours=5)
+        booking.end_time += timedelta(hours=5)
+        booking.save()
+        self.assertEqual(self.buckets()[0], (self.origin + timedelta(hours=1), 1, 60))
+        self.assertMatchesRebuild()
+
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertEqual(self.buckets(), [(self.origin + timedelta(hours=1), 1, 60)])
+        self.assertMatchesRebuild()
+
+        Booking.objects.all().delete()
+        self.assertEqual(self.buckets(), [])
+
+    def test_admin_bulk_cancel_updates_buckets(self):
+        self.book(2, 0, 120)
+        admin.site._registry[Booking]._update_status(Booking.objects.all(), 'cancelled')
+        self.assertEqual(self.buckets(), [])
+
+    def test_week_reads_one_row_per_hour(self):
+        self.book(3, 60, 180)
+        with self.assertNumQueries(2):
+            occupancy = hourly_occupancy(self.origin, self.origin + timedelta(days=7))
+        hours = occupancy[self.room.id]
+        self.assertEqual(len(hours), 24 * 7)
+        self.assertEqual(hours[1], (self.origin + timedelta(hours=1), 3, 1))
+        self.assertEqual(hours[3], (self.origin + timedelta(hours=3), 0, 4))
+
+    def test_occupancy_api(self):
+        self.book(3, 0, 60)
+        response = self.client.get(reverse('occupancy_api'), {
+            'start': timezone.localtime(self.origin).date().isoformat(), 'days': 2,
+        })
+        zone = response.json()['zones'][0]
+        self.assertEqual(len(zone['hours']), 48)
+        self.assertEqual(sum(hour['occupied_seats'] for hour in zone['hours']), 3)
+
+        self.assertEqual(self.client.get(reverse('occupancy_api'), {'days': 100}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('occupancy_api'), {'start': '2026-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('occupancy_api'), {'start': 'abc'}).status_code, 400)
+
+
+class UpdateAvailabilityCommandTest(TransactionTestCase):
+    # Режим --loop закрывает устаревшие соединения, что невозможно внутри
+    # транзакции TestCase
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.zone = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=4)
+
+    def book(self, status, start_hours, end_hours):
+        return Booking.objects.create(
+            zone=self.zone, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="guest@example.com", number_of_people=1,
+            start_time=self.now + timedelta(hours=start_hours),
+            end_time=self.now + timedelta(hours=end_hours), status=status,
+        )
+
+    def test_expired_bookings_are_completed_in_bulk(self):
+        expired = [self.book('confirmed', -3, -2), self.book('pending', -2, -1)]
+        cancelled = self.book('cancelled', -3, -2)
+        current = self.book('confirmed', -1, 1)
+        version = get_version()
+
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('update_availability', stdout=out)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "main_booking"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('Завершено броней: 2', out.getvalue())
+
+        statuses = dict(Booking.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[booking.id] for booking in expired], ['completed', 'completed'])
+        self.assertEqual(statuses[cancelled.id], 'cancelled')
+        self.assertEqual(statuses[current.id], 'confirmed')
+        self.assertNotEqual(get_version(), version)
+
+        # Без изменений снимки процессов сервера не сбрасываются
+        version = get_version()
+        call_command('update_availability', stdout=StringIO())
+        self.assertEqual(get_version(), version)
+
+    def test_loop_mode(self):
+        out = StringIO()
+        call_command('update_availability', '--loop', '--interval', '0', '--max-runs', '2', stdout=out)
+        self.assertEqual(out.getvalue().count('Завершено броней'), 2)
+
+
+class AdminQueryBudgetTest(TestCase):
+    """Список в админке строится за постоянное число запросов при любом количестве строк"""
+    ROWS = 1100
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        users = User.objects.bulk_create([User(username=f'user{number}') for number in range(cls.ROWS)])
+        zones = Zone.objects.bulk_create([
+            Zone(title=f'Зона {number}', description='', price_per_hour=100 + number, capacity=10)
+            for number in range(cls.ROWS)
+        ])
+        now = timezone.now()
+        Booking.objects.bulk_create([
+            Booking(
+                zone=zones[number % 5], user=users[number % 50] if number % 3 else None,
+                customer_name='Гость', customer_phone='+70000000000', customer_email='guest@example.com',
+                number_of_people=1, start_time=now + timedelta(hours=number),
+                end_time=now + timedelta(hours=number, minutes=90), status='confirmed',
+            )
+            for number in range(cls.ROWS)
+        ])
+        ContactMessage.objects.bulk_create([
+            ContactMessage(name='Гость', email='guest@example.com', message='Сообщение ' * 10)
+            for _ in range(cls.ROWS)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def assertChangelistQueries(self, url, budget, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), budget, '\n'.join(query['sql'] for query in queries))
+        return response
+
+    def test_booking_changelist(self):
+        url = reverse('admin:main_booking_changelist')
+        response = self.assertChangelistQueries(url, 9)
+        self.assertEqual(response.context['totals']['bookings'], self.ROWS)
+        self.assertContains(response, 'Итого по списку')
+        for order in ('duration', 'total_price', 'user_display'):
+            index = BookingAdmin.list_display.index(order)
+            self.assertChangelistQueries(url, 9, {'o': str(index + 1)})
+        user = User.objects.get(username='user1')
+        response = self.assertChangelistQueries(url, 10, {'user': user.id})
+        self.assertContains(response, 'user1')
+        self.assertEqual(response.context['totals']['revenue'], Booking.objects.filter(user=user).totals()['revenue'])
+
+    def test_booking_changelist_sorts_by_price(self):
+        index = BookingAdmin.list_display.index('total_price') + 1
+        response = self.client.get(reverse('admin:main_booking_changelist'), {'o': f'-{index}'})
+        prices = [booking.get_total_price() for booking in response.context['cl'].result_list]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+
+    def test_contact_message_changelist(self):
+        self.assertChangelistQueries(reverse('admin:main_contactmessage_changelist'), 5)
+
+    def test_bulk_action_on_annotated_changelist(self):
+        ids = list(Booking.objects.values_list('id', flat=True)[:3])
+        self.client.post(reverse('admin:main_booking_changelist'), {
+            'action': 'cancel_selected', '_selected_action': ids,
+        })
+        self.assertEqual(Booking.objects.filter(status='cancelled').count(), 3)
+
+    def test_zone_changelist(self):
+        url = reverse('admin:main_zone_changelist')
+        response = self.assertChangelistQueries(url, 6)
+        expected = dict(Booking.objects.order_by().values('zone').annotate(total=Count('id')).values_list('zone', 'total'))
+        for zone in response.context['cl'].result_list:
+            self.assertEqual(zone.booking_total, expected.get(zone.id, 0))
+
+        for order in ('current_available_seats', 'booking_count'):
+            index = ZoneAdmin.list_display.index(order)
+            self.assertChangelistQueries(url, 6, {'o': f'-{index + 1}'})
+
+    def test_user_changelist(self):
+        url = reverse('admin:auth_user_changelist')
+        index = CustomUserAdmin.list_display.index('booking_count')
+        response = self.assertChangelistQueries(url, 4, {'o': f'-{index + 1}'})
+        top = response.context['cl'].result_list[0]
+        self.assertEqual(top.booking_total, Booking.objects.filter(user=top).count())
+        self.assertGreater(top.booking_total, 0)
+
+
+class BookingPricingTest(TestCase):
+    """Длительность и стоимость в БД совпадают с расчетом в Python"""
+
+    def setUp(self):
+        self.zones = [
+            Zone.objects.create(title=f"Зона {price}", description="", price_per_hour=price, capacity=10)
+            for price in (1, 7, 333, 450, 999)
+        ]
+
+    def create_bookings(self, durations):
+        start = timezone.now().replace(microsecond=0)
+        Booking.objects.bulk_create([
+            Booking(
+                zone=self.zones[index % len(self.zones)], customer_name="Гость", customer_phone="+70000000000",
+                customer_email="guest@example.com", number_of_people=1,
+                start_time=start, end_time=start + duration, status='confirmed',
+            )
+            for index, duration in enumerate(durations)
+        ])
+
+    def test_parity_with_python_methods(self):
+        rng = random.Random(7)
+        durations = [timedelta(minutes=minutes) for minutes in range(0, 24 * 60, 3)]
+        # Середины между десятыми часа и соседние с ними значения
+        for step in range(1, 200, 2):
+            midpoint = timedelta(hours=step / 20)
+            durations += [midpoint, midpoint - timedelta(microseconds=1), midpoint + timedelta(microseconds=1)]
+        durations += [timedelta(microseconds=rng.randrange(10 ** 11)) for _ in range(2000)]
+        durations += [-duration for duration in durations[::7]]
+        self.create_bookings(durations)
+
+        bookings = list(Booking.objects.select_related('zone').with_price())
+        self.assertEqual(len(bookings), len(durations))
+        for booking in bookings:
+            self.assertEqual(booking.duration_hours, booking.get_duration_hours(), booking.end_time - booking.start_time)
+            self.assertEqual(booking.total_price, booking.get_total_price(), booking.end_time - booking.start_time)
+
+    def test_postgresql_sql(self):
+        """Для PostgreSQL собирается плоский запрос без функций SQLite"""
+        queryset = Booking.objects.with_price()
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            sql = str(queryset.query)
+        self.assertIn('EXTRACT(EPOCH FROM', sql)
+        self.assertIn('AS double precision', sql)
+        self.assertIn('CAST(TRUNC(', sql)
+        self.assertEqual(sql.count('SELECT'), 1)
+        for fragment in ('strftime', 'substr', 'REAL', 'django_', 'FLOOR'):
+            self.assertNotIn(fragment, sql)
+
+    def test_totals_in_one_query(self):
+        self.create_bookings([timedelta(minutes=minutes) for minutes in (15, 45, 90, 125)])
+        bookings = list(Booking.objects.select_related('zone'))
+
+        with self.assertNumQueries(1):
+            totals = Booking.objects.totals()
+        self.assertEqual(totals['bookings'], 4)
+        self.assertEqual(totals['revenue'], sum(booking.get_total_price() for booking in bookings))
+        self.assertAlmostEqual(totals['hours'], sum(booking.get_duration_hours() for booking in bookings))
+        self.assertEqual(Booking.objects.none().totals()['revenue'], 0)
+
+
+class DailyZoneStatsTest(TestCase):
+    def setUp(self):
+        self.day = timezone.localdate() - timedelta(days=3)
+        self.morning = timezone.make_aware(datetime.combine(self.day, datetime.min.time())) + timedelta(hours=10)
+        self.room = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=10)
+        self.hall = Zone.objects.create(title="Зал", description="", price_per_hour=300, capacity=10)
+
+    def book(self, zone, people, day_offset, hours, status='completed'):
+        start = self.morning + timedelta(days=day_offset)
+        return Booking.objects.create(
+            zone=zone, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="guest@example.com", number_of_people=people,
+            start_time=start, end_time=start + timedelta(hours=hours), status=status,
+        )
+
+    def stats(self):
+        return {
+            (row.zone_id, row.date): (row.bookings, row.cancelled, row.people_hours, row.revenue)
+            for row in DailyZoneStats.objects.all()
+        }
+
+    def test_rollup_and_incremental_refresh(self):
+        self.book(self.room, 2, 0, 1.5)
+        cancelled = self.book(self.room, 1, 0, 1, status='cancelled')
+        self.book(self.hall, 3, 1, 2)
+        refresh_daily_stats()
+        self.assertEqual(self.stats(), {
+            (self.room.id, self.day): (1, 1, 3.0, 750),
+            (self.hall.id, self.day + timedelta(days=1)): (1, 0, 6.0, 600),
+        })
+
+        since = timezone.now()
+        cancelled.status = 'confirmed'
+        cancelled.save()
+        self.assertEqual(touched_days(since), {(self.room.id, self.day)})
+        refresh_daily_stats()
+        self.assertEqual(self.stats()[(self.room.id, self.day)], (2, 0, 4.0, 1250))
+
+        cancelled.delete()
+        self.assertTrue(DailyZoneStats.objects.get(zone=self.room).stale)
+        refresh_daily_stats()
+        self.assertEqual(self.stats()[(self.room.id, self.day)], (1, 0, 3.0, 750))
+        self.assertFalse(DailyZoneStats.objects.filter(stale=True).exists())
+
+    def test_moved_booking_leaves_old_day_and_zone(self):
+        self.book(self.room, 1, 0, 1)
+        moved = self.book(self.room, 2, 0, 1)
+        refresh_daily_stats()
+        self.assertEqual(self.stats()[(self.room.id, self.day)], (2, 0, 3.0, 1000))
+
+        next_day = self.day + timedelta(days=1)
+        moved.start_time += timedelta(days=1)
+        moved.end_time += timedelta(days=1)
+        moved.save()
+        refresh_daily_stats()
+        self.assertEqual(self.stats()[(self.room.id, self.day)], (1, 0, 1.0, 500))
+        self.assertEqual(self.stats()[(self.room.id, next_day)], (1, 0, 2.0, 500))
+
+        moved.zone = self.hall
+        moved.save()
+        refresh_daily_stats()
+        self.assertNotIn((self.room.id, next_day), self.stats())
+        self.assertEqual(self.stats()[(self.hall.id, next_day)], (1, 0, 2.0, 300))
+        self.assertFalse(DailyZoneStats.objects.filter(stale=True).exists())
+
+    def test_admin_bulk_actions_are_picked_up(self):
+        self.book(self.room, 2, 0, 1)
+        call_command('rollup_daily_stats', stdout=StringIO())
+
+        since = timezone.now()
+        admin.site._registry[Booking]._update_status(Booking.objects.all(), 'cancelled')
+        self.assertEqual(touched_days(since), {(self.room.id, self.day)})
+        call_command('rollup_daily_stats', stdout=StringIO())
+        self.assertEqual(self.stats()[(self.room.id, self.day)], (0, 1, 0, 0))
+
+    def test_report_reads_only_rollup(self):
+        self.book(self.room, 2, 0, 1)
+        self.book(self.hall, 1, 1, 3)
+        self.book(self.hall, 1, 1, 1, status='cancelled')
+        refresh_daily_stats(full=True)
+
+        staff = User.objects.create_user('staff', password='password', is_staff=True)
+        self.client.force_login(staff)
+        params = {'start': self.day.isoformat(), 'end': (self.day + timedelta(days=1)).isoformat()}
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('daily_stats_api'), params).json()
+        self.assertFalse(any('main_booking' in query['sql'] for query in queries))
+        self.assertEqual(data['totals']['revenue'], 1400)
+        self.assertEqual(data['totals']['cancellation_rate'], round(1 / 3, 4))
+        self.assertEqual([day['bookings'] for day in data['days']], [1, 1])
+
+        response = self.client.get(reverse('admin:main_dailyzonestats_dashboard'), params)
+        self.assertContains(response, 'выручка: 1400 руб.')
+        staff.is_superuser = True
+        staff.save()
+        self.assertContains(self.client.get(reverse('admin:main_dailyzonestats_changelist')), 'Отчет за период')
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('daily_stats_api')).status_code, 302)
+
+
+class BookingExportTest(TestCase):
+    def setUp(self):
+        self.room = Zone.objects.create(title="Комната", description="", price_per_hour=450, capacity=10)
+        start = timezone.now().replace(microsecond=0)
+        self.bookings = [
+            Booking.objects.create(
+                zone=self.room, customer_name=f"Гость, №{number}", customer_phone="+70000000000",
+                customer_email="guest@example.com", number_of_people=1, start_time=start,
+                end_time=start + timedelta(minutes=45 * (number + 1)),
+                status='cancelled' if number == 2 else 'confirmed',
+            )
+            for number in range(3)
+        ]
+
+    def test_export_is_lazy(self):
+        with self.assertNumQueries(0):
+            lines = export_lines(Booking.objects.all(), 'jsonl')
+        with self.assertNumQueries(1):
+            first = json.loads(next(lines))
+        self.assertEqual(first['customer_name'], 'Гость, №0')
+
+    def test_admin_csv_action_streams_db_computed_columns(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        response = self.client.post(reverse('admin:main_booking_changelist'), {
+            'action': 'export_csv', '_selected_action': [booking.id for booking in self.bookings],
+        })
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 3)
+        for row, booking in zip(rows, self.bookings):
+            self.assertEqual(row['customer_name'], booking.customer_name)
+            self.assertEqual(row['duration_hours'], str(booking.get_duration_hours()))
+            self.assertEqual(int(row['total_price']), booking.get_total_price())
+
+    def test_csv_escapes_formulas_and_jsonl_keeps_values(self):
+        booking = self.bookings[0]
+        booking.customer_name = '=HYPERLINK("http://example.com","x")'
+        booking.save()
+        queryset = Booking.objects.filter(pk=booking.pk)
+
+        content = ''.join(export_lines(queryset, 'csv')).lstrip('\ufeff')
+        row = next(csv.DictReader(StringIO(content)))
+        self.assertEqual(row['customer_name'], '\'=HYPERLINK("http://example.com","x")')
+        self.assertEqual(row['customer_phone'], "'+70000000000")
+        self.assertEqual(row['customer_email'], 'guest@example.com')
+        # Импорт снимает экранирование, выгрузку можно загрузить обратно
+        _, imported = next(read_rows(StringIO(content), 'csv'))
+        self.assertEqual(imported['customer_name'], booking.customer_name)
+        self.assertEqual(imported['customer_phone'], '+70000000000')
+
+        row = json.loads(next(export_lines(queryset, 'jsonl')))
+        self.assertEqual(row['customer_name'], booking.customer_name)
+
+    def test_command_filters_and_writes_jsonl(self):
+        out = StringIO()
+        call_command('export_bookings', '--format', 'jsonl', '--status', 'confirmed', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [booking.id for booking in self.bookings[:2]])
+        self.assertEqual(rows[1]['total_price'], self.bookings[1].get_total_price())
+
+        for value in ('2026-02-30', 'вчера'):
+            with self.assertRaisesMessage(CommandError, f'Некорректная дата: {value}'):
+                call_command('export_bookings', '--from', value, stdout=StringIO())
+
+
+class BookingImportTest(TestCase):
+    def setUp(self):
+        self.room = Zone.objects.create(title="Переговорная", description="", price_per_hour=300, capacity=4)
+        self.start = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        Booking.objects.create(
+            zone=self.room, customer_name="Существующая", customer_phone="+70000000000",
+            customer_email="old@example.com", number_of_people=2, start_time=self.start,
+            end_time=self.start + timedelta(hours=2), status='confirmed',
+        )
+
+    def _csv(self, rows):
+        header = 'zone,customer_name,customer_phone,customer_email,number_of_people,start_time,end_time,status\n'
+        lines = []
+        for zone, people, offset, hours, status in rows:
+            start = self.start + timedelta(hours=offset)
+            end = start + timedelta(hours=hours)
+            lines.append(f'{zone},Гость,+70000000000,guest@example.com,{people},{start.isoformat()},{end.isoformat()},{status}')
+        return header + '\n'.join(lines) + '\n'
+
+    def test_capacity_checked_against_existing_and_earlier_rows(self):
+        data = self._csv([
+            ("Переговорная", 2, 1, 2, 'confirmed'),  # 2 + 2 = 4, помещается
+            ("Переговорная", 1, 1, 1, 'confirmed'),  # уже 4 занято
+            ("Переговорная", 3, 2, 1, 'cancelled'),  # отмененные места не занимают
+            ("Переговорная", 1, 3, 1, 'pending'),    # после существующей брони свободно 2
+            ("Нет такой", 1, 0, 1, 'confirmed'),
+            ("Переговорная", 9, 5, 1, 'confirmed'),
+        ])
+        result = import_bookings(read_rows(StringIO(data), 'csv'))
+
+        self.assertEqual(result.created, 3)
+        self.assertEqual([rejection['line'] for rejection in result.rejected], [3, 6, 7])
+        self.assertEqual(result.rejected[0]['reason'], 'Недостаточно свободных мест')
+        self.assertEqual(Booking.objects.count(), 4)
+        self.assertEqual(peak_occupancy(
+            Booking.objects.filter(zone=self.room).exclude(status='cancelled').values_list(
+                'start_time', 'end_time', 'number_of_people'),
+            self.start, self.start + timedelta(hours=4),
+        ), 4)
+
+        report = list(csv.DictReader(StringIO(result.report_lines())))
+        self.assertEqual(report[1]['reason'], 'Зона не найдена')
+
+    def test_dry_run_writes_nothing(self):
+        data = self._csv([("Переговорная", 1, 4, 1, 'confirmed')])
+        # Зоны и существующие брони; без логинов в файле пользователи не читаются
+        with self.assertNumQueries(2):
+            result = import_bookings(read_rows(StringIO(data), 'csv'), dry_run=True)
+        self.assertEqual((result.accepted, result.created), (1, 0))
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_jsonl_rows_with_wrong_value_types_are_rejected(self):
+        row = {
+            'zone': "Переговорная", 'customer_name': "Гость", 'customer_phone': '+70000000000',
+            'customer_email': 'guest@example.com', 'number_of_people': 1,
+            'start_time': (self.start + timedelta(hours=4)).isoformat(),
+            'end_time': (self.start + timedelta(hours=5)).isoformat(),
+        }
+        lines = [
+            json.dumps({**row, 'user': ['guest']}),
+            json.dumps({**row, 'user': {'username': 'guest'}}),
+            json.dumps({**row, 'zone': ["Переговорная"]}),
+            json.dumps({**row, 'customer_email': 123}),
+            json.dumps({**row, 'customer_phone': 70000000000}),
+            json.dumps({**row, 'number_of_people': True}),
+            json.dumps(row),
+            json.dumps({**row, 'number_of_people': 2, 'user': None}),
+        ]
+        result = import_bookings(read_rows(StringIO('\n'.join(lines)), 'jsonl'))
+        self.assertEqual(result.created, 2)
+        self.assertEqual([(rejection['line'], rejection['reason']) for rejection in result.rejected], [
+            (1, 'Некорректное значение поля user'),
+            (2, 'Некорректное значение поля user'),
+            (3, 'Некорректное значение поля zone'),
+            (4, 'Некорректное значение поля customer_email'),
+            (5, 'Некорректное значение поля customer_phone'),
+            (6, 'Некорректное значение поля number_of_people'),
+        ])
+
+    def test_import_refreshes_occupancy_buckets(self):
+        rebuild_occupancy()
+        data = self._csv([("Переговорная", 2, 0, 1, 'confirmed')])
+        import_bookings(read_rows(StringIO(data), 'csv'))
+        bucket = OccupancyBucket.objects.get(zone=self.room, hour=hour_floor(self.start))
+        self.assertEqual(bucket.peak_seats, 4)
+
+    def test_export_round_trip_through_command(self):
+        user = User.objects.create_user('guest', 'guest@example.com', 'password')
+        Booking.objects.filter(zone=self.room).update(user=user)
+        exported = StringIO()
+        call_command('export_bookings', '--format', 'jsonl', stdout=exported)
+        Booking.objects.all().delete()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bookings.jsonl')
+            with open(path, 'w', encoding='utf-8') as stream:
+                stream.write(exported.getvalue())
+            call_command('import_bookings', path, stdout=StringIO())
+
+        booking = Booking.objects.get()
+        self.assertEqual((booking.user, booking.number_of_people, booking.start_time), (user, 2, self.start))
+
+    def test_admin_upload(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        data = self._csv([("Переговорная", 3, 0, 1, 'confirmed'), ("Переговорная", 2, 4, 1, 'confirmed')])
+        response = self.client.post(reverse('admin:main_booking_import'), {
+            'file': SimpleUploadedFile('bookings.csv', data.encode('utf-8')), 'format': 'csv',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'].created, 1)
+        self.assertContains(response, 'Недостаточно свободных мест')
+
+
+class BookingHistoryPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('regular', 'regular@example.com', 'password')
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        self.room = Zone.objects.create(title="Зал", description="", price_per_hour=200, capacity=10)
+        start = timezone.now()
+        Booking.objects.bulk_create([
+            Booking(
+                zone=self.room, user=other if number % 10 == 0 else self.user, customer_name="Гость",
+                customer_phone="+70000000000", customer_email="regular@example.com", number_of_people=1,
+                start_time=start, end_time=start + timedelta(hours=1), status='completed',
+            )
+            for number in range(150)
+        ])
+        # Одинаковое время создания у соседних записей проверяет второй ключ курсора
+        for number, booking in enumerate(Booking.objects.order_by('id')):
+            Booking.objects.filter(id=booking.id).update(created_at=start - timedelta(minutes=number // 3))
+        self.expected = list(
+            Booking.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.client.force_login(self.user)
+
+    def test_api_walks_whole_history_with_constant_queries(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            # Сессия, пользователь и одна выборка страницы на любой глубине
+            with self.assertNumQueries(3):
+                data = self.client.get(reverse('booking_history_api'), params).json()
+            seen.extend(booking['id'] for booking in data['bookings'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, self.expected)
+        self.assertIn('detailsModal', data['html'])
+
+    def test_page_renders_first_page_and_cursor(self):
+        response = self.client.get(reverse('booking_history'))
+        self.assertEqual([booking.id for booking in response.context['bookings']], self.expected[:20])
+        self.assertContains(response, response.context['next_cursor'])
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse('booking_history_api'), {'cursor': 'не курсор'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('booking_history'), {'cursor': 'не курсор'})
+        self.assertEqual(len(response.context['bookings']), 20)
+
+    def test_api_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('booking_history_api')).status_code, 401)
+
+
+class ProfileSummaryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('visitor', 'visitor@example.com', 'password')
+        self.room = Zone.objects.create(title="Лаунж", description="", price_per_hour=300, capacity=10)
+        now = timezone.now()
+        self.past = self._book(now - timedelta(days=2), hours=2, status='completed')
+        self._book(now - timedelta(days=1), hours=3, status='cancelled')
+        self.upcoming = self._book(now + timedelta(hours=5), hours=1, status='confirmed')
+        self._book(now + timedelta(days=3), hours=1, status='pending')
+        self.client.force_login(self.user)
+
+    def _book(self, start, hours, status):
+        return Booking.objects.create(
+            zone=self.room, user=self.user, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="visitor@example.com", number_of_people=2, start_time=start,
+            end_time=start + timedelta(hours=hours), status=status,
+        )
+
+    def test_signup_creates_profile_eagerly(self):
+        self.client.logout()
+        self.client.post(reverse('register'), {
+            'username': 'newbie', 'email': 'newbie@example.com', 'first_name': 'Новый', 'last_name': 'Гость',
+            'phone': '+71234567890', 'password1': 'Sl0zhnyi-parol', 'password2': 'Sl0zhnyi-parol',
+        })
+        self.assertEqual(UserProfile.objects.get(user__username='newbie').phone, '+71234567890')
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
+
+    def test_summary_in_one_query(self):
+        with self.assertNumQueries(1):
+            summary = build_summary(self.user.id)
+        self.assertEqual(summary['total_bookings'], 4)
+        self.assertEqual(summary['hours'], 4.0)
+        self.assertEqual(summary['spent'], 1200)
+        self.assertEqual(summary['upcoming']['id'], self.upcoming.id)
+        self.assertEqual(summary['upcoming']['zone'], "Лаунж")
+        self.assertEqual(summary['upcoming']['start_time'], self.upcoming.start_time)
+        self.assertEqual(build_summary(User.objects.create_user('empty').id)['upcoming'], None)
+
+    def test_profile_get_reads_only_and_caches_summary(self):
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.context['summary']['total_bookings'], 4)
+        self.assertFalse([query for query in first.captured_queries
+                          if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))])
+        # Сессия, пользователь, профиль, последние бронирования и версия
+        # данных; сводка из кэша
+        with self.assertNumQueries(5):
+            self.client.get(reverse('profile'))
+
+    def test_cached_upcoming_becomes_active_after_start(self):
+        self.assertFalse(get_user_summary(self.user.id)['upcoming']['is_active_now'])
+        started = self.upcoming.start_time + timedelta(minutes=1)
+        # Только строка версии, сводка из кэша
+        with mock.patch('django.utils.timezone.now', return_value=started), self.assertNumQueries(1):
+            upcoming = get_user_summary(self.user.id)['upcoming']
+        self.assertEqual(upcoming['id'], self.upcoming.id)
+        self.assertTrue(upcoming['is_active_now'])
+
+    def test_summary_invalidated_on_booking_changes(self):
+        self.client.get(reverse('profile'))
+        self._book(timezone.now() + timedelta(hours=1), hours=1, status='pending')
+        summary = self.client.get(reverse('profile')).context['summary']
+        self.assertEqual(summary['total_bookings'], 5)
+        self.assertNotEqual(summary['upcoming']['id'], self.upcoming.id)
+
+        # Массовая отмена из админки
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        self.client.post(reverse('admin:main_booking_changelist'), {
+            'action': 'cancel_selected',
+            '_selected_action': list(Booking.objects.filter(user=self.user).values_list('id', flat=True)),
+        })
+        self.client.force_login(self.user)
+        summary = self.client.get(reverse('profile')).context['summary']
+        self.assertEqual((summary['spent'], summary['upcoming']), (0, None))
+
+    def test_summary_follows_database_version(self):
+        self.assertEqual(get_user_summary(self.user.id)['total_bookings'], 4)
+        # Бронь через другой процесс: кэш этого процесса не трогается,
+        # меняется только версия в БД
+        Booking.objects.bulk_create([Booking(
+            zone=self.room, user=self.user, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="visitor@example.com", number_of_people=1, start_time=self.past.start_time,
+            end_time=self.past.end_time, status='completed',
+        )])
+        self.assertEqual(get_user_summary(self.user.id)['total_bookings'], 4)
+        AvailabilityVersion.objects.update(version=F('version') + 1)
+        self.assertEqual(get_user_summary(self.user.id)['total_bookings'], 5)
+
+    def test_reassigned_booking_resets_previous_owner(self):
+        self.client.get(reverse('profile'))
+        booking = Booking.objects.get(id=self.past.id)
+        booking.user = User.objects.create_user('someone')
+        booking.save()
+        self.assertEqual(self.client.get(reverse('profile')).context['summary']['total_bookings'], 3)
+
+
+@override_settings(REQUEST_METRICS={'ENABLED': True, 'SLOW_MS': 0, 'BUFFER_SIZE': 5, 'FLUSH_SECONDS': 3600})
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        slow_requests.clear()
+        # Все запросы медленнее порога 0 мс и пишутся в лог
+        self.logs = self.enterContext(self.assertLogs('main', 'DEBUG'))
+        self.room = Zone.objects.create(title="Кабинет", description="", price_per_hour=250, capacity=4)
+        self.start = (timezone.localtime() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+
+    def _post(self, **overrides):
+        data = {
+            'zone': self.room.id, 'name': 'Гость', 'phone': '+70000000000', 'email': 'guest@example.com',
+            'number_of_people': 2, 'start_time': self.start.strftime('%Y-%m-%dT%H:%M'),
+            'end_time': (self.start + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M'),
+        }
+        data.update(overrides)
+        return self.client.post(reverse('booking'), data)
+
+    def test_booking_stages_and_queries_recorded(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertRedirects(self._post(), reverse('booking'), fetch_redirect_response=False)
+        entry = slow_requests.entries()[0]
+        self.assertEqual((entry['view'], entry['method'], entry['status']), ('booking', 'POST', 302))
+        self.assertEqual(list(entry['stages']), ['parse', 'validate', 'availability', 'insert'])
+        self.assertEqual(entry['queries'], len(queries))
+        record = self.logs.records[-1]
+        self.assertEqual((record.name, record.levelname), ('main.requests', 'WARNING'))
+        self.assertEqual(record.metrics, entry)
+
+    def test_ring_buffer_keeps_latest(self):
+        for _ in range(7):
+            self.client.get(reverse('home'))
+        self.client.get(reverse('zones'))
+        entries = slow_requests.entries()
+        self.assertEqual(len(entries), 5)
+        self.assertEqual(entries[0]['view'], 'zones')
+
+    def test_bad_input_is_rejected_without_catch_all(self):
+        for overrides in ({'zone': 'abc'}, {'start_time': '2030-13-45T10:00'}):
+            response = self._post(**overrides)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, 'Произошла ошибка')
+        self.assertFalse(Booking.objects.exists())
+
+    def test_admin_page(self):
+        self.client.get(reverse('home'))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.get(reverse('admin:main_booking_slow_requests'))
+        self.assertContains(response, 'GET /')
+        self.client.post(reverse('admin:main_booking_slow_requests'))
+        self.assertEqual(slow_requests.entries()[0]['method'], 'POST')
+
+
+class RequestMetricsDisabledTest(TestCase):
+    def test_no_overhead_when_disabled(self):
+        slow_requests.clear()
+        self.client.get(reverse('home'))
+        self.assertEqual(slow_requests.entries(), [])
+        self.assertIs(stage('parse'), stage('validate'))
+
+
+@override_settings(REQUEST_METRICS={'ENABLED': True, 'SLOW_MS': 10000, 'FLUSH_SECONDS': 0})
+class ViewProfilingTest(TestCase):
+    def setUp(self):
+        profiler.reset()
+        Zone.objects.create(title="Зона", description="", price_per_hour=100, capacity=5)
+
+    def test_histogram_percentiles(self):
+        histogram = [0] * (len(BUCKET_BOUNDS) + 1)
+        for value in range(1, 101):
+            histogram[bucket_index(value)] += 1
+        # Точность оценки - ширина корзины
+        for percent in (50, 90, 99):
+            self.assertAlmostEqual(histogram_percentile(histogram, percent, 100), percent, delta=percent * 0.25)
+        self.assertEqual(histogram_percentile(histogram, 100, 100), 100)
+        self.assertIsNone(histogram_percentile([0] * len(histogram), 50))
+
+    def test_requests_flushed_per_view_and_reported(self):
+        for _ in range(3):
+            self.client.get(reverse('zones'))
+        self.client.get(reverse('home'))
+        profile = ViewProfile.objects.get(view_name='zones')
+        self.assertEqual(profile.requests, 3)
+        self.assertEqual(sum(profile.latency_histogram), 3)
+        self.assertGreater(profile.queries, 0)
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        data = self.client.get(reverse('profiling_api'), {'sort': 'name'}).json()
+        views = {row['view']: row for row in data['views']}
+        self.assertEqual(views['zones']['requests'], 3)
+        self.assertLessEqual(views['zones']['p50_ms'], views['zones']['max_ms'])
+        self.assertEqual(self.client.get(reverse('profiling_api'), {'sort': 'x'}).status_code, 400)
+
+        out = StringIO()
+        call_command('view_percentiles', '--json', '--reset', stdout=out, stderr=StringIO())
+        self.assertIn('zones', [row['view'] for row in json.loads(out.getvalue())])
+        self.assertFalse(ViewProfile.objects.exists())
+
+    def test_flush_after_response(self):
+        middleware = RequestMetricsMiddleware(lambda request: HttpResponse())
+        # Ответ отдается без записи в БД, гистограммы уходят по request_finished
+        with self.assertNumQueries(0):
+            middleware(RequestFactory().get('/'))
+        self.assertFalse(ViewProfile.objects.exists())
+        # Как и тестовый клиент, не даем сигналу закрыть соединение теста
+        request_finished.disconnect(close_old_connections)
+        try:
+            request_finished.send(sender=self.__class__)
+        finally:
+            request_finished.connect(close_old_connections)
+        self.assertEqual(ViewProfile.objects.get().requests, 1)
+
+    @override_settings(REQUEST_METRICS={'ENABLED': True, 'SAMPLE_RATE': 0.0, 'FLUSH_SECONDS': 0})
+    def test_sampling(self):
+        self.client.get(reverse('zones'))
+        self.assertFalse(ViewProfile.objects.exists())
+
+
+class BenchmarkSuiteTest(TestCase):
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_dataset_respects_capacity_and_opening_hours(self):
+        spec = DatasetSpec(zones=2, users=10, bookings=400, days_back=7, days_ahead=7, seed=1, batch_size=100)
+        dataset = generate_dataset(spec)
+        self.assertEqual(Booking.objects.count(), dataset.bookings)
+        self.assertEqual(dataset.bookings + dataset.skipped, 400)
+        self.assertEqual(UserProfile.objects.filter(user_id__in=dataset.user_ids).count(), 10)
+
+        now = timezone.now()
+        bookings = list(Booking.objects.all())
+        self.assertTrue(all(booking.created_at <= now for booking in bookings))
+        self.assertTrue(all(booking.created_at <= booking.start_time for booking in bookings))
+        self.assertTrue(all(9 <= timezone.localtime(booking.start_time).hour < 23 for booking in bookings))
+        self.assertFalse(Booking.objects.filter(end_time__lte=now, status__in=['pending', 'confirmed']).exists())
+        for zone in dataset.zones:
+            intervals = Booking.objects.filter(zone=zone).exclude(status='cancelled').values_list(
+                'start_time', 'end_time', 'number_of_people'
+            )
+            self.assertLessEqual(peak_occupancy(intervals), zone.capacity)
+
+    def test_command_outputs_json_and_rolls_back(self):
+        out = StringIO()
+        call_command(
+            'run_benchmarks', '--zones', '2', '--users', '5', '--bookings', '200', '--days-back', '5',
+            '--days-ahead', '5', '--repeat', '2', '--warmup', '0', '--json', stdout=out, stderr=StringIO(),
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['results']), set(BENCHMARKS))
+        for result in report['results'].values():
+            self.assertEqual(result['iterations'], 2)
+            self.assertLessEqual(result['p50_ms'], result['max_ms'])
+        self.assertEqual(report['dataset']['zones'], 2)
+        self.assertIn('django', report['meta'])
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+        with self.assertRaises(CommandError):
+            call_command('run_benchmarks', '--only', 'missing.*', stdout=StringIO(), stderr=StringIO())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('guest', 'Guest@Example.com', 'Sl0zhnyi-parol')
+
+    def test_login_checks_password_once(self):
+        with mock.patch.object(User, 'check_password', autospec=True, side_effect=User.check_password) as check:
+            response = self.client.post(reverse('login'), {'username': 'guest', 'password': 'Sl0zhnyi-parol'})
+        self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+        self.assertEqual(check.call_count, 1)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.id)
+
+    def test_login_by_email_case_insensitive(self):
+        response = self.client.post(reverse('login'), {'username': 'guest@example.COM', 'password': 'Sl0zhnyi-parol'})
+        self.assertEqual(response.status_code, 302)
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate(username='GUEST@example.com', password='Sl0zhnyi-parol'), self.user)
+
+    def test_wrong_credentials(self):
+        response = self.client.post(reverse('login'), {'username': 'guest', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['error'], 'Неверное имя пользователя или пароль')
+        self.assertIsNone(authenticate(username='nobody@example.com', password='Sl0zhnyi-parol'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(authenticate(username='guest', password='Sl0zhnyi-parol'))
+
+    def test_username_wins_and_shared_email_is_ambiguous(self):
+        other = User.objects.create_user('guest@example.com', 'other@example.com', 'Drugoi-parol1')
+        self.assertEqual(authenticate(username='guest@example.com', password='Drugoi-parol1'), other)
+        User.objects.create_user('twin', 'guest@example.com', 'Sl0zhnyi-parol')
+        self.assertIsNone(authenticate(username='GUEST@example.com', password='Sl0zhnyi-parol'))
+
+    def test_registration_rejects_taken_email(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'newbie', 'email': 'GUEST@example.com', 'first_name': 'Новый', 'last_name': 'Гость',
+            'password1': 'Sl0zhnyi-parol', 'password2': 'Sl0zhnyi-parol',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('email', response.context['form'].errors)
+        self.assertFalse(User.objects.filter(username='newbie').exists())
+
+
+class StaticAssetsTest(TestCase):
+    def build(self):
+        """Собирает статику приложения во временный STATIC_ROOT хранилищем продакшена"""
+        root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(
+            STATIC_ROOT=root,
+            STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'main.assets.CompressedManifestStaticFilesStorage'}},
+        ))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(root, 'staticfiles.json')) as manifest:
+            return root, json.load(manifest)['paths']
+
+    def vendor_dir(self):
+        """Каталог статики, в который будто бы скачаны все сторонние библиотеки"""
+        root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        for name in VENDOR_FILES:
+            (root / name).parent.mkdir(parents=True, exist_ok=True)
+            (root / name).write_text('/* vendor */')
+        return root
+
+    def test_pages_have_no_inline_css_or_js(self):
+        self.enterContext(mock.patch('main.assets.VENDOR_DIR', self.vendor_dir()))
+        for name in ('home', 'zones', 'booking', 'contacts', 'login', 'register'):
+            content = self.client.get(reverse(name)).content.decode()
+            self.assertNotIn('<style>', content, name)
+            self.assertNotIn('<script>', content, name)
+            self.assertNotIn('cdn.jsdelivr.net', content, name)
+            self.assertIn('/static/vendor/bootstrap/css/bootstrap.min.css', content, name)
+        self.assertContains(self.client.get(reverse('booking')), 'data-stream-url="/api/availability/stream/"')
+
+    def test_build_hashes_and_compresses(self):
+        root, paths = self.build()
+        hashed = paths['main/css/base.css']
+        self.assertRegex(hashed, r'^main/css/base\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(root, hashed), 'rb') as original, gzip.open(os.path.join(root, hashed + '.gz')) as compressed:
+            self.assertEqual(compressed.read(), original.read())
+        # Уже сжатые форматы не пережимаются
+        self.assertFalse(os.path.exists(os.path.join(root, paths['main/img/main_photo.jpg'] + '.gz')))
+
+    def test_production_serving_and_cache_headers(self):
+        root, paths = self.build()
+        with override_settings(DEBUG=False):
+            client = Client()
+            url = '/static/' + paths['main/js/booking.js']
+            response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertTrue(response['Content-Type'].endswith('javascript'))
+            self.assertNotIn('Content-Disposition', response)
+
+            plain = client.get('/static/main/js/booking.js')
+            self.assertNotIn('Content-Encoding', plain)
+            self.assertEqual(plain['Cache-Control'], 'public, max-age=300')
+            self.assertEqual(
+                client.get('/static/main/js/booking.js', HTTP_IF_MODIFIED_SINCE=plain['Last-Modified']).status_code, 304,
+            )
+            self.assertEqual(client.get('/static/../manage.py').status_code, 404)
+
+    def test_missing_vendor_files_fall_back_to_cdn(self):
+        self.enterContext(mock.patch('main.assets.VENDOR_DIR', Path(self.enterContext(tempfile.TemporaryDirectory()))))
+        self.assertContains(self.client.get(reverse('login')), VENDOR_FILES['vendor/bootstrap/css/bootstrap.min.css'])
+        # Предупреждение только в check --deploy, а не при каждой команде и тестах
+        self.assertNotIn('main.W001', [message.id for message in run_checks()])
+        self.assertIn('main.W001', [message.id for message in run_checks(include_deployment_checks=True)])
+
+        # Сборка без скачанных библиотек: в манифесте их нет, страницы не падают
+        _, paths = self.build()
+        self.assertNotIn('vendor/bootstrap/css/bootstrap.min.css', paths)
+        with override_settings(DEBUG=False):
+            response = Client().get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, VENDOR_FILES['vendor/bootstrap/js/bootstrap.bundle.min.js'])
+        self.assertContains(response, '/static/' + paths['main/css/base.css'])
+
+    def test_pages_compressed_on_request(self):
+        response = self.client.get(reverse('zones'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('<html', gzip.decompress(response.content).decode())
+        self.assertNotIn('Content-Encoding', self.client.get(reverse('zones')))
+
+
+class AsyncAvailabilityApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.origin = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        self.room = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=4)
+        Booking.objects.create(
+            zone=self.room, customer_name="Гость", customer_phone="+70000000000",
+            customer_email="guest@example.com", number_of_people=3,
+            start_time=self.origin, end_time=self.origin + timedelta(hours=2), status='confirmed',
+        )
+        self.url = reverse('check_zone_availability', args=[self.room.id])
+        self.params = {
+            'start_time': self.origin.isoformat(),
+            'end_time': (self.origin + timedelta(hours=1)).isoformat(),
+            'number_of_people': 2,
+        }
+
+    async def test_async_seats_match_sync(self):
+        end = self.origin + timedelta(hours=1)
+        seats = await self.room.aget_available_seats_for_time(self.origin, end)
+        self.assertEqual(seats, 1)
+        peaks = await Zone.objects.filter(pk=self.room.pk).apeak_occupancy_map(self.origin, end)
+        self.assertEqual(peaks, {self.room.pk: 3})
+
+    async def test_async_client_gets_same_json_and_304(self):
+        client = AsyncClient()
+        first = await client.get(self.url, self.params)
+        self.assertEqual(first.json()['available_seats'], 1)
+        self.assertFalse(first.json()['available'])
+
+        second = await client.get(self.url, self.params, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        overview = await client.get(reverse('availability_api'))
+        self.assertEqual(overview.json()['zones'][0]['id'], self.room.id)
+        self.assertEqual(overview['Cache-Control'], 'no-cache')
+
+        missing = await client.get(reverse('check_zone_availability', args=[self.room.id + 100]), self.params)
+        self.assertEqual(missing.status_code, 404)
+        head = await client.head(self.url)
+        self.assertEqual(head['ETag'], (await client.get(self.url))['ETag'])
+
+
+class PollingBenchmarkTest(TransactionTestCase):
+    """Потоки нагрузки открывают свои соединения и видят только зафиксированные данные"""
+
+    def setUp(self):
+        cache.clear()
+        self.room = Zone.objects.create(title="Комната", description="", price_per_hour=500, capacity=4)
+
+    def test_polling_benchmark_drives_both_handlers(self):
+        targets = polling_targets([self.room.id])
+        self.assertEqual(len(targets), 1)
+        # Опрашивается только общий API: снимок уже в кэше, и потоки
+        # нагрузки читают только строку версии
+        self.client.get(reverse('availability_api'))
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            for mode in ('wsgi', 'asgi'):
+                result = run_polling(mode, [targets[0][:1]], clients=3, seconds=0.2, warmup=0.05)
+                self.assertEqual(result['errors'], 0)
+                self.assertGreater(result['requests'], 3)
+                self.assertGreater(result['not_modified'], 0)
+        with self.assertRaises(ValueError):
+            run_polling('cgi', targets, clients=1, seconds=0)
+
+
+class SqliteProfileTest(TransactionTestCase):
+    def test_retry_on_lock_repeats_only_lock_errors(self):
+        calls = []
+
+        @retry_on_lock(attempts=3, delay=0)
+        def write(error=None):
+            calls.append(error)
+            if error and len(calls) < 3:
+                raise error
+            return len(calls)
+
+        with self.assertLogs('main.sqlite', 'WARNING') as logs:
+            self.assertEqual(write(OperationalError('database is locked')), 3)
+        self.assertEqual(len(logs.records), 2)
+
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            write(OperationalError('no such table: main_zone'))
+        self.assertEqual(len(calls), 1)
+
+        # Внутри внешней транзакции повтор невозможен
+        calls.clear()
+        with transaction.atomic(), self.assertRaises(OperationalError):
+            write(OperationalError('database is locked'))
+        self.assertEqual(len(calls), 1)
+
+        # Время на повторы ограничено, даже если попытки еще остались
+        calls.clear()
+        limited = retry_on_lock(attempts=5, delay=0.2, budget=0.1)(write.__wrapped__)
+        with self.assertRaises(OperationalError):
+            limited(OperationalError('database is locked'))
+        self.assertEqual(len(calls), 1)
+
+        self.assertTrue(is_lock_error(OperationalError('database is locked')))
+        self.assertFalse(is_lock_error(ValueError('database is locked')))
+
+    def test_production_profile_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = connections['default'].__class__(
+                {**connection.settings_dict, **settings.SQLITE_PRODUCTION, 'NAME': os.path.join(directory, 'db.sqlite3')},
+                alias='sqlite_profile',
+            )
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)
+                    cursor.execute('PRAGMA cache_size')
+                    self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['cache_size'])
+                self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+            finally:
+                wrapper.close()
@@ -7,6 +7,14 @@ urlpatterns = [
     path('booking/', views.booking, name='booking'),
     path('contacts/', views.contacts, name='contacts'),
     path('api/availability/', views.check_availability_api, name='availability_api'),
+    path('api/availability/stream/', views.availability_stream, name='availability_stream'),
+    path('api/free_slots/', views.free_slots_api, name='free_slots_api'),
+    path('api/occupancy/', views.occupancy_api, name='occupancy_api'),
+    path('api/stats/daily/', views.daily_stats_api, name='daily_stats_api'),
+    path('api/profiling/', views.profiling_api, name='profiling_api'),
+    path('api/check_zone_availability/', views.check_zone_availability, name='check_zone_availability'),
+    path('api/check_zone_availability/batch/', views.check_zones_availability_batch, name='check_zones_availability_batch'),
+    path('api/check_zone_availability/<int:zone_id>/', views.check_zone_availability, name='check_zone_availability'),
     path('debug/time/', views.debug_time_info, name='debug_time'),
     
     path('register/', views.register_view, name='register'),
@@ -14,4 +22,5 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
     path('profile/history/', views.booking_history_view, name='booking_history'),
+    path('api/booking_history/', views.booking_history_api, name='booking_history_api'),
 ]
\ No newline at end of file
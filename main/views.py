@@ -1,16 +1,43 @@
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib import messages
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
-from django.http import JsonResponse
-from django.contrib.auth import login, authenticate, logout
+from django.utils.dateparse import parse_date, parse_datetime
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from django.views.decorators.http import condition, require_safe
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.models import User
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, ContactForm
 from .models import Zone, Booking, UserProfile, ContactMessage
+from .snapshot import get_availability_snapshot, get_version, aget_availability_snapshot, aget_version
+from .reservations import reserve_booking, CapacityExceeded
+from .sqlite import is_lock_error
+from .slots import find_free_slots
+from .occupancy import hourly_occupancy
+from .history import history_page
+from .summary import get_user_summary
+from .instrumentation import get_config as get_metrics_config, stage
+from .profiling import PROFILING_SORTS, profiler, profiles_report
+from .stats import parse_period, stats_report
+from .streaming import broadcaster, format_event
 from django.core.mail import send_mail
+from django.db import DatabaseError, OperationalError
 from django.conf import settings
-from datetime import timedelta
+from datetime import datetime, timedelta
+from functools import wraps
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Максимум проверок в одном пакетном запросе
+MAX_BATCH_CHECKS = 20
 
 def register_view(request):
     if request.user.is_authenticated:
@@ -40,18 +67,15 @@ def login_view(request):
     error = None
     if request.method == 'POST':
         form = CustomAuthenticationForm(request, data=request.POST)
+        # Форма уже проверила пароль через authenticate(), повторная
+        # проверка удвоила бы время входа
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Добро пожаловать, {user.username}!')
-                
-                next_page = request.GET.get('next', 'profile')
-                return redirect(next_page)
-            else:
-                error = 'Неверное имя пользователя или пароль'
+            user = form.get_user()
+            login(request, user)
+            messages.success(request, f'Добро пожаловать, {user.username}!')
+            
+            next_page = request.GET.get('next', 'profile')
+            return redirect(next_page)
         else:
             error = 'Неверное имя пользователя или пароль'
     else:
@@ -73,26 +97,26 @@ def logout_view(request):
 
 @login_required
 def profile_view(request):
-    # Получаем или создаем профиль пользователя
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
-    
-    bookings = Booking.objects.filter(user=request.user).order_by('-created_at')
-    
-    recent_bookings = bookings[:5]
-    
     if request.method == 'POST':
         phone = request.POST.get('phone')
         if phone:
+            profile, created = UserProfile.objects.get_or_create(user=request.user)
             profile.phone = phone
             profile.save()
             messages.success(request, 'Профиль успешно обновлен.')
         return redirect('profile')
     
+    # Профиль создается при регистрации, GET-запрос ничего не записывает
+    profile = UserProfile.objects.filter(user=request.user).first() or UserProfile(user=request.user)
+    recent_bookings = Booking.objects.filter(user=request.user).select_related('zone').order_by('-created_at', '-id')[:5]
+    summary = get_user_summary(request.user.id)
+    
     context = {
         'title': 'Личный кабинет',
         'profile': profile,
         'bookings': recent_bookings,
-        'total_bookings': bookings.count(),
+        'summary': summary,
+        'total_bookings': summary['total_bookings'],
         'user': request.user
     }
     return render(request, 'main/profile.html', context)
@@ -100,16 +124,49 @@ def profile_view(request):
 
 @login_required
 def booking_history_view(request):
-    bookings = Booking.objects.filter(user=request.user).order_by('-created_at')
+    # Первая страница; следующие подгружаются через booking_history_api
+    try:
+        bookings, next_cursor = history_page(request.user, request.GET.get('cursor'))
+    except ValueError:
+        bookings, next_cursor = history_page(request.user)
     
     context = {
         'title': 'История бронирований',
         'bookings': bookings,
+        'next_cursor': next_cursor,
         'user': request.user
     }
     return render(request, 'main/booking_history.html', context)
 
 
+@require_safe
+def booking_history_api(request):
+    """API следующей страницы истории для бесконечной прокрутки"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Требуется авторизация'}, status=401)
+    try:
+        bookings, next_cursor = history_page(request.user, request.GET.get('cursor'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'bookings': [{
+            'id': booking.id,
+            'zone': booking.zone.title,
+            'start_time': timezone.localtime(booking.start_time).isoformat(),
+            'end_time': timezone.localtime(booking.end_time).isoformat(),
+            'status': booking.status,
+            'status_display': booking.get_status_display(),
+            'duration_hours': booking.get_duration_hours(),
+            'total_price': booking.get_total_price(),
+            'created_at': timezone.localtime(booking.created_at).isoformat(),
+        } for booking in bookings],
+        'html': render_to_string('main/booking_history_items.html', {'bookings': bookings}, request),
+        'next_cursor': next_cursor,
+        'success': True
+    })
+
+
 def home(request):
     context = {
         'title': 'Главная'
@@ -118,12 +175,11 @@ def home(request):
 
 
 def zones(request):
-    zones_list = Zone.objects.all()
+    # Свободные места для всех зон считаются одним запросом
+    zones_list = Zone.objects.with_available_seats()
     
-    # Добавляем информацию о доступных местах для каждой зоны
     for zone in zones_list:
-        zone.available_seats = zone.get_available_seats()
-        zone.availability_status = zone.get_availability_status()
+        zone.availability_status = zone.get_availability_status(zone.available_seats)
     
     context = {
         'title': 'Наши зоны',
@@ -132,185 +188,119 @@ def zones(request):
     return render(request, 'main/zones.html', context)
 
 
-def booking(request):
-    zones_list = Zone.objects.all()
-    
-    if request.method == 'POST':
-        try:
-            print("Получен POST запрос на бронирование")
-            
-            # Получаем данные из формы
-            zone_id = request.POST.get('zone')
-            customer_name = request.POST.get('name')
-            customer_phone = request.POST.get('phone')
-            customer_email = request.POST.get('email')
-            number_of_people = request.POST.get('number_of_people', 1)
-            start_time = request.POST.get('start_time')
-            end_time = request.POST.get('end_time')
-            
-            print(f"Данные формы: zone_id={zone_id}, name={customer_name}, people={number_of_people}")
-            
-            # Проверяем, что все поля заполнены
-            if not all([zone_id, customer_name, customer_phone, customer_email, start_time, end_time]):
-                messages.error(request, 'Пожалуйста, заполните все поля формы.')
-                print("Ошибка: не все поля заполнены")
-                return render(request, 'main/booking.html', {
-                    'title': 'Бронирование',
-                    'zones': zones_list,
-                    'current_time': timezone.now().strftime('%Y-%m-%dT%H:%M')
-                })
-            
-            # Проверяем количество человек
-            try:
-                number_of_people = int(number_of_people)
-                if number_of_people < 1:
-                    messages.error(request, 'Количество человек должно быть не менее 1.')
-                    return render(request, 'main/booking.html', {
-                        'title': 'Бронирование',
-                        'zones': zones_list,
-                        'current_time': timezone.now().strftime('%Y-%m-%dT%H:%M')
-                    })
-            except (ValueError, TypeError):
-                number_of_people = 1
-            
-            # Получаем объект зоны
-            try:
-                zone = Zone.objects.get(id=zone_id)
-                print(f"Найдена зона: {zone.title}, вместимость: {zone.capacity}")
-                
-                # Проверяем, что количество человек не превышает вместимость зоны
-                if number_of_people > zone.capacity:
-                    messages.error(request, f'Выбрано {number_of_people} человек, но максимальная вместимость зоны "{zone.title}" - {zone.capacity} человек.')
-                    return render(request, 'main/booking.html', {
-                        'title': 'Бронирование',
-                        'zones': zones_list,
-                        'current_time': timezone.now().strftime('%Y-%m-%dT%H:%M')
-                    })
-                    
-            except Zone.DoesNotExist:
-                messages.error(request, 'Выбранная зона не найдена.')
-                print(f"Ошибка: зона с ID {zone_id} не найдена")
-                return render(request, 'main/booking.html', {
-                    'title': 'Бронирование',
-                    'zones': zones_list,
-                    'current_time': timezone.now().strftime('%Y-%m-%dT%H:%M')
-                })
-            
-            # Конвертируем строки в datetime
-            start_datetime = parse_datetime(start_time)
-            end_datetime = parse_datetime(end_time)
-            
-            if not start_datetime or not end_datetime:
-                messages.error(request, 'Некорректный формат даты и времени.')
-                print(f"Ошибка: некорректный формат времени start={start_time}, end={end_time}")
-                return render(request, 'main/booking.html', {
-                    'title': 'Бронирование',
-                    'zones': zones_list,
-                    'current_time': timezone.now().strftime('%Y-%m-%dT%H:%M')
-                })
-            
-            print(f"Даты преобразованы: start={start_datetime}, end={end_datetime}")
-            
-            # Преобразуем naive datetime в aware
-            current_tz = timezone.get_current_timezone()
-            
-            if timezone.is_naive(start_datetime):
-                start_datetime = timezone.make_aware(start_datetime, current_tz)
-            if timezone.is_naive(end_datetime):
-                end_datetime = timezone.make_aware(end_datetime, current_tz)
-            
-            print(f"Даты с часовым поясом: start={start_datetime}, end={end_datetime}")
-            
-            # Теперь проверяем, что время начала не в прошлом
-            if start_datetime < timezone.now():
-                messages.error(request, 'Время начала не может быть в прошлом.')
-                print(f"Ошибка: время начала в прошлом start={start_datetime}, now={timezone.now()}")
-                return render(request, 'main/booking.html', {
-                    'title': 'Бронирование',
-                    'zones': zones_list,
-                    'current_time': timezone.now().strftime('%Y-%m-%dT%H:%M')
-                })
-            
-            # Проверяем, что время окончания позже времени начала
-            if end_datetime <= start_datetime:
-                messages.error(request, 'Время окончания должно быть позже времени начала.')
-                print(f"Ошибка: время окончания раньше времени начала end={end_datetime}, start={start_datetime}")
-                return render(request, 'main/booking.html', {
-                    'title': 'Бронирование',
-                    'zones': zones_list,
-                    'current_time': timezone.now().strftime('%Y-%m-%dT%H:%M')
-                })
-            
-            # Проверяем минимальное время бронирования (1 час)
-            time_diff = (end_datetime - start_datetime).total_seconds() / 3600
-            if time_diff < 1:
-                messages.error(request, 'Минимальное время бронирования - 1 час.')
-                print(f"Ошибка: время бронирования меньше 1 часа diff={time_diff}")
-                return render(request, 'main/booking.html', {
-                    'title': 'Бронирование',
-                    'zones': zones_list,
-                    'current_time': timezone.now().strftime('%Y-%m-%dT%H:%M')
-                })
-            
-            # Проверяем доступность зоны на указанное время для указанного количества человек
-            if not zone.is_available_for_time(start_datetime, end_datetime, number_of_people):
-                messages.error(request, f'На выбранное время "{start_datetime.strftime("%d.%m.%Y %H:%M")}" в зоне "{zone.title}" недостаточно свободных мест для {number_of_people} человек.')
-                print(f"Ошибка: зона недоступна для {number_of_people} человек на выбранное время")
-                return render(request, 'main/booking.html', {
-                    'title': 'Бронирование',
-                    'zones': zones_list,
-                    'current_time': timezone.now().strftime('%Y-%m-%dT%H:%M')
-                })
-            
-            # Создаем бронирование
-            booking_obj = Booking.objects.create(
-                zone=zone,
-                customer_name=customer_name,
-                customer_phone=customer_phone,
-                customer_email=customer_email,
-                number_of_people=number_of_people,
-                start_time=start_datetime,
-                end_time=end_datetime,
-                status='confirmed'
-            )
-            
-            print(f"Бронирование создано: ID={booking_obj.id}, человек: {number_of_people}")
-            
-            # Если пользователь авторизован, привязываем бронирование к нему
-            if request.user.is_authenticated:
-                booking_obj.user = request.user
-                booking_obj.save()
-                print(f"Бронирование привязано к пользователю: {request.user.username}")
-            
-            messages.success(request, 
-                f'Бронирование успешно создано!<br>'
-                f'<strong>Детали:</strong><br>'
-                f'- Зона: {zone.title}<br>'
-                f'- Количество человек: {number_of_people}<br>'
-                f'- Время: {start_datetime.strftime("%d.%m.%Y %H:%M")} - {end_datetime.strftime("%H:%M")}<br>'
-                f'- Стоимость: {booking_obj.get_total_price()} руб.<br>'
-                f'<br>Бронирование подтверждено автоматически.'
-            )
-            
-            print("Бронирование успешно завершено, редирект на страницу бронирования")
-            return redirect('booking')
-            
-        except Exception as e:
-            messages.error(request, f'Произошла ошибка при бронировании: {str(e)}')
-            print(f"Критическая ошибка: {str(e)}")
-    
-    # Добавляем информацию о доступных местах
-    for zone in zones_list:
-        zone.available_seats = zone.get_available_seats()
-    
+def _booking_page(request):
+    """Страница бронирования со свободными местами на текущий момент"""
     context = {
         'title': 'Бронирование',
-        'zones': zones_list,
+        'zones': Zone.objects.with_available_seats(),
         'current_time': timezone.now().strftime('%Y-%m-%dT%H:%M')
     }
     return render(request, 'main/booking.html', context)
 
 
+def _parse_form_datetime(value):
+    """Время из формы с учетом часового пояса или None"""
+    try:
+        parsed = parse_datetime(value or '')
+    except ValueError:
+        return None
+    if parsed and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
+    return parsed
+
+
+def booking(request):
+    if request.method != 'POST':
+        return _booking_page(request)
+    
+    def reject(message):
+        messages.error(request, message)
+        logger.debug('Бронирование отклонено: %s', message)
+        return _booking_page(request)
+    
+    with stage('parse'):
+        zone_id = request.POST.get('zone')
+        customer_name = request.POST.get('name')
+        customer_phone = request.POST.get('phone')
+        customer_email = request.POST.get('email')
+        number_of_people = request.POST.get('number_of_people', 1)
+        start_time = request.POST.get('start_time')
+        end_time = request.POST.get('end_time')
+        
+        try:
+            number_of_people = int(number_of_people)
+        except (ValueError, TypeError):
+            number_of_people = 1
+        start_datetime = _parse_form_datetime(start_time)
+        end_datetime = _parse_form_datetime(end_time)
+    
+    with stage('validate'):
+        # Проверяем, что все поля заполнены
+        if not all([zone_id, customer_name, customer_phone, customer_email, start_time, end_time]):
+            return reject('Пожалуйста, заполните все поля формы.')
+        
+        if number_of_people < 1:
+            return reject('Количество человек должно быть не менее 1.')
+        
+        try:
+            zone = Zone.objects.get(id=zone_id)
+        except (Zone.DoesNotExist, ValueError):
+            return reject('Выбранная зона не найдена.')
+        
+        # Проверяем, что количество человек не превышает вместимость зоны
+        if number_of_people > zone.capacity:
+            return reject(f'Выбрано {number_of_people} человек, но максимальная вместимость зоны "{zone.title}" - {zone.capacity} человек.')
+        
+        if not start_datetime or not end_datetime:
+            return reject('Некорректный формат даты и времени.')
+        
+        if start_datetime < timezone.now():
+            return reject('Время начала не может быть в прошлом.')
+        
+        if end_datetime <= start_datetime:
+            return reject('Время окончания должно быть позже времени начала.')
+        
+        # Минимальное время бронирования - 1 час
+        if end_datetime - start_datetime < timedelta(hours=1):
+            return reject('Минимальное время бронирования - 1 час.')
+    
+    # Проверяем доступность и создаем бронирование в одной транзакции
+    # (этапы availability и insert замеряются внутри reserve_booking)
+    try:
+        booking_obj = reserve_booking(
+            zone.id,
+            start_time=start_datetime,
+            end_time=end_datetime,
+            number_of_people=number_of_people,
+            customer_name=customer_name,
+            customer_phone=customer_phone,
+            customer_email=customer_email,
+            user=request.user if request.user.is_authenticated else None,
+        )
+    except CapacityExceeded as e:
+        return reject(str(e))
+    except Zone.DoesNotExist:
+        return reject('Выбранная зона не найдена.')
+    except OperationalError as e:
+        # Все повторы reserve_booking не дождались освобождения базы
+        if not is_lock_error(e):
+            raise
+        return reject('Сейчас слишком много одновременных бронирований, попробуйте еще раз.')
+    
+    logger.info('Бронирование создано: id=%s, зона=%s, человек=%s', booking_obj.id, zone.id, number_of_people)
+    
+    messages.success(request, 
+        f'Бронирование успешно создано!<br>'
+        f'<strong>Детали:</strong><br>'
+        f'- Зона: {zone.title}<br>'
+        f'- Количество человек: {number_of_people}<br>'
+        f'- Время: {start_datetime.strftime("%d.%m.%Y %H:%M")} - {end_datetime.strftime("%H:%M")}<br>'
+        f'- Стоимость: {booking_obj.get_total_price()} руб.<br>'
+        f'<br>Бронирование подтверждено автоматически.'
+    )
+    return redirect('booking')
+
+
 def contacts(request):
     if request.method == 'POST' and 'contact_name' in request.POST:
         form_data = {
@@ -361,93 +351,381 @@ def contacts(request):
     return render(request, 'main/contacts.html', context)
 
 
-# API для проверки доступности
-def check_availability_api(request):
+def async_condition(etag_func):
+    """
+    @condition для async-представлений. Встроенный декоратор вызывает
+    etag_func синхронно, а здесь ETag читает кэш и БД через await.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            etag = quote_etag(await etag_func(request, *args, **kwargs))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
+
+
+# API для проверки доступности. Представления асинхронные, чтобы под ASGI
+# их можно было отдавать вместе с потоком /api/availability/stream/ без
+# отдельного WSGI-сервера. Быстрее под ASGI они не становятся: каждое
+# чтение кэша и БД все равно уходит в поток sync_to_async. По замеру
+# benchmark_asgi WSGI (там они выполняются через async_to_sync) дает
+# около 400 запросов/с против 160-180 у ASGI, а памяти на соединение
+# ASGI не экономит. ASGI нужен только долгим соединениям потока
+async def request_version(request):
+    """Версия данных о доступности, прочитанная из БД один раз за запрос"""
+    if not hasattr(request, '_availability_version'):
+        request._availability_version = await aget_version()
+    return request._availability_version
+
+
+async def request_snapshot(request):
+    """
+    Снимок доступности, прочитанный один раз за запрос: ETag и само
+    представление берут его из кэша, а каждое чтение кэша из async-кода -
+    это переход в поток.
+    """
+    if not hasattr(request, '_availability_snapshot'):
+        request._availability_snapshot = await aget_availability_snapshot(await request_version(request))
+    return request._availability_snapshot
+
+
+async def availability_etag(request):
+    return (await request_snapshot(request))['etag']
+
+
+@async_condition(availability_etag)
+async def check_availability_api(request):
     """API для проверки доступности всех зон на текущий момент"""
-    zones_data = []
-    for zone in Zone.objects.all():
-        available_seats = zone.get_available_seats()  
+    snapshot = await request_snapshot(request)
+    response = JsonResponse(snapshot['payload'])
+    # Браузер обязан перепроверять ответ, неизмененный снимок вернется как 304
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+async def availability_stream(request):
+    """Поток изменений загрузки зон (Server-Sent Events)"""
+    if not isinstance(request, ASGIRequest):
+        # Под WSGI бесконечный ответ занял бы рабочий поток целиком.
+        # Отдаем одно сообщение и просим браузер переподключиться через
+        # 30 секунд - это эквивалентно прежнему опросу.
+        snapshot = await sync_to_async(get_availability_snapshot)()
+        body = 'retry: 30000\n\n' + format_event('occupancy', snapshot['payload'])
+        response = HttpResponse(body, content_type='text/event-stream')
+    else:
+        response = StreamingHttpResponse(broadcaster.events(), content_type='text/event-stream')
+        response['X-Accel-Buffering'] = 'no'
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _current_load_requested(request):
+    """Запрошена загрузка на текущий момент: она меняется и без новых бронирований"""
+    return not (request.GET.get('start_time') and request.GET.get('end_time')) and 'check' not in request.GET
+
+
+def zone_availability_etag(request, zone_id=None):
+    """
+    ETag проверки доступности. Зависит только от версии данных о
+    бронированиях (строка в БД, общая для всех процессов) и параметров
+    запроса, поэтому бронирования для него не читаются.
+    """
+    version = get_version()
+    key = f'{version}:{request.get_full_path()}'
+    if _current_load_requested(request):
+        key += ':' + get_availability_snapshot(version)['etag']
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+async def azone_availability_etag(request, zone_id=None):
+    """Асинхронная версия zone_availability_etag()"""
+    key = f'{await request_version(request)}:{request.get_full_path()}'
+    if _current_load_requested(request):
+        key += ':' + (await request_snapshot(request))['etag']
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def parse_aware_datetime(value):
+    """
+    Разбирает дату из запроса и приводит ее к текущему часовому поясу.
+    Для некорректной даты, в том числе несуществующей (2026-02-30), - None
+    """
+    try:
+        parsed = parse_datetime(value) if value else None
+    except ValueError:
+        return None
+    if parsed and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
+    return parsed
+
+
+@require_safe
+@async_condition(azone_availability_etag)
+async def check_zone_availability(request, zone_id=None):
+    if request.method == 'HEAD':
+        # Для HEAD достаточно ETag: клиент узнает, изменилось ли что-то,
+        # не запуская проверку в БД
+        return HttpResponse()
+
+    zone_id = request.GET.get('zone_id', zone_id)
+    start_time_str = request.GET.get('start_time')
+    end_time_str = request.GET.get('end_time')
+    try:
+        number_of_people = int(request.GET.get('number_of_people', 1))
+        zone_id = int(zone_id) if zone_id else None
+    except ValueError:
+        return JsonResponse({'error': 'Некорректные параметры запроса'}, status=400)
+    
+    if not zone_id:
+        return JsonResponse({'error': 'Не указан ID зоны'}, status=400)
+    
+    if start_time_str and end_time_str:
+        # Проверяем доступность на конкретный интервал времени
+        start_time = parse_aware_datetime(start_time_str)
+        end_time = parse_aware_datetime(end_time_str)
         
-        zones_data.append({
-            'id': zone.id,
-            'title': zone.title,
+        if not start_time or not end_time:
+            return JsonResponse({'error': 'Некорректный формат времени'}, status=400)
+        
+        try:
+            zone = await Zone.objects.aget(id=zone_id)
+        except Zone.DoesNotExist:
+            return JsonResponse({'error': 'Зона не найдена'}, status=404)
+        
+        available_seats = await zone.aget_available_seats_for_time(start_time, end_time)
+        is_available = available_seats >= number_of_people
+        
+        response = JsonResponse({
+            'zone_id': zone.id,
+            'zone_name': zone.title,
+            'available': is_available,
+            'available_seats': available_seats,
+            'requested_people': number_of_people,
             'capacity': zone.capacity,
+            'status': 'available' if is_available else 'booked',
+            'message': f'Доступно {available_seats} мест' if is_available else f'Недостаточно мест. Доступно только {available_seats}',
+            'requested_start': start_time_str,
+            'requested_end': end_time_str,
+            'timestamp': timezone.now().isoformat()
+        })
+    else:
+        # Загрузка на текущий момент берется из кэшированного снимка
+        snapshot = await request_snapshot(request)
+        zone = next((zone for zone in snapshot['payload']['zones'] if zone['id'] == zone_id), None)
+        if zone is None:
+            return JsonResponse({'error': 'Зона не найдена'}, status=404)
+        
+        available_seats = zone['available_seats']
+        response = JsonResponse({
+            'zone_id': zone['id'],
+            'zone_name': zone['title'],
             'available_seats': available_seats,
-            'status': zone.get_availability_status(),
-            'is_available': available_seats > 0,
-            'updated_at': timezone.now().isoformat()
+            'capacity': zone['capacity'],
+            'status': zone['status'],
+            'message': 'Занято' if available_seats == 0 else f'Свободно {available_seats} из {zone["capacity"]} мест',
+            'current_time': timezone.now().isoformat(),
+            'timestamp': timezone.now().isoformat()
         })
     
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@require_safe
+@condition(etag_func=zone_availability_etag)
+def check_zones_availability_batch(request):
+    """
+    Пакетная проверка нескольких зон и интервалов одним запросом к БД.
+
+    Каждая проверка передается параметром check=<id зоны>,<начало>,<конец>[,<человек>].
+    """
+    if request.method == 'HEAD':
+        return HttpResponse()
+
+    raw_checks = request.GET.getlist('check')
+    if not raw_checks or len(raw_checks) > MAX_BATCH_CHECKS:
+        return JsonResponse({'error': f'Укажите от 1 до {MAX_BATCH_CHECKS} проверок'}, status=400)
+
+    checks = []
+    for raw_check in raw_checks:
+        parts = raw_check.split(',')
+        try:
+            zone_id = int(parts[0])
+            number_of_people = int(parts[3]) if len(parts) > 3 else 1
+        except (ValueError, IndexError):
+            return JsonResponse({'error': f'Некорректная проверка: {raw_check}'}, status=400)
+        start_time = parse_aware_datetime(parts[1]) if len(parts) > 2 else None
+        end_time = parse_aware_datetime(parts[2]) if len(parts) > 2 else None
+        if not start_time or not end_time or end_time <= start_time:
+            return JsonResponse({'error': f'Некорректный интервал: {raw_check}'}, status=400)
+        checks.append((zone_id, start_time, end_time, number_of_people))
+
+    available = Zone.objects.available_seats_for_intervals(
+        [(zone_id, start_time, end_time) for zone_id, start_time, end_time, _ in checks]
+    )
+
+    results = []
+    for (zone_id, start_time, end_time, number_of_people), available_seats in zip(checks, available):
+        results.append({
+            'zone_id': zone_id,
+            'requested_start': start_time.isoformat(),
+            'requested_end': end_time.isoformat(),
+            'requested_people': number_of_people,
+            'found': available_seats is not None,
+            'available_seats': available_seats,
+            'available': available_seats is not None and available_seats >= number_of_people,
+        })
+
+    response = JsonResponse({
+        'results': results,
+        'timestamp': timezone.now().isoformat(),
+        'success': True
+    })
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def free_slots_api(request):
+    """API поиска ближайших свободных окон для бронирования"""
+    try:
+        zone_ids = [int(zone_id) for zone_id in request.GET.getlist('zone')]
+        party_size = int(request.GET.get('number_of_people', 1))
+        duration = timedelta(minutes=int(request.GET.get('duration', 60)))
+        horizon = timedelta(days=int(request.GET.get('days', 7)))
+        step = timedelta(minutes=int(request.GET.get('step', 30)))
+        limit = int(request.GET.get('limit', 5))
+    except (ValueError, OverflowError):
+        # OverflowError - слишком большие days, duration или step для timedelta
+        return JsonResponse({'error': 'Некорректные параметры запроса'}, status=400)
+
+    start_time = timezone.now()
+    if request.GET.get('start_time'):
+        start_time = parse_aware_datetime(request.GET['start_time'])
+        if not start_time:
+            return JsonResponse({'error': 'Некорректный формат времени'}, status=400)
+        start_time = max(start_time, timezone.now())
+
+    if party_size < 1 or duration < timedelta(hours=1) or not 1 <= limit <= 50:
+        return JsonResponse({'error': 'Некорректные параметры запроса'}, status=400)
+    if not timedelta(0) < horizon <= timedelta(days=31) or step < timedelta(minutes=5):
+        return JsonResponse({'error': 'Некорректные параметры запроса'}, status=400)
+
+    zones_list = Zone.objects.filter(id__in=zone_ids) if zone_ids else Zone.objects.all()
+    slots = find_free_slots(
+        zones_list, party_size=party_size, duration=duration, horizon_start=start_time,
+        horizon=horizon, step=step, limit=limit,
+    )
+
     return JsonResponse({
-        'zones': zones_data,
+        'slots': [{
+            'zone_id': slot['zone'].id,
+            'zone_name': slot['zone'].title,
+            'start_time': slot['start_time'].isoformat(),
+            'end_time': slot['end_time'].isoformat(),
+            'available_seats': slot['available_seats'],
+        } for slot in slots],
+        'requested_people': party_size,
         'current_time': timezone.now().isoformat(),
         'success': True
     })
 
-def check_zone_availability(request, zone_id=None):
+
+def occupancy_api(request):
+    """API почасовой загрузки зон для недельного календаря"""
     try:
-        if request.method == 'GET':
-            # Получаем параметры из GET запроса
-            zone_id = request.GET.get('zone_id', zone_id)
-            start_time_str = request.GET.get('start_time')
-            end_time_str = request.GET.get('end_time')
-            number_of_people = int(request.GET.get('number_of_people', 1))
-            
-            if not zone_id:
-                return JsonResponse({'error': 'Не указан ID зоны'}, status=400)
-            
-            zone = Zone.objects.get(id=zone_id)
-            
-            if start_time_str and end_time_str:
-                # Проверяем доступность на конкретный интервал времени
-                start_time = parse_datetime(start_time_str)
-                end_time = parse_datetime(end_time_str)
-                
-                if not start_time or not end_time:
-                    return JsonResponse({'error': 'Некорректный формат времени'}, status=400)
-                
-                # Преобразуем naive datetime в aware
-                current_tz = timezone.get_current_timezone()
-                if timezone.is_naive(start_time):
-                    start_time = timezone.make_aware(start_time, current_tz)
-                if timezone.is_naive(end_time):
-                    end_time = timezone.make_aware(end_time, current_tz)
-                
-                # Проверяем доступность
-                available_seats = zone.get_available_seats_for_time(start_time, end_time)
-                is_available = available_seats >= number_of_people
-                
-                return JsonResponse({
-                    'zone_id': zone.id,
-                    'zone_name': zone.title,
-                    'available': is_available,
-                    'available_seats': available_seats,
-                    'requested_people': number_of_people,
-                    'capacity': zone.capacity,
-                    'status': 'available' if is_available else 'booked',
-                    'message': f'Доступно {available_seats} мест' if is_available else f'Недостаточно мест. Доступно только {available_seats}',
-                    'requested_start': start_time_str,
-                    'requested_end': end_time_str,
-                    'timestamp': timezone.now().isoformat()
-                })
-            else:
-                available_seats = zone.get_available_seats()
-                
-                return JsonResponse({
-                    'zone_id': zone.id,
-                    'zone_name': zone.title,
-                    'available_seats': available_seats,
-                    'capacity': zone.capacity,
-                    'status': zone.get_availability_status(),
-                    'message': 'Занято' if available_seats == 0 else f'Свободно {available_seats} из {zone.capacity} мест',
-                    'current_time': timezone.now().isoformat(),
-                    'timestamp': timezone.now().isoformat()
-                })
-                
-    except Zone.DoesNotExist:
-        return JsonResponse({'error': 'Зона не найдена'}, status=404)
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        zone_ids = [int(zone_id) for zone_id in request.GET.getlist('zone')]
+        days = int(request.GET.get('days', 7))
+        # parse_date бросает ValueError для несуществующей даты (2026-02-30)
+        start_date = parse_date(request.GET['start']) if request.GET.get('start') else timezone.localdate()
+    except ValueError:
+        return JsonResponse({'error': 'Некорректные параметры запроса'}, status=400)
+
+    if not start_date:
+        return JsonResponse({'error': 'Некорректный формат даты'}, status=400)
+    if not 1 <= days <= 31:
+        return JsonResponse({'error': 'Некорректные параметры запроса'}, status=400)
+
+    start_time = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+    zones_list = list(Zone.objects.filter(id__in=zone_ids) if zone_ids else Zone.objects.all())
+    occupancy = hourly_occupancy(start_time, start_time + timedelta(days=days), zones_list)
+
+    return JsonResponse({
+        'zones': [{
+            'id': zone.id,
+            'title': zone.title,
+            'capacity': zone.capacity,
+            'hours': [{
+                'hour': timezone.localtime(hour).isoformat(),
+                'occupied_seats': occupied,
+                'available_seats': available,
+            } for hour, occupied, available in occupancy[zone.id]],
+        } for zone in zones_list],
+        'start': start_date.isoformat(),
+        'days': days,
+        'success': True
+    })
+
+
+@staff_member_required
+def profiling_api(request):
+    """API гистограмм времени ответа и SQL по представлениям"""
+    # Замеры этого процесса, еще не сброшенные в таблицу, тоже попадают в ответ
+    try:
+        profiler.flush()
+    except DatabaseError:
+        pass
+    
+    sort = request.GET.get('sort', 'total')
+    if sort not in PROFILING_SORTS:
+        return JsonResponse({'error': 'Некорректные параметры запроса'}, status=400)
+    
+    config = get_metrics_config()
+    return JsonResponse({
+        'enabled': config['ENABLED'],
+        'sample_rate': config['SAMPLE_RATE'],
+        'views': profiles_report(PROFILING_SORTS[sort]),
+        'success': True
+    })
+
+
+@staff_member_required
+def daily_stats_api(request):
+    """API выручки и загрузки по дням, читает только дневные итоги"""
+    try:
+        start_date, end_date = parse_period(request.GET)
+        zone_ids = [int(zone_id) for zone_id in request.GET.getlist('zone')]
+    except ValueError:
+        return JsonResponse({'error': 'Некорректные параметры запроса'}, status=400)
+
+    report = stats_report(start_date, end_date, zone_ids or None)
+    return JsonResponse({
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'zones': [{
+            'zone_id': row['zone_id'],
+            'zone_name': row['zone__title'],
+            'bookings': row['bookings'],
+            'cancelled': row['cancelled'],
+            'cancellation_rate': row['cancellation_rate'],
+            'people_hours': round(row['people_hours'], 1),
+            'revenue': row['revenue'],
+        } for row in report['zones']],
+        'days': [{
+            'date': row['date'].isoformat(),
+            'bookings': row['bookings'],
+            'cancelled': row['cancelled'],
+            'cancellation_rate': row['cancellation_rate'],
+            'people_hours': round(row['people_hours'], 1),
+            'revenue': row['revenue'],
+        } for row in report['days']],
+        'totals': {**report['totals'], 'people_hours': round(report['totals']['people_hours'], 1)},
+        'success': True
+    })
 
 
 def debug_time_info(request):
@@ -461,6 +739,7 @@ def debug_time_info(request):
                 now = timezone.now()
                 booking = Booking.objects.create(
                     zone=zone,
+                    user=request.user if request.user.is_authenticated else None,
                     customer_name="Тестовый клиент",
                     customer_phone="+79999999999",
                     customer_email="test@example.com",
@@ -470,10 +749,6 @@ def debug_time_info(request):
                     status='confirmed'
                 )
                 
-                if request.user.is_authenticated:
-                    booking.user = request.user
-                    booking.save()
-                
                 messages.success(request, f"Создано тестовое бронирование ID {booking.id} на 2 человека")
         except Exception as e:
             messages.error(request, f"Ошибка: {str(e)}")
@@ -512,12 +787,12 @@ def debug_time_info(request):
     context['bookings_info'] = bookings_info
     
     zones_info = []
-    for zone in Zone.objects.all():
+    for zone in Zone.objects.with_available_seats():
         zones_info.append({
             'zone': zone,
-            'available_seats': zone.get_available_seats(),
+            'available_seats': zone.available_seats,
             'capacity': zone.capacity,
-            'status': zone.get_availability_status(),
+            'status': zone.get_availability_status(zone.available_seats),
         })
     
     context['zones_info'] = zones_info